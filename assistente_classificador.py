@@ -1,10 +1,10 @@
-from langchain_openai import ChatOpenAI
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import StrOutputParser
-llm = ChatOpenAI(model="gpt-4", temperature=0.3)
-prompt_base = ChatPromptTemplate.from_messages([
-    ("system",
-     """
+import threading
+
+# Chain do assistente, criada na primeira pergunta (o cliente da OpenAI exige a chave da API)
+_chain_assistente = None
+_lock = threading.Lock()
+
+INSTRUCOES_ASSISTENTE = """
      Você é um assistente especializado em ajudar pesquisadores a escolher o melhor classificador para análise de quotes em pesquisa qualitativa.
      
      A ferramenta possui os seguintes classificadores:
@@ -21,8 +21,22 @@ prompt_base = ChatPromptTemplate.from_messages([
      
      Responda perguntas livres dos usuários, explicando diferenças entre os classificadores, sugerindo escolhas com base no número de quotes, necessidade de justificativa, tempo ou custo.
      Seja claro e direto. Quando for o caso, sugira um classificador e um modelo.
-     """),
-    ("user", "{pergunta}")
-])
-parser = StrOutputParser()
-chain_assistente = prompt_base | llm | parser
\ No newline at end of file
+     """
+
+
+def obter_chain_assistente():
+    """Retorna a chain do assistente (prompt | llm | parser), criando-a no primeiro uso."""
+    global _chain_assistente
+    with _lock:
+        if _chain_assistente is None:
+            from langchain_openai import ChatOpenAI
+            from langchain_core.prompts import ChatPromptTemplate
+            from langchain_core.output_parsers import StrOutputParser
+
+            llm = ChatOpenAI(model="gpt-4", temperature=0.3)
+            prompt_base = ChatPromptTemplate.from_messages([
+                ("system", INSTRUCOES_ASSISTENTE),
+                ("user", "{pergunta}")
+            ])
+            _chain_assistente = prompt_base | llm | StrOutputParser()
+        return _chain_assistente
@@ -0,0 +1,75 @@
+"""
+Benchmark dos índices de constructos: busca exata (NumPy) x HNSW aproximada (hnswlib).
+
+Usa vetores aleatórios normalizados (dimensão do modelo padrão) para simular codebooks
+de vários tamanhos e mede, para cada backend:
+- tempo de construção do índice
+- latência média da consulta top-k por quote
+- recall@k do HNSW em relação à busca exata
+
+Uso:
+    python -m benchmarks.bench_construct_index --tamanhos 8 200 2000 20000 --quotes 2000 --k 2
+"""
+import argparse
+import time
+
+import numpy as np
+
+from core.construct_index import ExactConstructIndex, HNSWConstructIndex, hnsw_disponivel
+
+
+def vetores_normalizados(n, dimensao, gerador):
+    vetores = gerador.standard_normal((n, dimensao)).astype(np.float32)
+    return vetores / np.linalg.norm(vetores, axis=1, keepdims=True)
+
+
+def medir(indice, quotes, k, tamanho_lote):
+    inicio = time.perf_counter()
+    resultados = [indice.top_k(quotes[i:i + tamanho_lote], k)[0] for i in range(0, len(quotes), tamanho_lote)]
+    latencia = (time.perf_counter() - inicio) / len(quotes)
+    return np.vstack(resultados), latencia
+
+
+def recall(aproximado, exato):
+    acertos = sum(len(set(a) & set(e)) for a, e in zip(aproximado, exato))
+    return acertos / exato.size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tamanhos", type=int, nargs="+", default=[8, 200, 2000, 20000])
+    parser.add_argument("--quotes", type=int, default=2000)
+    parser.add_argument("--dimensao", type=int, default=384)
+    parser.add_argument("--k", type=int, default=2)
+    parser.add_argument("--lote", type=int, default=64)
+    parser.add_argument("--ef-busca", type=int, default=64)
+    args = parser.parse_args()
+
+    gerador = np.random.default_rng(42)
+    quotes = vetores_normalizados(args.quotes, args.dimensao, gerador)
+    com_hnsw = hnsw_disponivel()
+    if not com_hnsw:
+        print("hnswlib não instalado: apenas o backend exato será medido (pip install hnswlib)\n")
+
+    print(f"{'constructos':>11} | {'backend':>7} | {'construção (ms)':>15} | {'consulta (µs/quote)':>19} | recall@{args.k}")
+    for tamanho in args.tamanhos:
+        nomes = [f"C{i}" for i in range(tamanho)]
+        matriz = vetores_normalizados(tamanho, args.dimensao, gerador)
+
+        inicio = time.perf_counter()
+        exato = ExactConstructIndex(nomes, matriz)
+        construcao = (time.perf_counter() - inicio) * 1000
+        referencia, latencia = medir(exato, quotes, args.k, args.lote)
+        print(f"{tamanho:>11} | {'exato':>7} | {construcao:>15.1f} | {latencia * 1e6:>19.1f} | 1.000")
+
+        if com_hnsw:
+            inicio = time.perf_counter()
+            hnsw = HNSWConstructIndex(nomes, matriz, ef_busca=args.ef_busca)
+            construcao = (time.perf_counter() - inicio) * 1000
+            aproximado, latencia = medir(hnsw, quotes, args.k, args.lote)
+            print(f"{tamanho:>11} | {'hnsw':>7} | {construcao:>15.1f} | {latencia * 1e6:>19.1f} | "
+                  f"{recall(aproximado, referencia):.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+Benchmark dos backends de inferência do modelo de embeddings em CPU: PyTorch fp32 (referência),
+ONNX Runtime e quantização dinâmica int8.
+
+Para cada backend:
+- paridade: fração dos quotes de exemplo cujo constructo top-1 coincide com o do fp32, e o
+  cosseno médio entre os vetores do backend e os do fp32
+- throughput: quotes/s codificando `--volume` quotes (os de exemplo repetidos, sem cache),
+  melhor de `--repeticoes` execuções, e o ganho em relação ao fp32
+- tempo de carregamento do modelo (inclui a exportação para ONNX na primeira vez)
+
+Backends cujas dependências não estão instaladas são ignorados com um aviso; sem o torch
+(referência fp32) o benchmark termina com código 1.
+Sai com código 1 se a concordância top-1 de algum backend ficar abaixo de `--min-concordancia`.
+
+Uso:
+    python -m benchmarks.bench_embedding_backend
+    python -m benchmarks.bench_embedding_backend --backends torch int8 --volume 5000 --json backends.json
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+
+from benchmarks.bench_pipeline import commit_atual
+from core.construct_cache import textos_constructos
+from core.embedder_registry import BACKENDS_EMBEDDING, MODELO_EMBEDDING_PADRAO, obter_embedder
+from core.embeddings import TAMANHO_LOTE_PADRAO, codificar_normalizado, top_k
+
+
+def carregar_amostra(caminho_constructos, caminho_quotes, coluna_quote):
+    import pandas as pd
+
+    df_constructos = pd.read_excel(caminho_constructos)
+    constructos = dict(zip(df_constructos.iloc[:, 0].astype(str), df_constructos.iloc[:, 1].astype(str)))
+    df_quotes = pd.read_excel(caminho_quotes)
+    if coluna_quote not in df_quotes.columns:
+        raise ValueError(f"Coluna '{coluna_quote}' não encontrada em {caminho_quotes}")
+    quotes = df_quotes[coluna_quote].dropna().astype(str).tolist()
+    return constructos, quotes
+
+
+def medir_backend(backend, args, constructos, quotes, volume):
+    inicio = time.perf_counter()
+    embedder = obter_embedder(args.modelo, "cpu", backend)
+    codificar_normalizado(embedder, ["aquecimento"])
+    carregamento = time.perf_counter() - inicio
+
+    matriz_constructos = codificar_normalizado(embedder, textos_constructos(constructos), args.lote)
+    matriz_quotes = codificar_normalizado(embedder, quotes, args.lote)
+    indices, _ = top_k(matriz_quotes @ matriz_constructos.T, 1)
+
+    tempos = []
+    for _ in range(args.repeticoes):
+        inicio = time.perf_counter()
+        codificar_normalizado(embedder, volume, args.lote)
+        tempos.append(time.perf_counter() - inicio)
+
+    return {
+        "backend": backend,
+        "carregamento_s": round(carregamento, 2),
+        "quotes_por_segundo": round(len(volume) / min(tempos), 1),
+        "rotulos": indices[:, 0],
+        "vetores": matriz_quotes,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS_EMBEDDING, default=list(BACKENDS_EMBEDDING))
+    parser.add_argument("--modelo", default=MODELO_EMBEDDING_PADRAO)
+    parser.add_argument("--constructos", default="data/exemplo_constructos.xlsx")
+    parser.add_argument("--quotes", default="data/exemplo_quotes.xlsx")
+    parser.add_argument("--coluna-quote", default="Trecho")
+    parser.add_argument("--volume", type=int, default=2000, help="quotes codificados na medição de throughput")
+    parser.add_argument("--lote", type=int, default=TAMANHO_LOTE_PADRAO)
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--min-concordancia", type=float, default=0.95,
+                        help="concordância top-1 mínima com o fp32 (0 a 1)")
+    parser.add_argument("--json", dest="saida_json", help="grava os resultados neste arquivo JSON")
+    args = parser.parse_args()
+
+    constructos, quotes = carregar_amostra(args.constructos, args.quotes, args.coluna_quote)
+    volume = (quotes * (args.volume // max(len(quotes), 1) + 1))[:args.volume]
+    print(f"{len(constructos)} constructos · {len(quotes)} quotes de exemplo · volume {len(volume)} quotes\n")
+
+    # O fp32 é sempre medido: é a referência de paridade e de ganho
+    backends = ["torch"] + [b for b in args.backends if b != "torch"]
+    medicoes = []
+    for backend in backends:
+        try:
+            medicoes.append(medir_backend(backend, args, constructos, quotes, volume))
+        except ImportError as e:
+            print(f"⚠️ backend {backend} ignorado: {e}")
+    if not medicoes or medicoes[0]["backend"] != "torch":
+        # Sem o fp32 não há referência de paridade nem de ganho
+        print("❌ O backend torch (referência fp32) não pôde ser carregado: instale torch e "
+              "sentence-transformers (pip install -r requirements.txt) e execute novamente.")
+        sys.exit(1)
+    referencia = medicoes[0]
+
+    resultados = []
+    for m in medicoes:
+        resultados.append({
+            "backend": m["backend"],
+            "carregamento_s": m["carregamento_s"],
+            "quotes_por_segundo": m["quotes_por_segundo"],
+            "ganho": round(m["quotes_por_segundo"] / referencia["quotes_por_segundo"], 2),
+            "concordancia_top1": round(float(np.mean(m["rotulos"] == referencia["rotulos"])), 4),
+            "cosseno_medio_fp32": round(float(np.mean(np.sum(m["vetores"] * referencia["vetores"], axis=1))), 4),
+        })
+
+    print(f"{'backend':>7} | {'carga (s)':>9} | {'quotes/s':>9} | {'ganho':>6} | {'top-1 = fp32':>12} | cosseno fp32")
+    for r in resultados:
+        print(f"{r['backend']:>7} | {r['carregamento_s']:>9} | {r['quotes_por_segundo']:>9} | "
+              f"{r['ganho']:>5}x | {r['concordancia_top1']:>12.1%} | {r['cosseno_medio_fp32']}")
+
+    if args.saida_json:
+        with open(args.saida_json, "w", encoding="utf-8") as f:
+            json.dump({
+                "commit": commit_atual(),
+                "data": datetime.now().isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "config": {k: v for k, v in vars(args).items() if k != "saida_json"},
+                "resultados": resultados,
+            }, f, ensure_ascii=False, indent=2)
+        print(f"\nResultados gravados em {args.saida_json}")
+
+    abaixo = [r["backend"] for r in resultados if r["concordancia_top1"] < args.min_concordancia]
+    if abaixo:
+        print(f"\n❌ Concordância top-1 abaixo de {args.min_concordancia:.0%}: {', '.join(abaixo)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Micro-benchmark do custo por quote removido do HybridQuoteClassifier.
+
+Compara, sem chamar a API:
+- antes: criar FewShotChatMessagePromptTemplate, ChatPromptTemplate e ChatOpenAI
+  a cada quote e renderizar o prompt
+- depois: reutilizar o prompt e o cliente montados uma vez e apenas renderizar
+
+Uso:
+    python -m benchmarks.bench_hybrid_prompt --quotes 500 --exemplos 10
+"""
+import argparse
+import os
+import time
+
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import ChatPromptTemplate, FewShotChatMessagePromptTemplate
+
+# O cliente não faz chamadas aqui, mas exige uma chave configurada para ser criado
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+from langchain_openai import ChatOpenAI
+
+EXEMPLO_PROMPT = ChatPromptTemplate.from_messages([
+    ("human", 'Quote: "{quote}"'),
+    ("ai", "Constructo: {constructo}\nJustificativa: {justificativa}")
+])
+
+
+def montar_prompt(exemplos):
+    few_shot_prompt = FewShotChatMessagePromptTemplate(example_prompt=EXEMPLO_PROMPT, examples=exemplos)
+    return ChatPromptTemplate.from_messages([
+        ("system", (
+            "Você é um assistente treinado em análise qualitativa.\n"
+            "Escopo: {escopo}\n"
+            "Constructos mais similares:\n{top_definicoes}"
+        )),
+        few_shot_prompt,
+        ("human", 'Quote: "{quote}"\nClassifique o trecho com Constructo e Justificativa.')
+    ])
+
+
+def entrada(i):
+    return {
+        "escopo": "Percepções de docentes sobre ensino remoto.",
+        "top_definicoes": "Empatia: capacidade de se colocar no lugar do outro\nAutonomia: ...",
+        "quote": f"Trecho de entrevista número {i} sobre a rotina das aulas.",
+    }
+
+
+def medir_antes(n, exemplos):
+    inicio = time.perf_counter()
+    for i in range(n):
+        prompt = montar_prompt(exemplos)
+        chain = prompt | ChatOpenAI(model="gpt-4", temperature=0.4) | StrOutputParser()
+        prompt.format_messages(**entrada(i))
+    return (time.perf_counter() - inicio) / n, chain
+
+
+def medir_depois(n, exemplos):
+    prompt = montar_prompt(exemplos)
+    chain = prompt | ChatOpenAI(model="gpt-4", temperature=0.4) | StrOutputParser()
+    inicio = time.perf_counter()
+    for i in range(n):
+        prompt.format_messages(**entrada(i))
+    return (time.perf_counter() - inicio) / n, chain
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--quotes", type=int, default=500)
+    parser.add_argument("--exemplos", type=int, default=10)
+    args = parser.parse_args()
+
+    exemplos = [
+        {"quote": f"Exemplo {i}", "constructo": "Empatia", "justificativa": "Demonstra cuidado."}
+        for i in range(args.exemplos)
+    ]
+
+    antes, _ = medir_antes(args.quotes, exemplos)
+    depois, _ = medir_depois(args.quotes, exemplos)
+
+    print(f"Quotes: {args.quotes} | Exemplos few-shot: {args.exemplos}")
+    print(f"Antes  (objetos por quote):   {antes * 1000:.3f} ms/quote")
+    print(f"Depois (objetos reutilizados): {depois * 1000:.3f} ms/quote")
+    print(f"Sobrecarga removida:           {(antes - depois) * 1000:.3f} ms/quote")
+
+
+if __name__ == "__main__":
+    main()
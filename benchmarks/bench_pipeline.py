@@ -0,0 +1,220 @@
+"""
+Benchmark de ponta a ponta: ClassificationPipeline com cada classificador sobre
+conjuntos sintéticos de quotes e constructos, sem rede (LLM e embeddings falsos).
+
+Para cada classificador mede:
+- quotes/s (tempo total de parede do pipeline)
+- latência por quote p50/p95/p99 (tempos informados pelo classificador ao pipeline)
+- pico de memória residente (RSS) do processo que executou o classificador
+- chamadas ao LLM, erros simulados, retentativas e tokens enviados/recebidos
+
+Cada classificador roda em um processo separado, para que o pico de RSS de um não
+contamine o do outro. O resultado pode ser gravado em JSON (--json) e comparado
+entre commits.
+
+Uso:
+    python -m benchmarks.bench_pipeline --quotes 500 --constructos 20 --latencia 0.02
+    python -m benchmarks.bench_pipeline --classificadores llm hybrid --taxa-erro 0.05 --json bench.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+CLASSIFICADORES = ("embedding", "llm", "hybrid", "similarity", "similarity-conjunto")
+
+# Vocabulário usado para gerar definições e quotes sintéticos
+VOCABULARIO = (
+    "aluno professor aula escola ensino aprendizagem avaliação prova nota turma "
+    "motivação interesse engajamento participação colaboração grupo projeto tarefa "
+    "tecnologia computador internet plataforma remoto presencial horário rotina "
+    "família apoio comunicação feedback dificuldade desafio conquista confiança "
+    "autonomia responsabilidade empatia respeito conflito ansiedade estresse bem-estar"
+).split()
+
+
+def gerar_dados(n_quotes, n_constructos, semente):
+    """Gera constructos {nome: definição} e quotes sintéticos reprodutíveis."""
+    aleatorio = random.Random(semente)
+    constructos = {
+        f"Constructo {i + 1}": " ".join(aleatorio.choices(VOCABULARIO, k=12))
+        for i in range(n_constructos)
+    }
+    quotes = [" ".join(aleatorio.choices(VOCABULARIO, k=aleatorio.randint(15, 60))) for _ in range(n_quotes)]
+    return constructos, quotes
+
+
+def percentil(valores, p):
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    posicao = (len(ordenados) - 1) * p / 100
+    inferior = int(posicao)
+    superior = min(inferior + 1, len(ordenados) - 1)
+    return ordenados[inferior] + (ordenados[superior] - ordenados[inferior]) * (posicao - inferior)
+
+
+def criar_classificador(nome, constructos, llm, scheduler, config):
+    from benchmarks.fakes import MODELO_EMBEDDING_FALSO
+
+    modelo_embedding = config["modelo_embedding"] or MODELO_EMBEDDING_FALSO
+    if nome == "embedding":
+        from classifiers.embedding import EmbeddingQuoteClassifier
+        return EmbeddingQuoteClassifier(constructos, modelo_embedding=modelo_embedding)
+    if nome == "llm":
+        from classifiers.llm import LLMQuoteClassifier
+        return LLMQuoteClassifier(
+            constructos, escopo="Benchmark sintético", llm=llm, scheduler=scheduler,
+            max_concurrency=config["concorrencia"]
+        )
+    if nome == "hybrid":
+        from classifiers.hybrid_classifier import HybridQuoteClassifier
+        return HybridQuoteClassifier(
+            constructos, escopo="Benchmark sintético", llm=llm, scheduler=scheduler,
+            modelo_embedding=modelo_embedding, cascata=config["cascata"]
+        )
+    from classifiers.similarity_classifier import MODO_CONJUNTO, MODO_PAR, ConstructSimilarityClassifier
+    return ConstructSimilarityClassifier(
+        constructos, escopo="Benchmark sintético", llm=llm, scheduler=scheduler,
+        modelo_embedding=modelo_embedding, max_concurrency=max(2, config["concorrencia"]),
+        modo_avaliacao=MODO_CONJUNTO if nome == "similarity-conjunto" else MODO_PAR
+    )
+
+
+def executar_classificador(nome, config):
+    """Executa um classificador no processo atual e retorna as métricas (dicionário)."""
+    import pandas as pd
+
+    from benchmarks.fakes import MODELO_EMBEDDING_FALSO, FakeChatModel, FakeEmbedder
+    from core.embedder_registry import registry
+    from core.llm_scheduler import LLMScheduler
+    from core.pipeline import ClassificationPipeline
+
+    # Caches em disco (constructos/quotes) ficam em uma pasta temporária, isolados do projeto
+    os.chdir(config["diretorio"])
+
+    if not config["modelo_embedding"]:
+        registry.registrar(
+            FakeEmbedder(latencia_por_texto=config["latencia_embedding"]), modelo=MODELO_EMBEDDING_FALSO
+        )
+
+    constructos, quotes = gerar_dados(config["quotes"], config["constructos"], config["semente"])
+    llm = FakeChatModel(
+        latencia=config["latencia"], taxa_erro=config["taxa_erro"], semente=config["semente"],
+        constructos=list(constructos)
+    )
+    scheduler = None
+    if config["scheduler"] or config["taxa_erro"]:
+        # Os erros simulados são 429: o agendador os absorve com novas tentativas
+        scheduler = LLMScheduler(
+            tamanho_lote=config["tamanho_lote"], max_concurrency=config["concorrencia"],
+            espera_base=0.01, espera_maxima=0.05, max_tentativas=20
+        )
+
+    classificador = criar_classificador(nome, constructos, llm, scheduler, config)
+    df = pd.DataFrame({"quote": quotes})
+    pipeline = ClassificationPipeline(df, "quote", "classificacao", classificador)
+
+    inicio = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        pipeline.run()
+    duracao = time.perf_counter() - inicio
+
+    contadores = llm.contadores
+    # ru_maxrss é informado em KB no Linux e em bytes no macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    rss_mb = rss / 1024 / 1024 if platform.system() == "Darwin" else rss / 1024
+    tempos = pipeline.tempos
+    return {
+        "classificador": nome,
+        "quotes": len(quotes),
+        "segundos": round(duracao, 4),
+        "quotes_por_segundo": round(len(quotes) / duracao, 2) if duracao else None,
+        "latencia_p50_ms": round(percentil(tempos, 50) * 1000, 2),
+        "latencia_p95_ms": round(percentil(tempos, 95) * 1000, 2),
+        "latencia_p99_ms": round(percentil(tempos, 99) * 1000, 2),
+        "rss_pico_mb": round(rss_mb, 1),
+        "chamadas_llm": contadores["chamadas"],
+        "erros_simulados": contadores["erros"],
+        "retentativas": scheduler.retentativas if scheduler else 0,
+        "tokens_enviados": contadores["tokens_enviados"],
+        "tokens_recebidos": contadores["tokens_recebidos"],
+        # Tempo por etapa (embed, rank, prompt, LLM, parse) registrado pelo tracer do pipeline
+        "etapas": pipeline.tracer.resumo()["etapas"],
+    }
+
+
+def commit_atual():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--classificadores", nargs="+", choices=CLASSIFICADORES, default=list(CLASSIFICADORES))
+    parser.add_argument("--quotes", type=int, default=200)
+    parser.add_argument("--constructos", type=int, default=10)
+    parser.add_argument("--latencia", type=float, default=0.02, help="segundos por chamada ao LLM falso")
+    parser.add_argument("--taxa-erro", type=float, default=0.0, help="fração de chamadas com 429 simulado")
+    parser.add_argument("--latencia-embedding", type=float, default=0.0, help="segundos por texto codificado")
+    parser.add_argument("--concorrencia", type=int, default=4)
+    parser.add_argument("--scheduler", action="store_true", help="usa o LLMScheduler (lotes)")
+    parser.add_argument("--tamanho-lote", type=int, default=20)
+    parser.add_argument("--cascata", action="store_true", help="ativa a cascata no classificador híbrido")
+    parser.add_argument("--modelo-embedding", default=None,
+                        help="modelo SentenceTransformer real (padrão: embedder falso, sem download)")
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--json", dest="saida_json", help="grava os resultados neste arquivo JSON")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="bench_pipeline_") as diretorio:
+        config = {**vars(args), "diretorio": diretorio}
+        config.pop("classificadores")
+        config.pop("saida_json")
+
+        # Garante que o pacote do projeto seja importável nos processos filhos após o chdir
+        raiz = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        os.environ["PYTHONPATH"] = os.pathsep.join(filter(None, [raiz, os.environ.get("PYTHONPATH")]))
+
+        resultados = []
+        contexto = multiprocessing.get_context("spawn")
+        for nome in args.classificadores:
+            with ProcessPoolExecutor(max_workers=1, mp_context=contexto) as executor:
+                resultados.append(executor.submit(executar_classificador, nome, config).result())
+
+    print(f"{'classificador':<20} | {'quotes/s':>9} | {'p50 ms':>8} | {'p95 ms':>8} | {'p99 ms':>8} | "
+          f"{'RSS MB':>7} | {'chamadas':>8} | {'tokens enviados':>15}")
+    for r in resultados:
+        print(f"{r['classificador']:<20} | {r['quotes_por_segundo']:>9} | {r['latencia_p50_ms']:>8} | "
+              f"{r['latencia_p95_ms']:>8} | {r['latencia_p99_ms']:>8} | {r['rss_pico_mb']:>7} | "
+              f"{r['chamadas_llm']:>8} | {r['tokens_enviados']:>15}")
+
+    if args.saida_json:
+        config.pop("diretorio")
+        with open(args.saida_json, "w", encoding="utf-8") as f:
+            json.dump({
+                "commit": commit_atual(),
+                "data": datetime.now().isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "config": config,
+                "resultados": resultados,
+            }, f, ensure_ascii=False, indent=2)
+        print(f"\nResultados gravados em {args.saida_json}")
+
+
+if __name__ == "__main__":
+    main()
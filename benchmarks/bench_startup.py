@@ -0,0 +1,153 @@
+"""
+Benchmark do tempo de inicialização: mede, em processos Python novos, quanto custa importar
+os módulos de entrada da aplicação (e criar o MainController), e verifica que nenhum módulo
+pesado (torch, sentence_transformers, sklearn, matplotlib, clientes do LangChain) é carregado
+antes do primeiro uso.
+
+Cada alvo é importado várias vezes, sempre em um interpretador novo (sem cache de módulos em
+memória), e a mediana é comparada ao orçamento de tempo. Com -X importtime, lista também os
+módulos que mais contribuíram para o tempo de importação.
+
+O processo filho roda sem OPENAI_API_KEY, para garantir que a interface sobe sem a chave.
+Sai com código 1 se algum alvo estourar o orçamento ou carregar um módulo pesado.
+
+Uso:
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --alvos controller app --repeticoes 5 --orcamento 3 --json startup.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+from datetime import datetime
+
+from benchmarks.bench_pipeline import commit_atual
+
+# Código executado em cada processo filho, por alvo
+ALVOS = {
+    "controller": "import main_controller; main_controller.MainController()",
+    "assistente": "import assistente_classificador",
+    # Monta a interface Gradio completa (launch() só roda como script)
+    "app": "import app; app.criar_app()",
+}
+
+# Módulos que só devem ser carregados no primeiro uso de um classificador, avaliação ou chat
+MODULOS_PESADOS = (
+    "torch", "sentence_transformers", "sklearn", "matplotlib",
+    "langchain_openai", "langchain_core", "openai", "hnswlib",
+)
+
+CODIGO_FILHO = """
+import json, sys, time
+inicio = time.perf_counter()
+{codigo}
+duracao = time.perf_counter() - inicio
+pesados = sorted(m for m in {pesados!r} if m in sys.modules)
+print("@@RESULTADO@@" + json.dumps({{"segundos": duracao, "pesados": pesados}}))
+"""
+
+
+def executar_alvo(codigo, raiz, importtime=False):
+    """Executa o código em um interpretador novo e retorna (resultado, stderr)."""
+    env = dict(os.environ)
+    env.pop("OPENAI_API_KEY", None)
+    env["AQUECER_EMBEDDINGS"] = ""
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [raiz, env.get("PYTHONPATH")]))
+
+    comando = [sys.executable]
+    if importtime:
+        comando += ["-X", "importtime"]
+    comando += ["-c", CODIGO_FILHO.format(codigo=codigo, pesados=MODULOS_PESADOS)]
+    processo = subprocess.run(comando, cwd=raiz, env=env, capture_output=True, text=True)
+
+    for linha in processo.stdout.splitlines():
+        if linha.startswith("@@RESULTADO@@"):
+            return json.loads(linha[len("@@RESULTADO@@"):]), processo.stderr
+    raise RuntimeError(f"Falha ao importar ({codigo}):\n{processo.stderr.strip()[-2000:]}")
+
+
+def modulos_mais_lentos(stderr_importtime, quantidade):
+    """
+    Lê a saída de -X importtime e retorna os pacotes de primeiro nível com maior tempo
+    cumulativo: [(modulo, ms), ...].
+    """
+    tempos = {}
+    for linha in stderr_importtime.splitlines():
+        if not linha.startswith("import time:") or "|" not in linha:
+            continue
+        partes = linha[len("import time:"):].split("|", 2)
+        if len(partes) != 3 or not partes[1].strip().isdigit():
+            continue
+        # Apenas importações de primeiro nível (os submódulos vêm indentados na árvore)
+        nome = partes[2].rstrip()
+        if nome != " " + nome.strip():
+            continue
+        nome = nome.strip()
+        tempos[nome] = max(tempos.get(nome, 0), int(partes[1]) / 1000)
+    return sorted(tempos.items(), key=lambda item: item[1], reverse=True)[:quantidade]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--alvos", nargs="+", choices=list(ALVOS), default=["controller", "assistente"])
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--orcamento", type=float, default=2.0,
+                        help="tempo máximo (s, mediana) de importação de cada alvo")
+    parser.add_argument("--top", type=int, default=10, help="módulos mais lentos listados por alvo")
+    parser.add_argument("--json", dest="saida_json", help="grava os resultados neste arquivo JSON")
+    args = parser.parse_args()
+
+    raiz = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    resultados = []
+    for nome in args.alvos:
+        codigo = ALVOS[nome]
+        tempos = []
+        pesados = set()
+        for _ in range(args.repeticoes):
+            resultado, _ = executar_alvo(codigo, raiz)
+            tempos.append(resultado["segundos"])
+            pesados.update(resultado["pesados"])
+        _, stderr = executar_alvo(codigo, raiz, importtime=True)
+
+        mediana = statistics.median(tempos)
+        resultados.append({
+            "alvo": nome,
+            "mediana_s": round(mediana, 3),
+            "minimo_s": round(min(tempos), 3),
+            "maximo_s": round(max(tempos), 3),
+            "dentro_do_orcamento": mediana <= args.orcamento,
+            "modulos_pesados": sorted(pesados),
+            "mais_lentos_ms": [[modulo, round(ms, 1)] for modulo, ms in modulos_mais_lentos(stderr, args.top)],
+        })
+
+    print(f"Orçamento: {args.orcamento:.2f}s (mediana de {args.repeticoes} processo(s) novo(s))\n")
+    print(f"{'alvo':<12} | {'mediana s':>9} | {'mín s':>7} | {'máx s':>7} | {'ok':>3} | módulos pesados carregados")
+    for r in resultados:
+        ok = "sim" if r["dentro_do_orcamento"] and not r["modulos_pesados"] else "não"
+        print(f"{r['alvo']:<12} | {r['mediana_s']:>9} | {r['minimo_s']:>7} | {r['maximo_s']:>7} | {ok:>3} | "
+              f"{', '.join(r['modulos_pesados']) or '-'}")
+    for r in resultados:
+        print(f"\nMódulos mais lentos ({r['alvo']}):")
+        for modulo, ms in r["mais_lentos_ms"]:
+            print(f"  {ms:>9.1f} ms  {modulo}")
+
+    if args.saida_json:
+        with open(args.saida_json, "w", encoding="utf-8") as f:
+            json.dump({
+                "commit": commit_atual(),
+                "data": datetime.now().isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "orcamento_s": args.orcamento,
+                "resultados": resultados,
+            }, f, ensure_ascii=False, indent=2)
+        print(f"\nResultados gravados em {args.saida_json}")
+
+    if any(not r["dentro_do_orcamento"] or r["modulos_pesados"] for r in resultados):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
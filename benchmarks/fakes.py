@@ -0,0 +1,158 @@
+"""
+Substitutos locais e determinísticos do LLM e do modelo de embeddings, para medir
+classificadores e pipeline sem rede, sem chave da API e sem baixar modelos.
+"""
+import asyncio
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+
+import numpy as np
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from pydantic import PrivateAttr
+
+from core.llm_scheduler import estimar_tokens
+
+# Nome usado para registrar o embedder falso (não colide com os caches do modelo real)
+MODELO_EMBEDDING_FALSO = "fake-embedder"
+
+
+def _hash(texto):
+    return int.from_bytes(hashlib.sha256(texto.encode("utf-8")).digest()[:8], "big")
+
+
+class FakeRateLimitError(Exception):
+    """Erro simulado com a mesma cara de um HTTP 429 (tratado pelo LLMScheduler)."""
+
+    status_code = 429
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Chat model falso: responde no formato esperado por cada prompt dos classificadores,
+    de forma determinística (a resposta depende apenas do prompt).
+
+    - latencia: segundos de espera por chamada (simula a rede/API)
+    - taxa_erro: fração das chamadas que falham com FakeRateLimitError (sequência fixa pela semente)
+    - constructos: nomes entre os quais o "modelo" escolhe no formato Constructo/Justificativa
+    """
+
+    latencia: float = 0.05
+    taxa_erro: float = 0.0
+    semente: int = 0
+    constructos: list = []
+
+    _lock = PrivateAttr(default_factory=threading.Lock)
+    _aleatorio = PrivateAttr(default=None)
+    _contadores = PrivateAttr(default_factory=dict)
+
+    def model_post_init(self, __context):
+        super().model_post_init(__context)
+        self._aleatorio = random.Random(self.semente)
+        self._contadores = {"chamadas": 0, "erros": 0, "tokens_enviados": 0, "tokens_recebidos": 0}
+
+    @property
+    def _llm_type(self):
+        return "fake-chat-model"
+
+    @property
+    def contadores(self):
+        with self._lock:
+            return dict(self._contadores)
+
+    def _registrar_chamada(self, prompt):
+        """Contabiliza a chamada e decide (de forma reprodutível) se ela falha."""
+        with self._lock:
+            self._contadores["chamadas"] += 1
+            self._contadores["tokens_enviados"] += estimar_tokens(prompt)
+            falha = self._aleatorio.random() < self.taxa_erro
+            if falha:
+                self._contadores["erros"] += 1
+        if falha:
+            raise FakeRateLimitError("429 Too Many Requests: rate limit simulado")
+
+    def _responder(self, prompt):
+        h = _hash(prompt)
+        if "lista JSON" in prompt:
+            # Modo conjunto: um objeto por candidato listado no prompt ("- nome: definição")
+            bloco = prompt.split("Constructos candidatos", 1)[-1].split("Trecho de entrevista", 1)[0]
+            nomes = re.findall(r"^\s*-\s*([^:\n]+):", bloco, re.MULTILINE)
+            resposta = json.dumps([
+                {"constructo": nome.strip(), "similaridade": _hash(prompt + nome) % 101,
+                 "justificativa": "Avaliação simulada."}
+                for nome in nomes
+            ], ensure_ascii=False)
+        elif "Similaridade: <número>%" in prompt:
+            resposta = f"Similaridade: {h % 101}%\nJustificativa: Avaliação simulada."
+        else:
+            nome = self.constructos[h % len(self.constructos)] if self.constructos else f"Constructo {h % 10}"
+            resposta = f"Constructo: {nome} | Justificativa: Classificação simulada."
+
+        with self._lock:
+            self._contadores["tokens_recebidos"] += estimar_tokens(resposta)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=resposta))])
+
+    @staticmethod
+    def _texto(messages):
+        return "\n".join(str(mensagem.content) for mensagem in messages)
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        prompt = self._texto(messages)
+        self._registrar_chamada(prompt)
+        time.sleep(self.latencia)
+        return self._responder(prompt)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        prompt = self._texto(messages)
+        self._registrar_chamada(prompt)
+        await asyncio.sleep(self.latencia)
+        return self._responder(prompt)
+
+
+class FakeEmbedder:
+    """
+    Embedder falso compatível com a interface usada de SentenceTransformer
+    (encode / get_sentence_embedding_dimension).
+
+    Cada palavra é projetada em um vetor pseudoaleatório fixo (pelo hash) e o texto é a
+    soma das palavras, de modo que textos com vocabulário em comum ficam próximos.
+    - latencia_por_texto: segundos de espera por texto codificado (simula o custo do modelo)
+    """
+
+    def __init__(self, dimensao=384, latencia_por_texto=0.0):
+        self.dimensao = dimensao
+        self.latencia_por_texto = latencia_por_texto
+        self._palavras = {}
+        self.textos_codificados = 0
+
+    def get_sentence_embedding_dimension(self):
+        return self.dimensao
+
+    def _vetor_palavra(self, palavra):
+        vetor = self._palavras.get(palavra)
+        if vetor is None:
+            vetor = np.random.default_rng(_hash(palavra)).standard_normal(self.dimensao).astype(np.float32)
+            self._palavras[palavra] = vetor
+        return vetor
+
+    def encode(self, textos, batch_size=32, convert_to_numpy=True, normalize_embeddings=False,
+               show_progress_bar=False, **kwargs):
+        unico = isinstance(textos, str)
+        textos = [textos] if unico else list(textos)
+        if self.latencia_por_texto:
+            time.sleep(self.latencia_por_texto * len(textos))
+
+        matriz = np.zeros((len(textos), self.dimensao), dtype=np.float32)
+        for i, texto in enumerate(textos):
+            for palavra in re.findall(r"\w+", str(texto).lower()):
+                matriz[i] += self._vetor_palavra(palavra)
+        if normalize_embeddings:
+            normas = np.linalg.norm(matriz, axis=1, keepdims=True)
+            matriz = matriz / np.where(normas == 0, 1, normas)
+        self.textos_codificados += len(textos)
+        return matriz[0] if unico else matriz
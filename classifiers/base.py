@@ -1,5 +1,22 @@
 from abc import ABC, abstractmethod
-from typing import List, Tuple
+from typing import Iterator, List, Tuple
+
+
+class JustificativaComFalha(str):
+    """
+    Justificativa de um quote em que ao menos uma consulta ao LLM falhou (ex: cota esgotada
+    ou 429 persistente). O resultado é gravado normalmente na saída, mas não é registrado
+    no diário da execução: uma nova execução classifica o quote de novo.
+    """
+
+
+def resultado_com_falha(erro):
+    """
+    (constructo, justificativa) de um quote cuja consulta ao LLM falhou: sem constructo e com
+    a mensagem do erro, para que só esse quote fique de fora do diário (os demais do lote seguem).
+    """
+    return "", JustificativaComFalha(f"⚠️ Erro ao consultar o modelo: {erro}")
+
 
 class BaseQuoteClassifier(ABC):
     @abstractmethod
@@ -10,4 +27,20 @@ class BaseQuoteClassifier(ABC):
         - Lista com justificativas
         - Lista com tempos de execução por quote
         """
-        pass
\ No newline at end of file
+        pass
+
+    def classify_iter(self, quotes: List[str]) -> Iterator[Tuple[int, str, str, float]]:
+        """
+        Classifica os quotes de forma incremental, entregando uma tupla
+        (índice, constructo, justificativa, tempo) assim que cada quote é concluído.
+
+        A ordem de entrega pode diferir da ordem dos quotes (use o índice).
+        Encerrar o gerador interrompe o processamento dos quotes restantes.
+        Quotes com falha na consulta ao LLM trazem a justificativa como JustificativaComFalha.
+
+        Implementação padrão: classifica todos os quotes e depois os entrega;
+        os classificadores devem sobrescrevê-la para entregar resultados parciais.
+        """
+        resultados, justificativas, tempos = self.classify(quotes)
+        for i, (resultado, justificativa, tempo) in enumerate(zip(resultados, justificativas, tempos)):
+            yield i, resultado, justificativa, tempo
@@ -1,70 +1,158 @@
 import time
-from sentence_transformers import SentenceTransformer, util
+from core.construct_cache import embeddings_constructos
+from core.construct_index import criar_indice_constructos
+from core.embedder_registry import MODELO_EMBEDDING_PADRAO, chave_embedding, obter_embedder, resolver_backend
+from core.embeddings import TAMANHO_LOTE_PADRAO
+from core.instrumentation import ETAPA_EMBED, ETAPA_RANK, span
+from core.quote_store import codificar_quotes
+from core.sharded_encoding import TAMANHO_SHARD_PADRAO, ShardedEncoder
 from .base import BaseQuoteClassifier
 
 class EmbeddingQuoteClassifier(BaseQuoteClassifier):
     """
     Classificador de trechos (quotes) baseado em similaridade semântica
     utilizando embeddings da biblioteca SentenceTransformers.
-    
+
     Para cada quote, o classificador calcula a similaridade com os constructos
     e retorna o constructo mais similar.
     """
 
-    def __init__(self, constructos: dict):
+    def __init__(self, constructos: dict, modelo_embedding=MODELO_EMBEDDING_PADRAO, device=None,
+                 batch_size=TAMANHO_LOTE_PADRAO, quote_store=None, backend_indice="auto",
+                 n_processos=1, tamanho_shard=TAMANHO_SHARD_PADRAO, backend_embedding=None):
         """
         Inicializa o classificador com:
         - constructos: dicionário {nome: definição} com os constructos da pesquisa.
+        - modelo_embedding: nome do modelo SentenceTransformer a ser utilizado.
+        - device: dispositivo de execução do modelo (None = automático).
+        - batch_size: quantidade de quotes codificados e comparados por vez.
+        - quote_store: QuoteEmbeddingStore consultado antes de codificar (opcional).
+        - backend_indice: busca dos constructos mais similares ("exato", "hnsw" ou "auto").
+        - n_processos: com mais de 1, os quotes são codificados em shards de `tamanho_shard`
+          distribuídos entre vários processos (CPU). Nesse modo o quote_store não é consultado.
+        - backend_embedding: inferência do modelo ("torch", "onnx" ou "int8"; None = BACKEND_EMBEDDING).
         """
         self.constructos = constructos
+        self.modelo_embedding = modelo_embedding
+        self.backend_embedding = resolver_backend(backend_embedding)
+        # Cada backend tem o seu próprio cache de embeddings (vetores levemente diferentes)
+        self.chave_embedding = chave_embedding(modelo_embedding, self.backend_embedding)
+        self.batch_size = batch_size
+        self.quote_store = quote_store
+        self.backend_indice = backend_indice
+        self._indice = None
+        self.device = device
+        self.n_processos = max(1, int(n_processos))
+        self.tamanho_shard = tamanho_shard
+        self.encoder_processos = None
+
+        # Modelo de embeddings compartilhado pelo processo (carregado uma única vez)
+        self.embedder = obter_embedder(modelo_embedding, device, self.backend_embedding)
+
+    def _embeddings_constructos(self):
+        """Retorna os nomes dos constructos e a matriz normalizada de seus embeddings (via cache em disco)."""
+        return embeddings_constructos(
+            self.constructos, self.embedder, self.chave_embedding, batch_size=self.batch_size
+        )
+
+    def _indice_constructos(self):
+        """Índice de busca dos constructos, construído na primeira classificação e reaproveitado."""
+        if self._indice is None:
+            self._indice = criar_indice_constructos(*self._embeddings_constructos(), backend=self.backend_indice)
+        return self._indice
+
+    def _iterar_lotes(self, quotes, k):
+        """
+        Processa os quotes em lotes de `batch_size` e entrega, para cada lote,
+        (posição inicial, rankings do lote, tempo amortizado por quote).
+
+        Para cada lote, os k constructos mais similares são obtidos pelo índice de
+        constructos (produto matricial exato ou HNSW aproximado para codebooks grandes).
+        """
+        indice = self._indice_constructos()
+
+        if self.n_processos > 1:
+            yield from self._iterar_shards(quotes, k, indice)
+            return
+
+        for inicio in range(0, len(quotes), self.batch_size):
+            lote = quotes[inicio:inicio + self.batch_size]
+            start = time.perf_counter()
+
+            with span(ETAPA_EMBED, quotes=len(lote)):
+                matriz_quotes = codificar_quotes(
+                    self.embedder, self.chave_embedding, lote, self.batch_size, self.quote_store
+                )
+            with span(ETAPA_RANK, quotes=len(lote)):
+                rankings = indice.ranking(matriz_quotes, k)
+            yield inicio, rankings, (time.perf_counter() - start) / len(lote)
+
+    def _iterar_shards(self, quotes, k, indice):
+        """
+        Variante multiprocesso de _iterar_lotes: cada shard codificado por um processo
+        trabalhador é ranqueado e entregue na ordem original. Como o pipeline verifica a
+        interrupção entre as entregas, um pedido de parada cancela os shards restantes.
+        O throughput por processo fica em encoder_processos (resumo_throughput), reportado
+        pelo MainController ao final da execução.
+        """
+        if self.encoder_processos is None:
+            self.encoder_processos = ShardedEncoder(
+                self.modelo_embedding, self.device, self.n_processos, self.tamanho_shard, self.batch_size,
+                self.backend_embedding,
+            )
+        ultimo = time.perf_counter()
+        for inicio, matriz_quotes in self.encoder_processos.iterar(quotes):
+            with span(ETAPA_RANK, quotes=len(matriz_quotes)):
+                rankings = indice.ranking(matriz_quotes, k)
+            agora = time.perf_counter()
+            yield inicio, rankings, (agora - ultimo) / max(len(rankings), 1)
+            ultimo = time.perf_counter()
 
-        # Modelo de embeddings escolhido para representar textos em vetores
-        self.embedder = SentenceTransformer('paraphrase-MiniLM-L6-v2')
+    def fechar(self):
+        """Encerra os processos de codificação, se o modo multiprocesso tiver sido usado."""
+        if self.encoder_processos is not None:
+            self.encoder_processos.fechar()
+
+    def rank(self, quotes, k=1):
+        """
+        Ordena os constructos por similaridade para cada quote, processando em lotes.
+
+        Retorna:
+        - Lista (uma por quote) de listas [(constructo, similaridade), ...] com até k itens
+        - Lista com o tempo (em segundos) de cada quote, amortizado dentro do lote
+        """
+        rankings = []
+        tempos = []
+        for _, rankings_lote, tempo_medio in self._iterar_lotes(quotes, k):
+            rankings.extend(rankings_lote)
+            tempos.extend([tempo_medio] * len(rankings_lote))
+        return rankings, tempos
+
+    def classify_iter(self, quotes):
+        """Entrega (índice, constructo, justificativa, tempo) ao fim de cada lote."""
+        for inicio, rankings_lote, tempo_medio in self._iterar_lotes(quotes, 1):
+            for deslocamento, ranking in enumerate(rankings_lote):
+                nome, similaridade = ranking[0]
+                yield inicio + deslocamento, nome, f"Similaridade: {similaridade:.4f}", tempo_medio
 
     def classify(self, quotes):
         """
         Classifica uma lista de quotes com base na maior similaridade de embedding
         entre o quote e os constructos definidos.
 
-        Para cada quote:
-        - Gera o embedding do texto
-        - Compara com os embeddings dos constructos
+        Os quotes são processados em lotes de `batch_size`:
+        - Gera os embeddings normalizados do lote
+        - Calcula a similaridade com todos os constructos de uma só vez
         - Retorna o constructo mais similar e a justificativa da escolha
 
         Retorna:
         - Lista com nomes dos constructos mais similares
         - Lista com justificativas baseadas na similaridade
-        - Lista com tempo (em segundos) de cada classificação
+        - Lista com tempo (em segundos) de cada classificação, amortizado por lote
         """
-        resultados = []
-        justificativas = []
-        tempos = []
-
-        # Pré-processa os embeddings dos constructos
-        constructo_embeddings = {
-            nome: self.embedder.encode(nome + ". " + definicao, convert_to_tensor=True)
-            for nome, definicao in self.constructos.items()
-        }
-
-        for quote in quotes:
-            start = time.time()  # Início da medição de tempo
-
-            # Gera embedding do quote
-            quote_emb = self.embedder.encode(quote, convert_to_tensor=True)
-
-            # Calcula similaridade com cada constructo
-            similaridades = {
-                nome: util.cos_sim(quote_emb, emb).item()
-                for nome, emb in constructo_embeddings.items()
-            }
-
-            # Seleciona o constructo mais similar
-            melhor_constructo = max(similaridades.items(), key=lambda x: x[1])
-
-            end = time.time()
-            tempos.append(end - start)
+        rankings, tempos = self.rank(quotes, k=1)
 
-            resultados.append(melhor_constructo[0])
-            justificativas.append(f"Similaridade: {melhor_constructo[1]:.4f}")
+        resultados = [ranking[0][0] for ranking in rankings]
+        justificativas = [f"Similaridade: {ranking[0][1]:.4f}" for ranking in rankings]
 
-        return resultados, justificativas, tempos
\ No newline at end of file
+        return resultados, justificativas, tempos
@@ -1,31 +1,89 @@
-from sentence_transformers import SentenceTransformer, util
 from langchain_core.prompts import ChatPromptTemplate, FewShotChatMessagePromptTemplate
-from langchain_openai import ChatOpenAI
 from langchain_core.output_parsers import StrOutputParser
-from .base import BaseQuoteClassifier
+from core.construct_cache import embeddings_constructos
+from core.construct_index import criar_indice_constructos
+from core.embedder_registry import MODELO_EMBEDDING_PADRAO, chave_embedding, obter_embedder, resolver_backend
+from core.example_selector import SemanticExampleSelector
+from core.instrumentation import ETAPA_EMBED, ETAPA_RANK, instrumentar, span
+from core.llm_clients import obter_chat_model
+from core.llm_scheduler import estimar_tokens
+from core.quote_store import codificar_quotes
+from .base import BaseQuoteClassifier, resultado_com_falha
 import time
 
+# Quotes auditados por chamada em lote quando não há LLMScheduler
+TAMANHO_LOTE_AUDITORIA = 20
+
 class HybridQuoteClassifier(BaseQuoteClassifier):
     """
     Classificador híbrido com few-shot:
     Combina embeddings para selecionar constructos mais similares e usa exemplos anotados com FewShotPromptTemplate.
+
+    No modo cascata, quotes em que um constructo domina claramente por similaridade
+    (score e margem acima dos limiares) recebem o rótulo dos embeddings sem chamar o LLM;
+    apenas os casos ambíguos são escalados.
     """
 
-    def __init__(self, constructos, escopo, modelo="gpt-4", top_n=2, exemplos=None):
+    def __init__(self, constructos, escopo, modelo="gpt-4", top_n=2, exemplos=None,
+                 modelo_embedding=MODELO_EMBEDDING_PADRAO, device=None, quote_store=None,
+                 llm=None, scheduler=None, llm_cache=None, k_exemplos=None, max_tokens_exemplos=None,
+                 cascata=False, limiar_score=0.6, limiar_margem=0.1, auditar_cascata=False,
+                 custo_por_mil_tokens=None, backend_indice="auto", backend_embedding=None):
         """
         - constructos: dicionário {nome: definição}
         - escopo: contexto da pesquisa
         - modelo: modelo LLM da OpenAI
         - top_n: número de constructos mais similares para o prompt
         - exemplos: lista de dicionários com campos "quote", "constructo", "justificativa"
+        - modelo_embedding: modelo SentenceTransformer usado na pré-seleção
+        - device: dispositivo de execução do modelo de embeddings (None = automático)
+        - quote_store: QuoteEmbeddingStore consultado antes de codificar os quotes (opcional)
+        - llm: chat model já configurado (se None, usa o cliente ChatOpenAI compartilhado)
+        - scheduler: LLMScheduler compartilhado; se informado, as chamadas são enviadas em lotes
+        - llm_cache: cache de respostas (ex: LLMResponseCache) usado pelo cliente compartilhado
+        - k_exemplos: se informado e houver mais exemplos que isso, cada prompt recebe apenas
+          os k exemplos mais similares ao quote (seleção semântica)
+        - max_tokens_exemplos: orçamento aproximado de tokens para os exemplos selecionados
+        - cascata: se True, aceita o rótulo dos embeddings quando o top-1 passa nos limiares
+        - limiar_score: similaridade mínima (cosseno) do top-1 para aceitar sem o LLM
+        - limiar_margem: diferença mínima entre o top-1 e o top-2 para aceitar sem o LLM
+        - auditar_cascata: se True, também consulta o LLM nos quotes aceitos, apenas para medir
+          a concordância com a classificação só por LLM (útil para calibrar os limiares); as
+          consultas de auditoria vão em lotes (pelo scheduler, se houver) e falhas são só contadas
+        - custo_por_mil_tokens: preço do modelo (US$/1k tokens) para estimar a economia
+        - backend_indice: busca dos constructos mais similares ("exato", "hnsw" ou "auto")
+        - backend_embedding: inferência do modelo de embeddings ("torch", "onnx" ou "int8";
+          None = BACKEND_EMBEDDING)
         """
         self.constructos = constructos
         self.escopo = escopo
         self.modelo = modelo
         self.top_n = top_n
         self.exemplos = exemplos or []
+        self.k_exemplos = k_exemplos
+        self.max_tokens_exemplos = max_tokens_exemplos
+        self.cascata = cascata
+        self.limiar_score = limiar_score
+        self.limiar_margem = limiar_margem
+        self.auditar_cascata = auditar_cascata
+        self.custo_por_mil_tokens = custo_por_mil_tokens
+        # Contadores da cascata, acumulados entre chamadas (ex: blocos de uma mesma planilha)
+        self.estatisticas_cascata = {
+            "total": 0, "escalados": 0, "aceitos": 0, "tokens_economizados": 0,
+            "auditados": 0, "concordancias": 0, "falhas_auditoria": 0,
+        }
+        self.backend_indice = backend_indice
+        self._indice = None
 
-        self.embedder = SentenceTransformer('paraphrase-MiniLM-L6-v2')
+        self.modelo_embedding = modelo_embedding
+        self.backend_embedding = resolver_backend(backend_embedding)
+        self.chave_embedding = chave_embedding(modelo_embedding, self.backend_embedding)
+        self.embedder = obter_embedder(modelo_embedding, device, self.backend_embedding)
+        self.quote_store = quote_store
+        self.llm = llm or obter_chat_model(
+            self.modelo, temperature=0.4, cache=llm_cache, gerenciado_por_scheduler=scheduler is not None
+        )
+        self.scheduler = scheduler
 
         # Prompt do exemplo individual
         self.exemplo_prompt = ChatPromptTemplate.from_messages([
@@ -33,63 +91,246 @@ class HybridQuoteClassifier(BaseQuoteClassifier):
             ("ai", "Constructo: {constructo}\nJustificativa: {justificativa}")
         ])
 
-    def classify(self, quotes):
-        tempos = []
-        resultados = []
-        justificativas = []
+        # Prompt e chain montados uma única vez; os top-N constructos entram como variável
+        self.prompt, self.chain = self._criar_chain()
 
-        constructo_embeddings = {
-            nome: self.embedder.encode(f"{nome}. {definicao}", convert_to_tensor=True)
-            for nome, definicao in self.constructos.items()
-        }
+    def _criar_chain(self):
+        """Monta o prompt few-shot (mensagens) e a chain prompt | LLM | parser."""
+        if (self.k_exemplos is not None and len(self.exemplos) > self.k_exemplos) or self.max_tokens_exemplos:
+            # Seleção semântica: apenas os exemplos mais parecidos com cada quote
+            few_shot_prompt = FewShotChatMessagePromptTemplate(
+                example_prompt=self.exemplo_prompt,
+                example_selector=SemanticExampleSelector(
+                    self.exemplos, k=self.k_exemplos or len(self.exemplos),
+                    max_tokens=self.max_tokens_exemplos, modelo_embedding=self.modelo_embedding,
+                    backend_embedding=self.backend_embedding
+                ),
+                input_variables=["quote"]
+            )
+        else:
+            few_shot_prompt = FewShotChatMessagePromptTemplate(
+                example_prompt=self.exemplo_prompt,
+                examples=self.exemplos
+            )
 
-        for quote in quotes:
-            inicio = time.time()
+        prompt = ChatPromptTemplate.from_messages([
+            ("system", (
+                "Você é um assistente treinado em análise qualitativa.\n"
+                "Escopo: {escopo}\n"
+                "Constructos mais similares:\n{top_definicoes}"
+            )),
+            few_shot_prompt,
+            ("human", 'Quote: "{quote}"\nClassifique o trecho com Constructo e Justificativa.')
+        ])
 
-            quote_emb = self.embedder.encode(quote, convert_to_tensor=True)
-            similaridades = {
-                nome: util.cos_sim(quote_emb, emb).item()
-                for nome, emb in constructo_embeddings.items()
-            }
+        return prompt, instrumentar(prompt | self.llm | StrOutputParser())
 
-            # Seleciona top-N constructos semanticamente mais próximos
-            top_n_constructos = sorted(similaridades.items(), key=lambda x: x[1], reverse=True)[:self.top_n]
-            top_definicoes = "\n".join([f"{nome}: {self.constructos[nome]}" for nome, _ in top_n_constructos])
+    def _entradas(self, quotes):
+        """
+        Seleciona os top-N constructos de cada quote por similaridade de embeddings e
+        monta as variáveis do prompt.
 
-            # Cria prompt few-shot com estrutura de mensagens
-            few_shot_prompt = FewShotChatMessagePromptTemplate(
-                example_prompt=self.exemplo_prompt,
-                examples=self.exemplos
+        Retorna a lista de entradas, as decisões da cascata (por quote: (constructo,
+        similaridade, margem) quando o LLM pode ser dispensado, senão None) e o tempo de
+        embeddings por quote (amortizado).
+        """
+        # Índice dos constructos (embeddings normalizados do cache em disco), montado uma vez
+        if self._indice is None:
+            nomes, matriz_constructos = embeddings_constructos(
+                self.constructos, self.embedder, self.chave_embedding
             )
+            self._indice = criar_indice_constructos(nomes, matriz_constructos, backend=self.backend_indice)
 
-            prompt = ChatPromptTemplate.from_messages([
-                ("system", (
-                    "Você é um assistente treinado em análise qualitativa.\n"
-                    "Escopo: {escopo}\n"
-                    "Constructos mais similares:\n{top_definicoes}"
-                )),
-                few_shot_prompt,
-                ("human", 'Quote: "{quote}"\nClassifique o trecho com Constructo e Justificativa.')
-            ])
+        # Codifica todos os quotes em lote; o custo é distribuído igualmente entre eles
+        inicio_embeddings = time.perf_counter()
+        with span(ETAPA_EMBED, quotes=len(quotes)):
+            matriz_quotes = codificar_quotes(
+                self.embedder, self.chave_embedding, quotes, quote_store=self.quote_store
+            )
+
+        # Top-N para o prompt e ao menos os dois primeiros para a margem da cascata
+        with span(ETAPA_RANK, quotes=len(quotes)):
+            rankings = self._indice.ranking(matriz_quotes, max(self.top_n, 2))
 
-            chain = prompt | ChatOpenAI(model=self.modelo, temperature=0.4) | StrOutputParser()
+        entradas = []
+        decisoes = []
+        for quote, ordenados in zip(quotes, rankings):
+            decisoes.append(self._decidir_cascata(ordenados))
 
-            resposta = chain.invoke({
+            # Seleciona top-N constructos semanticamente mais próximos
+            top_n_constructos = ordenados[:self.top_n]
+            top_definicoes = "\n".join([f"{nome}: {self.constructos[nome]}" for nome, _ in top_n_constructos])
+
+            entradas.append({
                 "escopo": self.escopo,
                 "top_definicoes": top_definicoes,
                 "quote": quote
             })
 
-            if "Justificativa:" in resposta:
-                partes = resposta.split("Justificativa:")
-                constructo_nome = partes[0].replace("Constructo:", "").strip()
-                justificativa = partes[1].strip()
-            else:
-                constructo_nome = resposta.strip()
-                justificativa = "Justificativa não fornecida."
+        tempo_embedding = (time.perf_counter() - inicio_embeddings) / max(len(quotes), 1)
+        return entradas, decisoes, tempo_embedding
+
+    def _decidir_cascata(self, ordenados):
+        """Retorna (constructo, similaridade, margem) se o top-1 dispensa o LLM; senão None."""
+        if not self.cascata or not ordenados:
+            return None
+        nome, score = ordenados[0]
+        margem = score - (ordenados[1][1] if len(ordenados) > 1 else 0.0)
+        if score >= self.limiar_score and margem >= self.limiar_margem:
+            return nome, score, margem
+        return None
 
+    @staticmethod
+    def _interpretar_resposta(resposta):
+        """Separa constructo e justificativa da resposta do modelo."""
+        if "Justificativa:" in resposta:
+            partes = resposta.split("Justificativa:")
+            return partes[0].replace("Constructo:", "").strip(), partes[1].strip()
+        return resposta.strip(), "Justificativa não fornecida."
+
+    def classify(self, quotes):
+        resultados = [None] * len(quotes)
+        justificativas = [None] * len(quotes)
+        tempos = [0.0] * len(quotes)
+        for i, constructo_nome, justificativa, tempo in self.classify_iter(quotes):
+            resultados[i], justificativas[i], tempos[i] = constructo_nome, justificativa, tempo
+        return resultados, justificativas, tempos
+
+    def classify_iter(self, quotes):
+        """
+        Entrega (índice, constructo, justificativa, tempo) à medida que cada quote termina
+        (ou a cada lote do scheduler). Ao encerrar o gerador, nenhuma nova chamada é feita.
+
+        No modo cascata, os quotes aceitos pelos embeddings são entregues primeiro e
+        apenas os demais são enviados ao LLM. Com auditoria, os aceitos são enviados ao LLM
+        por último, em lotes, apenas para medir a concordância.
+        """
+        entradas, decisoes, tempo_embedding = self._entradas(quotes)
+        self.estatisticas_cascata["total"] += len(quotes)
+
+        escalados = []
+        aceitos = []
+        for i, (entrada, decisao) in enumerate(zip(entradas, decisoes)):
+            if decisao is None:
+                escalados.append(i)
+                continue
+            aceitos.append((entrada, decisao[0]))
+            yield (i, *self._aceitar_por_embedding(entrada, decisao), tempo_embedding)
+        self.estatisticas_cascata["escalados"] += len(escalados)
+
+        if self.scheduler is not None:
+            tamanho = self.scheduler.tamanho_lote
+            for inicio in range(0, len(escalados), tamanho):
+                lote = escalados[inicio:inicio + tamanho]
+                saidas = self._classify_agendado([entradas[i] for i in lote], tempo_embedding)
+                for i, saida in zip(lote, zip(*saidas)):
+                    yield (i, *saida)
+        else:
+            for i in escalados:
+                inicio = time.perf_counter()
+                try:
+                    constructo_nome, justificativa = self._interpretar_resposta(self.chain.invoke(entradas[i]))
+                except Exception as e:
+                    constructo_nome, justificativa = resultado_com_falha(e)
+                yield i, constructo_nome, justificativa, time.perf_counter() - inicio + tempo_embedding
+
+        if self.auditar_cascata and aceitos:
+            self._auditar(aceitos)
+
+    def _aceitar_por_embedding(self, entrada, decisao):
+        """Gera o rótulo e a justificativa de um quote aceito pela cascata e contabiliza a economia."""
+        nome, score, margem = decisao
+        estatisticas = self.estatisticas_cascata
+        estatisticas["aceitos"] += 1
+        estatisticas["tokens_economizados"] += estimar_tokens(self.prompt.format(**entrada))
+
+        justificativa = (
+            f"Classificado por similaridade de embeddings (cascata): similaridade {score:.4f}, "
+            f"margem de {margem:.4f} sobre o segundo constructo mais próximo."
+        )
+        return nome, justificativa
+
+    def _auditar(self, aceitos):
+        """
+        Consulta o LLM nos quotes aceitos pela cascata [(entrada, rótulo da cascata)], em lotes,
+        e contabiliza a concordância. O rótulo da cascata é mantido; falhas são apenas contadas.
+        """
+        estatisticas = self.estatisticas_cascata
+        tamanho = self.scheduler.tamanho_lote if self.scheduler is not None else TAMANHO_LOTE_AUDITORIA
+        for inicio in range(0, len(aceitos), tamanho):
+            lote = aceitos[inicio:inicio + tamanho]
+            respostas = self._consultar_llm([entrada for entrada, _ in lote])
+            for (_, nome), resposta in zip(lote, respostas):
+                if isinstance(resposta, Exception):
+                    estatisticas["falhas_auditoria"] += 1
+                    continue
+                rotulo_llm, _ = self._interpretar_resposta(resposta)
+                estatisticas["auditados"] += 1
+                if rotulo_llm.strip().lower() == str(nome).strip().lower():
+                    estatisticas["concordancias"] += 1
+
+    def _consultar_llm(self, entradas):
+        """
+        Envia as entradas ao LLM em lote e devolve as respostas (ou as exceções) na mesma ordem:
+        pelo LLMScheduler, se houver, senão por chain.batch.
+        """
+        if self.scheduler is not None:
+            return self.scheduler.executar(
+                self.chain, entradas, lambda entrada: estimar_tokens(self.prompt.format(**entrada))
+            )
+        return self.chain.batch(entradas, return_exceptions=True)
+
+    def resumo_cascata(self):
+        """
+        Resumo da execução em modo cascata (Markdown): taxa de escalonamento para o LLM,
+        chamadas e custo economizados e, se auditada, também a concordância com a classificação
+        só por LLM (as chamadas de auditoria são extras e não entram na economia).
+        Retorna string vazia se a cascata não estiver ativa.
+        """
+        estatisticas = self.estatisticas_cascata
+        if not self.cascata or not estatisticas.get("total"):
+            return ""
+
+        total = estatisticas["total"]
+        linhas = [
+            "### ⚡ Cascata embeddings → LLM",
+            f"- Limiares: similaridade ≥ {self.limiar_score}, margem ≥ {self.limiar_margem}",
+            f"- Escalados para o LLM: {estatisticas['escalados']}/{total} "
+            f"({estatisticas['escalados'] / total:.0%})",
+        ]
+        linhas.append(
+            f"- Chamadas economizadas: {estatisticas['aceitos']} "
+            f"(~{estatisticas['tokens_economizados']} tokens de prompt)"
+        )
+        if self.custo_por_mil_tokens:
+            custo = estatisticas["tokens_economizados"] / 1000 * self.custo_por_mil_tokens
+            linhas.append(f"- Custo estimado economizado: US$ {custo:.2f}")
+        if self.auditar_cascata:
+            auditados = estatisticas["auditados"]
+            if auditados:
+                linhas.append(
+                    f"- Concordância com o LLM nos aceitos (auditoria): {estatisticas['concordancias']}/{auditados} "
+                    f"({estatisticas['concordancias'] / auditados:.0%})"
+                )
+            if estatisticas["falhas_auditoria"]:
+                linhas.append(f"- Consultas de auditoria com erro (ignoradas): {estatisticas['falhas_auditoria']}")
+        return "\n".join(linhas)
+
+    def _classify_agendado(self, entradas, tempo_embedding):
+        """Envia todas as entradas pelo LLMScheduler (lotes com controle de cota)."""
+        inicio = time.perf_counter()
+        respostas = self._consultar_llm(entradas)
+        tempo_medio = (time.perf_counter() - inicio) / max(len(entradas), 1) + tempo_embedding
+
+        resultados = []
+        justificativas = []
+        for resposta in respostas:
+            if isinstance(resposta, Exception):
+                # Só este quote falha; as respostas já obtidas no lote são mantidas
+                constructo_nome, justificativa = resultado_com_falha(resposta)
+            else:
+                constructo_nome, justificativa = self._interpretar_resposta(resposta)
             resultados.append(constructo_nome)
             justificativas.append(justificativa)
-            tempos.append(time.time() - inicio)
 
-        return resultados, justificativas, tempos
+        return resultados, justificativas, [tempo_medio] * len(entradas)
@@ -1,15 +1,49 @@
 from langchain_core.prompts import ChatPromptTemplate, FewShotPromptTemplate, PromptTemplate
 from langchain_core.output_parsers import StrOutputParser
-from langchain_openai import ChatOpenAI
-from .base import BaseQuoteClassifier
+from core.async_utils import executar_async, iterar_em_paralelo
+from core.embedder_registry import MODELO_EMBEDDING_PADRAO
+from core.example_selector import SemanticExampleSelector
+from core.instrumentation import instrumentar
+from core.llm_clients import obter_chat_model
+from core.llm_scheduler import estimar_tokens
+from .base import BaseQuoteClassifier, resultado_com_falha
+import asyncio
 import time
 
 class LLMQuoteClassifier(BaseQuoteClassifier):
-    def __init__(self, constructos: dict, escopo: str, modelo="gpt-3.5-turbo", exemplos: list = None):
+    def __init__(self, constructos: dict, escopo: str, modelo="gpt-3.5-turbo", exemplos: list = None,
+                 max_concurrency=1, llm=None, scheduler=None, llm_cache=None,
+                 k_exemplos=None, max_tokens_exemplos=None, modelo_embedding=MODELO_EMBEDDING_PADRAO,
+                 device=None, backend_embedding=None):
+        """
+        - constructos: dicionário {nome: definição}
+        - escopo: contexto da pesquisa
+        - modelo: modelo LLM da OpenAI
+        - exemplos: lista de dicionários com campos "quote", "constructo", "justificativa"
+        - max_concurrency: número máximo de chamadas simultâneas ao LLM (1 = sequencial)
+        - llm: chat model já configurado (ex: modelo falso para testes offline);
+          se None, usa o cliente ChatOpenAI compartilhado do modelo informado
+        - scheduler: LLMScheduler compartilhado (lotes + cotas por minuto); se informado,
+          substitui o modo sequencial/assíncrono
+
+        Uma consulta que falha (erro da API, cota esgotada) não interrompe a execução: o quote
+        recebe uma JustificativaComFalha e os demais seguem normalmente.
+        - llm_cache: cache de respostas (ex: LLMResponseCache) usado pelo cliente compartilhado
+        - k_exemplos: se informado e houver mais exemplos que isso, cada prompt recebe apenas
+          os k exemplos mais similares ao quote (seleção semântica)
+        - max_tokens_exemplos: orçamento aproximado de tokens para os exemplos selecionados
+        - modelo_embedding / device / backend_embedding: modelo de embeddings usado na seleção
+          semântica dos exemplos (o mesmo do restante da execução)
+        """
         self.constructos = constructos
         self.escopo = escopo
         self.modelo = modelo
         self.exemplos = exemplos or []
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.scheduler = scheduler
+        self.modelo_embedding = modelo_embedding
+        self.device = device
+        self.backend_embedding = backend_embedding
 
         self.constructos_formatados = "\n".join([f"{k}: {v}" for k, v in self.constructos.items()])
 
@@ -20,7 +54,7 @@ class LLMQuoteClassifier(BaseQuoteClassifier):
             )
 
             self.prompt = FewShotPromptTemplate(
-                examples=self.exemplos,
+                **self._fonte_exemplos(k_exemplos, max_tokens_exemplos),
                 example_prompt=example_prompt,
                 prefix=(
                     "Com base no escopo: {escopo}\n"
@@ -48,29 +82,153 @@ class LLMQuoteClassifier(BaseQuoteClassifier):
                 """
             )
 
-        self.chain = self.prompt | ChatOpenAI(model=self.modelo, temperature=0.4) | StrOutputParser()
+        self.llm = llm or obter_chat_model(
+            self.modelo, temperature=0.4, cache=llm_cache, gerenciado_por_scheduler=scheduler is not None
+        )
+        self.chain = instrumentar(self.prompt | self.llm | StrOutputParser())
+
+    def _fonte_exemplos(self, k_exemplos, max_tokens_exemplos):
+        """
+        Define de onde vêm os exemplos do prompt few-shot: a lista completa ou,
+        quando há mais exemplos que k_exemplos (ou um orçamento de tokens), um
+        seletor semântico que escolhe os mais parecidos com cada quote.
+        """
+        if (k_exemplos is not None and len(self.exemplos) > k_exemplos) or max_tokens_exemplos:
+            return {"example_selector": SemanticExampleSelector(
+                self.exemplos, k=k_exemplos or len(self.exemplos), max_tokens=max_tokens_exemplos,
+                modelo_embedding=self.modelo_embedding, device=self.device,
+                backend_embedding=self.backend_embedding
+            )}
+        return {"examples": self.exemplos}
+
+    def _entrada(self, quote):
+        """Monta as variáveis do prompt para um quote."""
+        return {
+            "quote": quote,
+            "constructos": self.constructos_formatados,
+            "escopo": self.escopo
+        }
+
+    @staticmethod
+    def _interpretar_resposta(resposta):
+        """Separa constructo e justificativa da resposta do modelo."""
+        if "Justificativa:" in resposta:
+            partes = resposta.split("Justificativa:")
+            return partes[0].replace("Constructo:", "").strip(), partes[1].strip()
+        return resposta.strip(), "Justificativa não fornecida."
 
     def classify(self, quotes):
+        if self.scheduler is not None:
+            return self.classify_agendado(quotes)
+        if self.max_concurrency > 1:
+            return executar_async(self.classify_async(quotes))
+
         resultados = []
         justificativas = []
         tempos = []
 
         for quote in quotes:
-            start = time.time()
-            resposta = self.chain.invoke({
-                "quote": quote,
-                "constructos": self.constructos_formatados,
-                "escopo": self.escopo
-            })
-            end = time.time()
-            tempos.append(end - start)
-
-            if "Justificativa:" in resposta:
-                partes = resposta.split("Justificativa:")
-                resultados.append(partes[0].replace("Constructo:", "").strip())
-                justificativas.append(partes[1].strip())
+            constructo, justificativa, tempo = self._classificar_quote(quote)
+            resultados.append(constructo)
+            justificativas.append(justificativa)
+            tempos.append(tempo)
+
+        return resultados, justificativas, tempos
+
+    def _classificar_quote(self, quote):
+        """Classifica um único quote e retorna (constructo, justificativa, tempo)."""
+        start = time.perf_counter()
+        try:
+            resposta = self.chain.invoke(self._entrada(quote))
+        except Exception as e:
+            return (*resultado_com_falha(e), time.perf_counter() - start)
+        constructo, justificativa = self._interpretar_resposta(resposta)
+        return constructo, justificativa, time.perf_counter() - start
+
+    def classify_iter(self, quotes):
+        """
+        Entrega (índice, constructo, justificativa, tempo) à medida que cada quote termina.
+
+        - Com scheduler: processa em lotes do tamanho configurado no agendador
+        - Com max_concurrency > 1: até max_concurrency quotes em paralelo
+        - Caso contrário: um quote por vez
+        Ao encerrar o gerador, nenhuma nova chamada ao LLM é iniciada.
+        """
+        if self.scheduler is not None:
+            tamanho = self.scheduler.tamanho_lote
+            for inicio in range(0, len(quotes), tamanho):
+                resultados, justificativas, tempos = self.classify_agendado(quotes[inicio:inicio + tamanho])
+                for deslocamento, saida in enumerate(zip(resultados, justificativas, tempos)):
+                    yield (inicio + deslocamento, *saida)
+            return
+
+        if self.max_concurrency > 1:
+            for i, saida in iterar_em_paralelo(self._classificar_quote, quotes, self.max_concurrency):
+                if isinstance(saida, Exception):
+                    saida = (*resultado_com_falha(saida), 0.0)
+                yield (i, *saida)
+            return
+
+        for i, quote in enumerate(quotes):
+            yield (i, *self._classificar_quote(quote))
+
+    async def classify_async(self, quotes):
+        """
+        Versão assíncrona de classify: dispara até `max_concurrency` chamadas
+        simultâneas (chain.ainvoke) e devolve os resultados na ordem dos quotes.
+
+        O tempo de cada quote corresponde à latência da sua própria chamada.
+        """
+        semaforo = asyncio.Semaphore(self.max_concurrency)
+
+        async def classificar_quote(quote):
+            async with semaforo:
+                start = time.perf_counter()
+                try:
+                    resposta = await self.chain.ainvoke(self._entrada(quote))
+                except Exception as e:
+                    resposta = e
+                return resposta, time.perf_counter() - start
+
+        respostas = await asyncio.gather(*(classificar_quote(quote) for quote in quotes))
+
+        resultados = []
+        justificativas = []
+        tempos = []
+        for resposta, tempo in respostas:
+            if isinstance(resposta, Exception):
+                constructo, justificativa = resultado_com_falha(resposta)
             else:
-                resultados.append(resposta.strip())
-                justificativas.append("Justificativa não fornecida.")
+                constructo, justificativa = self._interpretar_resposta(resposta)
+            resultados.append(constructo)
+            justificativas.append(justificativa)
+            tempos.append(tempo)
 
         return resultados, justificativas, tempos
+
+    def classify_agendado(self, quotes):
+        """
+        Classifica os quotes por meio do LLMScheduler (lotes com controle de cota).
+        O tempo de cada quote é o tempo total dividido pela quantidade de quotes.
+        Erros que o agendador devolve (não repetíveis ou com tentativas esgotadas) viram
+        falhas apenas dos quotes correspondentes; as respostas já obtidas são mantidas.
+        """
+        entradas = [self._entrada(quote) for quote in quotes]
+
+        start = time.perf_counter()
+        respostas = self.scheduler.executar(
+            self.chain, entradas, lambda entrada: estimar_tokens(self.prompt.format(**entrada))
+        )
+        tempo_medio = (time.perf_counter() - start) / max(len(quotes), 1)
+
+        resultados = []
+        justificativas = []
+        for resposta in respostas:
+            if isinstance(resposta, Exception):
+                constructo, justificativa = resultado_com_falha(resposta)
+            else:
+                constructo, justificativa = self._interpretar_resposta(resposta)
+            resultados.append(constructo)
+            justificativas.append(justificativa)
+
+        return resultados, justificativas, [tempo_medio] * len(quotes)
@@ -1,36 +1,71 @@
 from langchain_core.prompts import ChatPromptTemplate, FewShotPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
-from langchain_openai import ChatOpenAI
-from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
-import time, re
+from langchain_core.utils.json import parse_json_markdown
+import asyncio, time, re
 
-from .base import BaseQuoteClassifier
+from core.async_utils import executar_async, iterar_em_paralelo
+from core.construct_cache import embeddings_constructos
+from core.construct_index import criar_indice_constructos
+from core.instrumentation import ETAPA_EMBED, ETAPA_RANK, instrumentar, span
+from core.embedder_registry import MODELO_EMBEDDING_PADRAO, chave_embedding, obter_embedder, resolver_backend
+from core.llm_clients import obter_chat_model
+from core.llm_scheduler import estimar_tokens
+from core.quote_store import codificar_quotes
+from .base import BaseQuoteClassifier, JustificativaComFalha
+
+# Modos de avaliação pelo LLM
+MODO_PAR = "par"            # Uma chamada por par (quote, constructo candidato)
+MODO_CONJUNTO = "conjunto"  # Uma chamada por quote, avaliando todos os candidatos juntos
 
 class ConstructSimilarityClassifier(BaseQuoteClassifier):
     """
     Classificador híbrido que utiliza embeddings para pré-seleção
     e LLM (via LangChain) para avaliação semântica contextual.
     Pode utilizar exemplos fornecidos pelo usuário.
-    Retorna os dois constructos mais aderentes, com percentuais e justificativas.
+    Retorna os constructos mais aderentes (dois, por padrão), com percentuais e justificativas.
+
+    As avaliações do LLM de um mesmo quote são feitas em paralelo, e vários quotes
+    são processados ao mesmo tempo, limitados a `max_concurrency` chamadas simultâneas.
+
+    No modo "conjunto", todos os candidatos de um quote são enviados em um único prompt
+    e o modelo devolve uma pontuação e justificativa por constructo (JSON), reduzindo
+    o número de requisições e de tokens de prefixo em cerca de k vezes.
     """
-    def __init__(self, constructos, modelo="gpt-4o", peso_emb=0.4, peso_llm=0.6, escopo=None, exemplos=None):
+    def __init__(self, constructos, modelo="gpt-4o", peso_emb=0.4, peso_llm=0.6, escopo=None, exemplos=None,
+                 modelo_embedding=MODELO_EMBEDDING_PADRAO, device=None, quote_store=None,
+                 llm=None, scheduler=None, top_k=2, max_concurrency=2, modo_avaliacao=MODO_PAR,
+                 llm_cache=None, backend_indice="auto", backend_embedding=None):
+        if modo_avaliacao not in (MODO_PAR, MODO_CONJUNTO):
+            raise ValueError(f"Modo de avaliação inválido: {modo_avaliacao}")
+
         self.constructos = constructos
+        self.modo_avaliacao = modo_avaliacao
+        self.top_k = top_k
+        self.max_concurrency = max(1, int(max_concurrency))
         self.peso_emb = peso_emb
         self.peso_llm = peso_llm
         self.escopo = escopo or "Sem escopo definido."
         self.exemplos = exemplos or []
 
-        self.embedder = SentenceTransformer('paraphrase-MiniLM-L6-v2')
+        self.modelo_embedding = modelo_embedding
+        self.backend_embedding = resolver_backend(backend_embedding)
+        self.chave_embedding = chave_embedding(modelo_embedding, self.backend_embedding)
+        self.embedder = obter_embedder(modelo_embedding, device, self.backend_embedding)
+        self.quote_store = quote_store
 
-        self.llm = ChatOpenAI(model=modelo, temperature=0, request_timeout=30)
+        self.llm = llm or obter_chat_model(
+            modelo, temperature=0, request_timeout=30, cache=llm_cache,
+            gerenciado_por_scheduler=scheduler is not None,
+        )
+        self.scheduler = scheduler
         self.parser = StrOutputParser()
 
-        # Pré-calcula os embeddings dos constructos
-        self.constructo_embeddings = {
-            nome: self.embedder.encode(definicao)
-            for nome, definicao in self.constructos.items()
-        }
+        # Pré-calcula os embeddings dos constructos (apenas a definição), via cache em disco
+        nomes, matriz_constructos = embeddings_constructos(
+            self.constructos, self.embedder, self.chave_embedding, incluir_nome=False
+        )
+        # Índice de busca (exato ou HNSW para codebooks grandes) usado na pré-seleção
+        self.indice_constructos = criar_indice_constructos(nomes, matriz_constructos, backend=backend_indice)
 
         if self.exemplos:
             # Prompt com exemplos (few-shot)
@@ -70,58 +105,326 @@ class ConstructSimilarityClassifier(BaseQuoteClassifier):
                 Justificativa: <texto explicativo>
             """)
 
+        # Chain montada uma única vez e reutilizada em todas as avaliações
+        self.chain = instrumentar(self.prompt_template | self.llm | self.parser)
+
+        # Prompt do modo conjunto: todos os candidatos do quote em uma única chamada
+        exemplos_formatados = "\n".join(
+            f'Quote: "{ex["quote"]}"\nConstructo: {ex["constructo"]}\nJustificativa: {ex["justificativa"]}\n'
+            for ex in self.exemplos
+        )
+        self.prompt_conjunto = ChatPromptTemplate.from_template("""
+                Contexto da pesquisa: {escopo}
+
+                Avalie o grau de correspondência entre um trecho de entrevista (quote) e CADA um
+                dos constructos teóricos candidatos abaixo.
+                {exemplos}
+                Constructos candidatos (nome: definição):
+                {candidatos}
+
+                Trecho de entrevista (quote):
+                {quote}
+
+                Responda apenas com uma lista JSON, com um objeto por constructo candidato:
+                [{{"constructo": "<nome>", "similaridade": <número de 0 a 100>, "justificativa": "<texto explicativo>"}}]
+            """).partial(exemplos=(
+                "Veja os exemplos abaixo para entender o padrão de classificação:\n" + exemplos_formatados
+                if exemplos_formatados else ""
+            ))
+        self.chain_conjunto = instrumentar(self.prompt_conjunto | self.llm | self.parser)
+
+    def _top_constructos(self, quotes):
+        """
+        Codifica os quotes e retorna, para cada um, os top-k constructos mais similares
+        [(nome, similaridade)], junto com o tempo de embeddings por quote (amortizado).
+        """
+        # Codifica todos os quotes em lote; o custo é distribuído igualmente entre eles
+        inicio_embeddings = time.perf_counter()
+        with span(ETAPA_EMBED, quotes=len(quotes)):
+            matriz_quotes = codificar_quotes(
+                self.embedder, self.chave_embedding, quotes, quote_store=self.quote_store
+            )
+
+        # Top-k constructos de cada quote
+        with span(ETAPA_RANK, quotes=len(quotes)):
+            tops = self.indice_constructos.ranking(matriz_quotes, self.top_k)
+
+        tempo_embedding = (time.perf_counter() - inicio_embeddings) / max(len(quotes), 1)
+        return tops, tempo_embedding
+
+    def _formatar_resultado(self, top_constructos, avaliacoes):
+        """
+        Combina as similaridades de embedding com as avaliações do LLM de um quote.
+        Cada avaliação é (similaridade, justificativa) ou a exceção ocorrida na consulta;
+        se alguma falhou, a justificativa é uma JustificativaComFalha (o quote não vai ao diário).
+        Um quote sem constructos candidatos também é devolvido como falha.
+        """
+        if not top_constructos:
+            return "", JustificativaComFalha("⚠️ Nenhum constructo candidato encontrado para o quote.")
+
+        constructos_resultado = []
+        justificativas_quote = []
+        falhou = False
+
+        for (nome, sim_emb), avaliacao in zip(top_constructos, avaliacoes):
+            if isinstance(avaliacao, Exception):
+                falhou = True
+                sim_llm = 0.0
+                just_llm = f"⚠️ Erro ao consultar o modelo: {str(avaliacao)}"
+            else:
+                sim_llm, just_llm = avaliacao
+
+            media = self._calcular_media(sim_emb * 100, sim_llm)
+            constructos_resultado.append(f"{nome} ({media:.2f}%)")
+            justificativas_quote.append(
+                f"→ {nome}:\n  Emb: {sim_emb * 100:.2f}%, LLM: {sim_llm:.2f}%, Média: {media:.2f}%\n  Justificativa: {just_llm}"
+            )
+
+        justificativa = "\n".join(justificativas_quote)
+        return ", ".join(constructos_resultado), JustificativaComFalha(justificativa) if falhou else justificativa
+
     def classify(self, quotes):
-        resultados = []
-        justificativas = []
-        tempos = []
+        tops, tempo_embedding = self._top_constructos(quotes)
+        if self.scheduler is not None:
+            return self._classify_agendado(quotes, tops, tempo_embedding)
+        return executar_async(self.classify_async(quotes, tops, tempo_embedding))
+
+    def classify_iter(self, quotes):
+        """
+        Entrega (índice, constructos, justificativas, tempo) assim que todas as avaliações
+        de um quote terminam. As chamadas ao LLM (de um mesmo quote e entre quotes) rodam
+        em paralelo, limitadas a `max_concurrency`; ao encerrar o gerador, nenhuma nova
+        chamada é iniciada.
+        """
+        tops, tempo_embedding = self._top_constructos(quotes)
+
+        if self.scheduler is not None:
+            tamanho = self.scheduler.tamanho_lote
+            for inicio in range(0, len(quotes), tamanho):
+                saidas = self._classify_agendado(
+                    quotes[inicio:inicio + tamanho], tops[inicio:inicio + tamanho], tempo_embedding
+                )
+                for deslocamento, saida in enumerate(zip(*saidas)):
+                    yield (inicio + deslocamento, *saida)
+            return
+
+        # Quotes sem candidatos não geram chamadas: saem logo como falha
+        for idx, top in enumerate(tops):
+            if not top:
+                yield (idx, *self._formatar_resultado(top, []), tempo_embedding)
+
+        if self.modo_avaliacao == MODO_CONJUNTO:
+            tarefas = [(idx, None) for idx, top in enumerate(tops) if top]
+        else:
+            tarefas = [(idx, nome) for idx, top in enumerate(tops) for nome, _ in top]
 
-        for idx, quote in enumerate(quotes, start=1):
-            print(f"\n🔍 Classificando quote {idx}/{len(quotes)}: {quote[:60]}...")
+        def executar(tarefa):
+            idx, nome = tarefa
+            inicio = time.perf_counter()
+            try:
+                if nome is None:
+                    resposta = self.chain_conjunto.invoke(self._entrada_conjunto(quotes[idx], tops[idx]))
+                    avaliacao = self._interpretar_conjunto(resposta, tops[idx])
+                else:
+                    avaliacao = self._avaliar_similaridade_modelo(self.constructos[nome], quotes[idx])
+            except Exception as e:
+                avaliacao = [e] * len(tops[idx]) if nome is None else e
+            return avaliacao, inicio, time.perf_counter()
 
-            start = time.time()
-            quote_emb = self.embedder.encode(quote)
+        parciais = {}
+        for posicao, (avaliacao, inicio, fim) in iterar_em_paralelo(executar, tarefas, self.max_concurrency):
+            idx, nome = tarefas[posicao]
+            if nome is None:
+                avaliacoes, janela = avaliacao, (inicio, fim)
+            else:
+                registro = parciais.setdefault(idx, {"avaliacoes": {}, "inicio": inicio, "fim": fim})
+                registro["avaliacoes"][nome] = avaliacao
+                registro["inicio"] = min(registro["inicio"], inicio)
+                registro["fim"] = max(registro["fim"], fim)
+                if len(registro["avaliacoes"]) < len(tops[idx]):
+                    continue
+                del parciais[idx]
+                avaliacoes = [registro["avaliacoes"][n] for n, _ in tops[idx]]
+                janela = (registro["inicio"], registro["fim"])
 
-            # Similaridade com constructos
-            similaridades_emb = {
-                nome: cosine_similarity([quote_emb], [emb])[0][0]
-                for nome, emb in self.constructo_embeddings.items()
-            }
+            resultado, justificativa = self._formatar_resultado(tops[idx], avaliacoes)
+            yield idx, resultado, justificativa, janela[1] - janela[0] + tempo_embedding
 
-            # Top 2 constructos
-            top_constructos = sorted(similaridades_emb.items(), key=lambda x: x[1], reverse=True)[:2]
+    async def classify_async(self, quotes, tops, tempo_embedding=0.0):
+        """
+        Avalia os top-k constructos de cada quote em paralelo e processa os quotes
+        de forma concorrente, sob um limite global de `max_concurrency` chamadas ao LLM.
+        Os resultados são devolvidos na ordem dos quotes.
+        """
+        semaforo = asyncio.Semaphore(self.max_concurrency)
 
-            constructos_resultado = []
-            justificativas_quote = []
+        async def avaliar(definicao, quote):
+            async with semaforo:
+                try:
+                    return await self._aavaliar_similaridade_modelo(definicao, quote)
+                except Exception as e:
+                    return e
 
-            for nome, sim_emb in top_constructos:
-                definicao = self.constructos[nome]
+        async def avaliar_conjunto(quote, top_constructos):
+            if not top_constructos:
+                return []
+            async with semaforo:
                 try:
-                    sim_llm, just_llm = self._avaliar_similaridade_modelo(definicao, quote)
+                    resposta = await self.chain_conjunto.ainvoke(self._entrada_conjunto(quote, top_constructos))
+                    return self._interpretar_conjunto(resposta, top_constructos)
                 except Exception as e:
-                    sim_llm = 0.0
-                    just_llm = f"⚠️ Erro ao consultar o modelo: {str(e)}"
+                    return [e] * len(top_constructos)
 
-                media = self._calcular_media(sim_emb * 100, sim_llm)
-                constructos_resultado.append(f"{nome} ({media:.2f}%)")
-                justificativas_quote.append(
-                    f"→ {nome}:\n  Emb: {sim_emb * 100:.2f}%, LLM: {sim_llm:.2f}%, Média: {media:.2f}%\n  Justificativa: {just_llm}"
+        async def classificar_quote(idx, quote, top_constructos):
+            start = time.perf_counter()
+            if self.modo_avaliacao == MODO_CONJUNTO:
+                avaliacoes = await avaliar_conjunto(quote, top_constructos)
+            else:
+                avaliacoes = await asyncio.gather(
+                    *(avaliar(self.constructos[nome], quote) for nome, _ in top_constructos)
                 )
+            resultado, justificativa = self._formatar_resultado(top_constructos, avaliacoes)
+            return resultado, justificativa, time.perf_counter() - start + tempo_embedding
 
-            resultados.append(", ".join(constructos_resultado))
-            justificativas.append("\n".join(justificativas_quote))
-            tempos.append(time.time() - start)
+        saidas = await asyncio.gather(*(
+            classificar_quote(idx, quote, top_constructos)
+            for idx, (quote, top_constructos) in enumerate(zip(quotes, tops), start=1)
+        ))
 
+        resultados = [resultado for resultado, _, _ in saidas]
+        justificativas = [justificativa for _, justificativa, _ in saidas]
+        tempos = [tempo for _, _, tempo in saidas]
         return resultados, justificativas, tempos
 
+    def _classify_agendado(self, quotes, tops, tempo_embedding):
+        """Envia todas as avaliações pelo LLMScheduler em lotes."""
+        if self.modo_avaliacao == MODO_CONJUNTO:
+            return self._classify_agendado_conjunto(quotes, tops, tempo_embedding)
+
+        entradas = [
+            {"escopo": self.escopo, "definicao": self.constructos[nome], "quote": quote}
+            for quote, top_constructos in zip(quotes, tops)
+            for nome, _ in top_constructos
+        ]
+
+        inicio = time.perf_counter()
+        respostas = self.scheduler.executar(
+            self.chain, entradas, lambda entrada: estimar_tokens(self.prompt_template.format(**entrada))
+        )
+        tempo_medio = (time.perf_counter() - inicio) / max(len(quotes), 1) + tempo_embedding
+
+        resultados = []
+        justificativas = []
+        posicao = 0
+        for top_constructos in tops:
+            avaliacoes = [
+                resposta if isinstance(resposta, Exception) else self._interpretar_avaliacao(resposta)
+                for resposta in respostas[posicao:posicao + len(top_constructos)]
+            ]
+            posicao += len(top_constructos)
+
+            resultado, justificativa = self._formatar_resultado(top_constructos, avaliacoes)
+            resultados.append(resultado)
+            justificativas.append(justificativa)
+
+        return resultados, justificativas, [tempo_medio] * len(quotes)
+
+    def _classify_agendado_conjunto(self, quotes, tops, tempo_embedding):
+        """Envia uma avaliação por quote (todos os candidatos juntos) pelo LLMScheduler."""
+        entradas = [self._entrada_conjunto(quote, top) for quote, top in zip(quotes, tops) if top]
+
+        inicio = time.perf_counter()
+        respostas = iter(self.scheduler.executar(
+            self.chain_conjunto, entradas,
+            lambda entrada: estimar_tokens(self.prompt_conjunto.format(**entrada))
+        ))
+        tempo_medio = (time.perf_counter() - inicio) / max(len(quotes), 1) + tempo_embedding
+
+        resultados = []
+        justificativas = []
+        for top_constructos in tops:
+            if not top_constructos:
+                # Quote sem candidatos (não enviado ao modelo)
+                avaliacoes = []
+            else:
+                resposta = next(respostas)
+                if isinstance(resposta, Exception):
+                    avaliacoes = [resposta] * len(top_constructos)
+                else:
+                    avaliacoes = self._interpretar_conjunto(resposta, top_constructos)
+
+            resultado, justificativa = self._formatar_resultado(top_constructos, avaliacoes)
+            resultados.append(resultado)
+            justificativas.append(justificativa)
+
+        return resultados, justificativas, [tempo_medio] * len(quotes)
+
+    def _entrada_conjunto(self, quote, top_constructos):
+        """Monta as variáveis do prompt do modo conjunto para um quote."""
+        return {
+            "escopo": self.escopo,
+            "candidatos": "\n".join(f"- {nome}: {self.constructos[nome]}" for nome, _ in top_constructos),
+            "quote": quote
+        }
+
+    @staticmethod
+    def _interpretar_conjunto(resposta, top_constructos):
+        """
+        Converte a resposta JSON do modo conjunto em [(similaridade, justificativa)],
+        na mesma ordem dos candidatos. Candidatos ausentes recebem similaridade 0.
+
+        Se a resposta não traz nenhuma avaliação legível (JSON inválido ou vazio), todos os
+        candidatos recebem o erro, para que o quote seja marcado como falha e refeito ao retomar.
+        """
+        try:
+            itens = parse_json_markdown(resposta)
+        except Exception:
+            itens = None
+        if isinstance(itens, dict):
+            itens = [itens]
+
+        avaliacoes = {}
+        for item in itens if isinstance(itens, list) else []:
+            if not isinstance(item, dict):
+                continue
+            nome = str(item.get("constructo", "")).strip().casefold()
+            try:
+                similaridade = float(str(item.get("similaridade", 0)).rstrip("%"))
+            except ValueError:
+                similaridade = 0.0
+            justificativa = str(item.get("justificativa") or "Justificativa não identificada.").strip()
+            avaliacoes[nome] = (similaridade, justificativa)
+
+        if not avaliacoes:
+            erro = ValueError(f"resposta do modo conjunto sem uma lista JSON válida: {resposta[:200]!r}")
+            return [erro] * len(top_constructos)
+
+        return [
+            avaliacoes.get(str(nome).strip().casefold(), (0.0, "Constructo não avaliado pelo modelo."))
+            for nome, _ in top_constructos
+        ]
+
     def _avaliar_similaridade_modelo(self, definicao, quote):
         """Executa LLM para avaliar correspondência entre quote e definição"""
-        chain = self.prompt_template | self.llm | self.parser
-        resposta = chain.invoke({
+        resposta = self.chain.invoke({
+            "escopo": self.escopo,
+            "definicao": definicao,
+            "quote": quote
+        })
+        return self._interpretar_avaliacao(resposta)
+
+    async def _aavaliar_similaridade_modelo(self, definicao, quote):
+        """Versão assíncrona de _avaliar_similaridade_modelo (chain.ainvoke)."""
+        resposta = await self.chain.ainvoke({
             "escopo": self.escopo,
             "definicao": definicao,
             "quote": quote
         })
+        return self._interpretar_avaliacao(resposta)
 
+    @staticmethod
+    def _interpretar_avaliacao(resposta):
+        """Extrai o percentual de similaridade e a justificativa da resposta do modelo."""
         match = re.search(r"Similaridade:\s*(\d+(?:\.\d+)?)%", resposta)
         just_match = re.search(r"Justificativa:\s*(.*)", resposta, re.DOTALL)
 
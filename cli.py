@@ -0,0 +1,241 @@
+"""
+Classificação em lote sem a interface Gradio.
+
+Processa uma ou mais planilhas de quotes (ou pastas com planilhas) com o mesmo conjunto
+de constructos, escopo e classificador. O modelo de embeddings, os caches e o agendador
+do LLM são compartilhados entre os arquivos. O progresso é exibido no terminal e, ao
+final, um resumo JSON com os números de cada arquivo (quotes/s, latência, tokens) é gravado
+junto aos resultados.
+
+Ctrl+C interrompe a classificação em andamento de forma segura (o resultado parcial é gravado
+e uma nova execução com a mesma configuração retoma de onde parou).
+
+Uso:
+    python cli.py --constructos data/exemplo_constructos.xlsx --coluna-quote Quote data/exemplo_quotes.xlsx
+    python cli.py --constructos constructos.xlsx --escopo-arquivo escopo.txt --classificador openai-4 \\
+        --exemplos exemplos.xlsx --concorrencia 8 --coluna-quote Quote --formato-saida parquet entrevistas/
+"""
+import argparse
+import glob
+import json
+import os
+import signal
+import sys
+import time
+from datetime import datetime
+
+from dotenv import load_dotenv
+
+from core.dataset_loader import TAMANHO_BLOCO_PADRAO
+from core.result_writer import FORMATOS_SAIDA, formato_saida_padrao
+
+# Mesmos nomes de classificador usados na interface
+CLASSIFICADORES = (
+    "EmbeddingQuoteClassifier", "openai-3.5", "openai-4",
+    "HybridQuoteClassifier", "ConstructSimilarityClassifier",
+)
+
+# Classificadores que usam o modelo de embeddings (pré-carregado uma vez para todos os arquivos)
+CLASSIFICADORES_COM_EMBEDDINGS = ("EmbeddingQuoteClassifier", "HybridQuoteClassifier", "ConstructSimilarityClassifier")
+
+# Extensões reconhecidas ao expandir pastas de entrada
+EXTENSOES_QUOTES = (".xlsx", ".csv", ".parquet", ".arrow")
+
+
+def listar_planilhas(entradas):
+    """Expande pastas em planilhas de quotes (ordenadas), ignorando arquivos temporários do Excel."""
+    arquivos = []
+    for entrada in entradas:
+        if os.path.isdir(entrada):
+            encontrados = sorted(
+                caminho for caminho in glob.glob(os.path.join(entrada, "*"))
+                if caminho.lower().endswith(EXTENSOES_QUOTES) and not os.path.basename(caminho).startswith("~$")
+            )
+            arquivos.extend(encontrados)
+        elif os.path.isfile(entrada):
+            arquivos.append(entrada)
+        else:
+            raise FileNotFoundError(f"Arquivo ou pasta não encontrado: {entrada}")
+    return arquivos
+
+
+class ProgressoTerminal:
+    """Exibe o progresso de um arquivo no terminal, no máximo uma linha a cada `intervalo` segundos."""
+
+    def __init__(self, nome, intervalo=2.0):
+        self.nome = nome
+        self.intervalo = intervalo
+        self.inicio = time.perf_counter()
+        self._ultima = 0.0
+
+    def __call__(self, processados, total):
+        agora = time.perf_counter()
+        if agora - self._ultima < self.intervalo and processados != total:
+            return
+        self._ultima = agora
+        decorrido = agora - self.inicio
+        taxa = processados / decorrido if decorrido else 0.0
+        linha = f"[{self.nome}] {processados}"
+        if total:
+            restante = (total - processados) / taxa if taxa else 0.0
+            linha += f"/{total} ({processados / total:.0%}) · restante ~{restante:.0f}s"
+        print(f"{linha} · {taxa:.1f} quotes/s", flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("quotes", nargs="+", help="planilhas de quotes (.xlsx, .csv, .parquet, .arrow) ou pastas")
+    parser.add_argument("--constructos", required=True, help="planilha com nome e definição dos constructos")
+    parser.add_argument("--coluna-quote", required=True, help="coluna com os quotes")
+    parser.add_argument("--coluna-classificacao", default="Classificação",
+                        help="coluna onde a classificação é gravada (criada se não existir)")
+    escopo = parser.add_mutually_exclusive_group()
+    escopo.add_argument("--escopo", default="", help="texto do escopo da pesquisa")
+    escopo.add_argument("--escopo-arquivo", help="arquivo de texto com o escopo da pesquisa")
+    parser.add_argument("--classificador", choices=CLASSIFICADORES, default="EmbeddingQuoteClassifier")
+    parser.add_argument("--exemplos", help="planilha de exemplos anotados (few-shot)")
+    parser.add_argument("--colunas-exemplos", nargs=3, metavar=("QUOTE", "CONSTRUCTO", "JUSTIFICATIVA"),
+                        help="colunas da planilha de exemplos (padrão: Quote Constructo Justificativa)")
+    parser.add_argument("--k-exemplos", type=int,
+                        help="envia apenas os k exemplos mais similares a cada quote (padrão: todos)")
+    parser.add_argument("--concorrencia", type=int, default=int(os.getenv("MAX_CONCORRENCIA_LLM", "1")),
+                        help="chamadas simultâneas ao LLM")
+    parser.add_argument("--modo-avaliacao", choices=("par", "conjunto"), default="par",
+                        help="modo do ConstructSimilarityClassifier")
+    parser.add_argument("--cascata", action="store_true", help="ativa a cascata no HybridQuoteClassifier")
+    parser.add_argument("--limiar-score", type=float, default=0.6)
+    parser.add_argument("--limiar-margem", type=float, default=0.1)
+    parser.add_argument("--auditar-cascata", action="store_true")
+    parser.add_argument("--processos-embedding", type=int, default=int(os.getenv("PROCESSOS_EMBEDDING", "1")))
+    parser.add_argument("--sem-cache-llm", action="store_true", help="ignora o cache local de respostas do LLM")
+    parser.add_argument("--recomecar", action="store_true",
+                        help="descarta o diário de execuções anteriores em vez de retomar")
+    parser.add_argument("--colunas-saida", nargs="+", help="colunas copiadas para o resultado (padrão: todas)")
+    parser.add_argument("--tamanho-bloco", type=int, default=TAMANHO_BLOCO_PADRAO)
+    parser.add_argument("--formato-saida", choices=FORMATOS_SAIDA, default=os.getenv("FORMATO_SAIDA", "").lower() or formato_saida_padrao())
+    parser.add_argument("--saida", default="results", help="pasta dos arquivos de resultado")
+    parser.add_argument("--resumo", help="arquivo JSON do resumo (padrão: <saida>/resumo_<data>.json)")
+    parser.add_argument("--intervalo-progresso", type=float, default=2.0, help="segundos entre linhas de progresso")
+    args = parser.parse_args()
+
+    from main_controller import MainController
+
+    planilhas = listar_planilhas(args.quotes)
+    if not planilhas:
+        parser.error("nenhuma planilha de quotes encontrada nas entradas informadas")
+
+    controller = MainController()
+    controller.carregar_constructos_de_planilha(args.constructos)
+    if args.escopo_arquivo:
+        with open(args.escopo_arquivo, encoding="utf-8") as f:
+            controller.salvar_escopo(f.read().strip())
+    else:
+        controller.salvar_escopo(args.escopo)
+    exemplos = None
+    if args.exemplos:
+        exemplos = controller.carregar_exemplos_anotados(args.exemplos, *(args.colunas_exemplos or ()))
+
+    print(f"📚 {len(controller.construct_loader.get_constructs())} constructos · {len(planilhas)} planilha(s) · "
+          f"classificador {args.classificador}", flush=True)
+    if args.classificador in CLASSIFICADORES_COM_EMBEDDINGS:
+        # Carregado uma vez e reaproveitado em todos os arquivos
+        controller.aquecer_modelos()
+
+    # Ctrl+C: interrompe o arquivo atual com segurança; um segundo Ctrl+C encerra imediatamente
+    def interromper(sinal, quadro):
+        if controller.verificar_interrupcao():
+            raise KeyboardInterrupt
+        print("\n⚠️ Interrupção solicitada (Ctrl+C novamente para sair imediatamente).", flush=True)
+        controller.solicitar_interrupcao()
+
+    signal.signal(signal.SIGINT, interromper)
+
+    os.makedirs(args.saida, exist_ok=True)
+    inicio_execucao = datetime.now()
+    resultados = []
+    for numero, planilha in enumerate(planilhas, start=1):
+        if controller.verificar_interrupcao():
+            resultados.append({"entrada": planilha, "estado": "não iniciado"})
+            continue
+
+        nome = os.path.basename(planilha)
+        print(f"\n▶️ ({numero}/{len(planilhas)}) {planilha}", flush=True)
+        try:
+            controller.carregar_planilha_quotes(planilha)
+            status, arquivo_saida = controller.classificar(
+                col_quote=args.coluna_quote,
+                col_class=args.coluna_classificacao,
+                modelo=args.classificador,
+                progress=ProgressoTerminal(nome, args.intervalo_progresso),
+                deve_interromper=controller.verificar_interrupcao,
+                exemplos=exemplos,
+                max_concurrency=args.concorrencia,
+                modo_avaliacao=args.modo_avaliacao,
+                retomar=not args.recomecar,
+                usar_cache_llm=not args.sem_cache_llm,
+                k_exemplos=args.k_exemplos,
+                cascata=args.cascata,
+                limiar_score=args.limiar_score,
+                limiar_margem=args.limiar_margem,
+                auditar_cascata=args.auditar_cascata,
+                n_processos_embedding=args.processos_embedding,
+                colunas_saida=args.colunas_saida,
+                tamanho_bloco=args.tamanho_bloco,
+                formato_saida=args.formato_saida,
+                diretorio_saida=args.saida,
+            )
+        except Exception as e:
+            print(f"❌ {nome}: {e}", flush=True)
+            resultados.append({"entrada": planilha, "estado": "erro", "erro": str(e)})
+            continue
+
+        execucao = controller.ultima_execucao
+        segundos = execucao["segundos"]
+        resultados.append({
+            "entrada": planilha,
+            "estado": "interrompido" if execucao["interrompido"] else "concluído",
+            **execucao,
+            "quotes_por_segundo": round(execucao["quotes"] / segundos, 2) if segundos else None,
+        })
+        retomados = f", {execucao['retomados']} retomados do diário" if execucao["retomados"] else ""
+        print(f"✅ {nome} → {arquivo_saida} ({execucao['quotes']} quotes em {segundos:.1f}s{retomados})", flush=True)
+
+    concluidos = [r for r in resultados if r["estado"] in ("concluído", "interrompido")]
+    total_quotes = sum(r["quotes"] for r in concluidos)
+    total_retomados = sum(r["retomados"] for r in concluidos)
+    total_segundos = sum(r["segundos"] for r in concluidos)
+    resumo = {
+        "inicio": inicio_execucao.isoformat(timespec="seconds"),
+        "fim": datetime.now().isoformat(timespec="seconds"),
+        "config": {k: v for k, v in vars(args).items() if k not in ("quotes", "resumo")},
+        "total": {
+            "arquivos": len(planilhas),
+            "concluidos": sum(1 for r in resultados if r["estado"] == "concluído"),
+            "erros": sum(1 for r in resultados if r["estado"] == "erro"),
+            "quotes": total_quotes,
+            "retomados": total_retomados,
+            "segundos": round(total_segundos, 3),
+            "quotes_por_segundo": round(total_quotes / total_segundos, 2) if total_segundos else None,
+        },
+        "arquivos": resultados,
+    }
+
+    caminho_resumo = args.resumo or os.path.join(
+        args.saida, f"resumo_{inicio_execucao.strftime('%Y%m%d_%H%M%S')}.json"
+    )
+    with open(caminho_resumo, "w", encoding="utf-8") as f:
+        json.dump(resumo, f, ensure_ascii=False, indent=2, default=str)
+
+    t = resumo["total"]
+    print(f"\n📊 {t['concluidos']}/{t['arquivos']} arquivo(s) concluído(s) · {t['quotes']} quotes · "
+          f"{t['retomados']} retomados · {t['quotes_por_segundo'] or 0} quotes/s · resumo em {caminho_resumo}", flush=True)
+
+    if controller.verificar_interrupcao():
+        sys.exit(130)
+    if t["erros"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    load_dotenv()
+    main()
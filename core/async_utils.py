@@ -0,0 +1,59 @@
+import asyncio
+import contextvars
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+
+def executar_async(coroutine):
+    """
+    Executa uma coroutine de forma síncrona e retorna seu resultado.
+
+    Se já houver um event loop ativo na thread atual (ex: handler assíncrono),
+    a coroutine é executada em uma thread auxiliar com seu próprio loop.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coroutine)
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        # Copia o contexto: o tracer ativo continua visível para as chamadas da coroutine
+        return executor.submit(contextvars.copy_context().run, asyncio.run, coroutine).result()
+
+
+def _capturar(funcao, item):
+    try:
+        return funcao(item)
+    except Exception as e:
+        return e
+
+
+def iterar_em_paralelo(funcao, itens, max_concurrency):
+    """
+    Executa funcao(item) em threads, com no máximo `max_concurrency` chamadas em andamento,
+    e entrega (índice, resultado) à medida que cada uma termina.
+
+    Exceções são entregues no lugar do resultado. Se o consumidor encerrar o gerador
+    (ex: interrupção solicitada), nenhuma nova chamada é iniciada e as pendentes são canceladas.
+    """
+    itens = list(itens)
+    max_concurrency = max(1, int(max_concurrency))
+    executor = ThreadPoolExecutor(max_workers=max_concurrency)
+    pendentes = {}
+    proximo = 0
+
+    try:
+        while proximo < len(itens) or pendentes:
+            while proximo < len(itens) and len(pendentes) < max_concurrency:
+                # Propaga o contexto atual (ex: instrumentação) para a thread
+                contexto = contextvars.copy_context()
+                futuro = executor.submit(contexto.run, _capturar, funcao, itens[proximo])
+                pendentes[futuro] = proximo
+                proximo += 1
+
+            concluidos, _ = wait(pendentes, return_when=FIRST_COMPLETED)
+            for futuro in concluidos:
+                yield pendentes.pop(futuro), futuro.result()
+    finally:
+        for futuro in pendentes:
+            futuro.cancel()
+        executor.shutdown(wait=False)
@@ -0,0 +1,168 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+import time
+import unicodedata
+
+import numpy as np
+
+from core.embeddings import TAMANHO_LOTE_PADRAO, codificar_normalizado
+
+# Pasta padrão onde os embeddings dos constructos ficam armazenados
+DIRETORIO_CACHE_CONSTRUCTOS = os.path.join("cache", "constructos")
+
+# Quantidade máxima de embeddings mantidos por modelo antes da remoção por LRU
+MAX_ITENS_PADRAO = 100_000
+
+# Intervalo mínimo (s) entre gravações do último acesso de um mesmo embedding
+# (leituras repetidas em sequência não regravam o índice)
+INTERVALO_ATUALIZACAO_ACESSO = 60
+
+
+def normalizar_texto(texto):
+    """Normaliza Unicode e espaços para que variações irrelevantes gerem a mesma chave."""
+    return unicodedata.normalize("NFC", " ".join(str(texto).split()))
+
+
+def hash_texto(texto):
+    """Retorna o hash SHA-256 do texto normalizado."""
+    return hashlib.sha256(normalizar_texto(texto).encode("utf-8")).hexdigest()
+
+
+def textos_constructos(constructos, incluir_nome=True):
+    """
+    Monta os textos usados para gerar os embeddings dos constructos.
+
+    - incluir_nome=True: "nome. definição" (padrão dos classificadores)
+    - incluir_nome=False: apenas a definição
+    """
+    if incluir_nome:
+        return [f"{nome}. {definicao}" for nome, definicao in constructos.items()]
+    return [str(definicao) for definicao in constructos.values()]
+
+
+class ConstructEmbeddingCache:
+    """
+    Cache em disco de embeddings de constructos, endereçado pelo conteúdo.
+
+    Para cada modelo é mantida uma pasta com:
+    - vetores.npy: matriz float32 (vetores normalizados), aberta via memory-map
+    - indice.json: mapeamento {hash do texto normalizado: [linha da matriz, último acesso]}
+
+    Somente os textos ausentes do índice são codificados; editar uma definição
+    gera apenas um novo vetor. Com mais de `max_itens` vetores em um modelo, os usados
+    há mais tempo são removidos (LRU) e a matriz é compactada.
+    """
+
+    def __init__(self, diretorio=DIRETORIO_CACHE_CONSTRUCTOS, max_itens=MAX_ITENS_PADRAO):
+        self.diretorio = diretorio
+        self.max_itens = max_itens
+        self._lock = threading.Lock()
+
+    def _pasta_modelo(self, modelo):
+        nome_seguro = re.sub(r"[^\w.-]", "_", modelo)
+        return os.path.join(self.diretorio, nome_seguro)
+
+    def _carregar(self, pasta):
+        caminho_indice = os.path.join(pasta, "indice.json")
+        caminho_vetores = os.path.join(pasta, "vetores.npy")
+        if not (os.path.exists(caminho_indice) and os.path.exists(caminho_vetores)):
+            return {}, None
+        with open(caminho_indice, encoding="utf-8") as f:
+            indice = json.load(f)
+        # Índices gravados antes do LRU guardam apenas a linha
+        indice = {chave: valor if isinstance(valor, list) else [valor, 0] for chave, valor in indice.items()}
+        return indice, np.load(caminho_vetores, mmap_mode="r")
+
+    def _salvar(self, pasta, indice, vetores=None):
+        """Grava o índice e, se informada, a matriz de vetores."""
+        os.makedirs(pasta, exist_ok=True)
+        caminho_vetores = os.path.join(pasta, "vetores.npy")
+        caminho_indice = os.path.join(pasta, "indice.json")
+
+        # Grava em arquivos temporários e substitui, para nunca deixar o cache pela metade
+        if vetores is not None:
+            with open(caminho_vetores + ".tmp", "wb") as f:
+                np.save(f, vetores)
+            os.replace(caminho_vetores + ".tmp", caminho_vetores)
+        with open(caminho_indice + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(indice, f)
+        os.replace(caminho_indice + ".tmp", caminho_indice)
+
+    def obter(self, embedder, modelo, textos, batch_size=TAMANHO_LOTE_PADRAO):
+        """
+        Retorna a matriz (len(textos), dimensão) de embeddings normalizados,
+        codificando e armazenando apenas os textos que ainda não estão no cache.
+
+        Parâmetros:
+        - embedder: modelo SentenceTransformer usado para os textos ausentes
+        - modelo: nome do modelo (compõe a chave do cache)
+        - textos: lista de textos a codificar
+        """
+        chaves = [hash_texto(texto) for texto in textos]
+        pasta = self._pasta_modelo(modelo)
+        agora = int(time.time())
+
+        with self._lock:
+            indice, vetores = self._carregar(pasta)
+
+            ausentes = {}
+            for chave, texto in zip(chaves, textos):
+                if chave not in indice and chave not in ausentes:
+                    ausentes[chave] = texto
+
+            if ausentes:
+                novos = codificar_normalizado(embedder, list(ausentes.values()), batch_size)
+                inicio = 0 if vetores is None else len(vetores)
+                for deslocamento, chave in enumerate(ausentes):
+                    indice[chave] = [inicio + deslocamento, agora]
+                vetores = novos if vetores is None else np.concatenate([vetores, novos])
+
+            if vetores is None:
+                return codificar_normalizado(embedder, [], batch_size)
+            resultado = np.asarray(vetores[[indice[chave][0] for chave in chaves]], dtype=np.float32)
+
+            acessados = [chave for chave in set(chaves) if agora - indice[chave][1] >= INTERVALO_ATUALIZACAO_ACESSO]
+            for chave in acessados:
+                indice[chave][1] = agora
+
+            if len(indice) > self.max_itens:
+                indice, vetores = self._compactar(indice, vetores)
+                self._salvar(pasta, indice, vetores)
+            elif ausentes:
+                self._salvar(pasta, indice, vetores)
+            elif acessados:
+                self._salvar(pasta, indice)
+            return resultado
+
+    def _compactar(self, indice, vetores):
+        """Mantém apenas os max_itens vetores usados mais recentemente, regravando a matriz sem lacunas."""
+        mantidos = sorted(indice.items(), key=lambda item: item[1][1], reverse=True)[:self.max_itens]
+        linhas = [linha for _, (linha, _) in mantidos]
+        novo_indice = {chave: [posicao, acesso] for posicao, (chave, (_, acesso)) in enumerate(mantidos)}
+        return novo_indice, np.asarray(vetores[linhas], dtype=np.float32)
+
+    def limpar(self, modelo=None):
+        """Remove os embeddings armazenados de um modelo (ou de todos)."""
+        with self._lock:
+            alvo = self.diretorio if modelo is None else self._pasta_modelo(modelo)
+            shutil.rmtree(alvo, ignore_errors=True)
+
+
+# Instância compartilhada pelos classificadores e pelo ConstructLoader
+cache_constructos = ConstructEmbeddingCache()
+
+
+def embeddings_constructos(constructos, embedder, modelo, incluir_nome=True, cache=None,
+                           batch_size=TAMANHO_LOTE_PADRAO):
+    """
+    Retorna os nomes dos constructos e a matriz de embeddings correspondente,
+    usando o cache em disco (o compartilhado, se nenhum for informado).
+    """
+    cache = cache or cache_constructos
+    nomes = list(constructos.keys())
+    textos = textos_constructos(constructos, incluir_nome)
+    return nomes, cache.obter(embedder, modelo, textos, batch_size)
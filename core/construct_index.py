@@ -0,0 +1,114 @@
+import os
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+from core.embeddings import top_k
+
+# A partir desta quantidade de constructos o backend "auto" passa a usar o índice aproximado
+LIMIAR_INDICE_APROXIMADO = int(os.getenv("LIMIAR_INDICE_APROXIMADO", "1000"))
+
+
+class ConstructIndex(ABC):
+    """
+    Índice de vizinhos mais próximos sobre os embeddings (normalizados) dos constructos.
+
+    Todos os backends expõem top_k(vetores_quotes, k), que retorna as matrizes (n, k)
+    de índices e similaridades de cosseno, ordenadas da maior para a menor.
+    """
+
+    backend = None
+
+    def __init__(self, nomes, matriz):
+        self.nomes = list(nomes)
+        self.matriz = np.ascontiguousarray(matriz, dtype=np.float32)
+
+    def __len__(self):
+        return len(self.nomes)
+
+    @abstractmethod
+    def top_k(self, vetores_quotes, k=1):
+        """Retorna (índices, similaridades) dos k constructos mais próximos de cada quote."""
+        pass
+
+    def ranking(self, vetores_quotes, k=1):
+        """Retorna, para cada quote, a lista [(constructo, similaridade), ...] com até k itens."""
+        indices, valores = self.top_k(vetores_quotes, k)
+        return [
+            [(self.nomes[i], float(v)) for i, v in zip(linha_idx, linha_val)]
+            for linha_idx, linha_val in zip(indices, valores)
+        ]
+
+
+class ExactConstructIndex(ConstructIndex):
+    """Busca exata: um produto matricial quotes × constructos seguido de seleção dos k maiores."""
+
+    backend = "exato"
+
+    def top_k(self, vetores_quotes, k=1):
+        vetores_quotes = np.atleast_2d(np.asarray(vetores_quotes, dtype=np.float32))
+        if not len(self.nomes):
+            vazio = np.zeros((len(vetores_quotes), 0))
+            return vazio.astype(np.int64), vazio.astype(np.float32)
+        return top_k(vetores_quotes @ self.matriz.T, k)
+
+
+class HNSWConstructIndex(ConstructIndex):
+    """
+    Busca aproximada com grafo HNSW (hnswlib, somente CPU), para codebooks com milhares
+    de constructos. Usa produto interno, que equivale ao cosseno com vetores normalizados.
+
+    - ef_construcao / m: qualidade e tamanho do grafo (maiores = melhor recall, mais memória)
+    - ef_busca: tamanho da lista de candidatos na consulta (maior = melhor recall, mais lento)
+    """
+
+    backend = "hnsw"
+
+    def __init__(self, nomes, matriz, ef_construcao=200, m=16, ef_busca=64):
+        super().__init__(nomes, matriz)
+        import hnswlib
+
+        self.ef_busca = ef_busca
+        self._indice = hnswlib.Index(space="ip", dim=self.matriz.shape[1])
+        self._indice.init_index(max_elements=max(len(self.nomes), 1), ef_construction=ef_construcao, M=m)
+        if len(self.nomes):
+            self._indice.add_items(self.matriz, np.arange(len(self.nomes)))
+
+    def top_k(self, vetores_quotes, k=1):
+        vetores_quotes = np.atleast_2d(np.asarray(vetores_quotes, dtype=np.float32))
+        k = min(k, len(self.nomes))
+        if k == 0:
+            vazio = np.zeros((len(vetores_quotes), 0))
+            return vazio.astype(np.int64), vazio.astype(np.float32)
+
+        self._indice.set_ef(max(self.ef_busca, k))
+        indices, distancias = self._indice.knn_query(vetores_quotes, k=k)
+        # No espaço "ip" o hnswlib devolve 1 - produto interno
+        return indices.astype(np.int64), (1.0 - distancias).astype(np.float32)
+
+
+def hnsw_disponivel():
+    """Indica se a biblioteca opcional hnswlib está instalada."""
+    try:
+        import hnswlib  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def criar_indice_constructos(nomes, matriz, backend="auto", **kwargs):
+    """
+    Cria o índice de constructos com o backend escolhido:
+    - "exato": produto matricial NumPy (padrão para codebooks pequenos)
+    - "hnsw": índice aproximado (requer hnswlib)
+    - "auto": "hnsw" se houver ao menos LIMIAR_INDICE_APROXIMADO constructos e o
+      hnswlib estiver instalado; caso contrário, "exato"
+    """
+    if backend == "auto":
+        backend = "hnsw" if len(nomes) >= LIMIAR_INDICE_APROXIMADO and hnsw_disponivel() else "exato"
+
+    if backend == "exato":
+        return ExactConstructIndex(nomes, matriz)
+    if backend == "hnsw":
+        return HNSWConstructIndex(nomes, matriz, **kwargs)
+    raise ValueError(f"Backend de índice desconhecido: {backend}")
@@ -50,6 +50,23 @@ class ConstructLoader:
         """
         return self.constructs
 
+    def get_embedding_matrix(self, embedder, modelo, incluir_nome=True, cache=None):
+        """
+        Retorna os embeddings dos constructos carregados, reaproveitando o cache em disco.
+
+        Parâmetros:
+        - embedder: modelo SentenceTransformer usado para os textos ainda não armazenados
+        - modelo: nome do modelo de embeddings (compõe a chave do cache)
+        - incluir_nome: se True, codifica "nome. definição"; caso contrário, só a definição
+        - cache: instância de ConstructEmbeddingCache (usa a compartilhada se None)
+
+        Retorna:
+        - Lista com os nomes dos constructos
+        - Matriz numpy (constructos × dimensão) com os vetores normalizados
+        """
+        from core.construct_cache import embeddings_constructos
+        return embeddings_constructos(self.constructs, embedder, modelo, incluir_nome, cache)
+
     def get_formatted_summary(self):
         """
         Gera um resumo formatado dos constructos para exibição (ex: interface Gradio).
@@ -1,51 +1,240 @@
+import os
+
 import pandas as pd
 
+# Quantidade padrão de linhas entregues por bloco na leitura incremental
+TAMANHO_BLOCO_PADRAO = 20_000
+
+
 class QuoteDatasetLoader:
     """
-    Classe responsável por carregar, armazenar e validar datasets (planilhas .xlsx)
-    contendo quotes e colunas relacionadas à classificação.
+    Classe responsável por carregar, armazenar e validar datasets (planilhas .xlsx,
+    arquivos .csv, .parquet ou .arrow) contendo quotes e colunas relacionadas à classificação.
+
+    A leitura é preguiçosa: ao carregar um arquivo, apenas o cabeçalho é lido.
+    Os dados são lidos em blocos (iter_chunks), somente com as colunas necessárias,
+    ou inteiros sob demanda (get_dataframe).
     """
 
     def __init__(self):
-        # Armazena o DataFrame carregado da planilha
+        # DataFrame completo, materializado apenas se get_dataframe for chamado
         self.df = None
 
         # Caminho do arquivo original carregado, usado posteriormente para salvar versões modificadas
         self.file_path = None
 
+        # Nomes das colunas, lidos do cabeçalho do arquivo
+        self.colunas = []
+
     def load_excel(self, file_path):
         """
-        Carrega uma planilha Excel e armazena o conteúdo em um DataFrame interno.
+        Registra uma planilha (Excel, CSV, Parquet ou Arrow IPC) lendo apenas o seu cabeçalho.
 
         Parâmetros:
-        - file_path: caminho do arquivo Excel (.xlsx) a ser carregado
+        - file_path: caminho do arquivo (.xlsx, .csv, .parquet ou .arrow) a ser carregado
 
         Retorna:
         - Lista com os nomes das colunas da planilha, útil para dropdowns de seleção
         """
-        self.df = pd.read_excel(file_path)
         self.file_path = file_path  # Guarda o caminho para uso futuro (ex: salvar versão classificada)
-        return list(self.df.columns)
+        self.df = None
+        self.colunas = self._ler_cabecalho()
+        return list(self.colunas)
+
+    # Outros formatos usam o mesmo fluxo de carregamento
+    load_file = load_excel
+
+    def _formato(self):
+        extensao = os.path.splitext(self.file_path or "")[1].lower()
+        if extensao == ".csv":
+            return "csv"
+        if extensao in (".parquet", ".pq"):
+            return "parquet"
+        if extensao in (".arrow", ".feather"):
+            return "arrow"
+        return "excel"
+
+    def _ler_cabecalho(self):
+        formato = self._formato()
+        if formato == "csv":
+            return list(pd.read_csv(self.file_path, nrows=0).columns)
+        if formato == "parquet":
+            import pyarrow.parquet as pq
+            return list(pq.ParquetFile(self.file_path).schema_arrow.names)
+        if formato == "arrow":
+            import pyarrow as pa
+            with pa.memory_map(self.file_path) as fonte:
+                return list(pa.ipc.open_file(fonte).schema.names)
+
+        from openpyxl import load_workbook
+        livro = load_workbook(self.file_path, read_only=True, data_only=True)
+        try:
+            cabecalho = next(livro.worksheets[0].iter_rows(max_row=1, values_only=True), ())
+        finally:
+            livro.close()
+        return self._nomes_colunas(cabecalho)
+
+    @staticmethod
+    def _nomes_colunas(cabecalho):
+        """Replica a nomeação do pandas para cabeçalhos vazios ou repetidos."""
+        nomes = []
+        vistos = {}
+        for i, valor in enumerate(cabecalho):
+            nome = f"Unnamed: {i}" if valor is None else valor
+            if nome in vistos:
+                vistos[nome] += 1
+                nome = f"{nome}.{vistos[nome]}"
+            else:
+                vistos[nome] = 0
+            nomes.append(nome)
+        return nomes
+
+    def total_linhas(self):
+        """
+        Retorna a quantidade de linhas de dados sem ler o arquivo inteiro, quando o formato
+        permite (metadados do Parquet / dimensão da planilha). Caso contrário, retorna None.
+        """
+        if self.df is not None:
+            return len(self.df)
+        formato = self._formato()
+        if formato == "parquet":
+            import pyarrow.parquet as pq
+            return pq.ParquetFile(self.file_path).metadata.num_rows
+        if formato == "arrow":
+            import pyarrow as pa
+            with pa.memory_map(self.file_path) as fonte:
+                leitor = pa.ipc.open_file(fonte)
+                return sum(leitor.get_batch(i).num_rows for i in range(leitor.num_record_batches))
+        if formato == "excel":
+            from openpyxl import load_workbook
+            livro = load_workbook(self.file_path, read_only=True)
+            try:
+                max_row = livro.worksheets[0].max_row
+            finally:
+                livro.close()
+            return max_row - 1 if max_row else None
+        return None
+
+    def iter_chunks(self, colunas=None, tamanho=TAMANHO_BLOCO_PADRAO):
+        """
+        Lê o arquivo em blocos de até `tamanho` linhas, materializando apenas as colunas pedidas.
+
+        Parâmetros:
+        - colunas: lista de colunas desejadas (None = todas)
+        - tamanho: quantidade de linhas por bloco
+
+        Retorna:
+        - Gerador de DataFrames com índice contínuo entre os blocos (0, 1, 2, ...)
+        """
+        if colunas is not None:
+            faltando = [col for col in colunas if col not in self.colunas]
+            if faltando:
+                raise ValueError(f"Coluna não encontrada: {', '.join(map(str, faltando))}")
+
+        if self.df is not None:
+            # Já materializado: apenas fatia o DataFrame em memória
+            df = self.df if colunas is None else self.df[list(colunas)]
+            for inicio in range(0, len(df), tamanho):
+                yield df.iloc[inicio:inicio + tamanho]
+            return
+
+        formato = self._formato()
+        if formato == "csv":
+            yield from pd.read_csv(self.file_path, usecols=colunas, chunksize=tamanho)
+        elif formato == "parquet":
+            yield from self._iter_parquet(colunas, tamanho)
+        elif formato == "arrow":
+            yield from self._iter_arrow(colunas, tamanho)
+        else:
+            yield from self._iter_excel(colunas, tamanho)
+
+    def _iter_parquet(self, colunas, tamanho):
+        import pyarrow.parquet as pq
+
+        inicio = 0
+        for lote in pq.ParquetFile(self.file_path).iter_batches(batch_size=tamanho, columns=colunas):
+            bloco = lote.to_pandas()
+            bloco.index = pd.RangeIndex(inicio, inicio + len(bloco))
+            inicio += len(bloco)
+            yield bloco
+
+    def _iter_arrow(self, colunas, tamanho):
+        import pyarrow as pa
 
-    def get_dataframe(self):
+        # Arquivo mapeado em memória: apenas as colunas e blocos lidos são carregados
+        with pa.memory_map(self.file_path) as fonte:
+            leitor = pa.ipc.open_file(fonte)
+            inicio = 0
+            for i in range(leitor.num_record_batches):
+                lote = leitor.get_batch(i)
+                if colunas is not None:
+                    lote = lote.select(colunas)
+                for fatia in pa.Table.from_batches([lote]).to_batches(max_chunksize=tamanho):
+                    bloco = fatia.to_pandas()
+                    bloco.index = pd.RangeIndex(inicio, inicio + len(bloco))
+                    inicio += len(bloco)
+                    yield bloco
+
+    def _iter_excel(self, colunas, tamanho):
+        from openpyxl import load_workbook
+
+        nomes = colunas if colunas is not None else self.colunas
+        posicoes = [self.colunas.index(col) for col in nomes]
+
+        livro = load_workbook(self.file_path, read_only=True, data_only=True)
+        try:
+            linhas = livro.worksheets[0].iter_rows(min_row=2, values_only=True)
+            inicio = 0
+            buffer = []
+            vazias = 0
+            for linha in linhas:
+                # Como no pd.read_excel, linhas vazias no fim da planilha são descartadas;
+                # as intermediárias só são emitidas quando aparece uma linha com dados
+                if not any(valor is not None for valor in linha):
+                    vazias += 1
+                    continue
+                buffer.extend([None] * len(posicoes) for _ in range(vazias))
+                vazias = 0
+                buffer.append([linha[p] if p < len(linha) else None for p in posicoes])
+                if len(buffer) >= tamanho:
+                    yield pd.DataFrame(buffer, columns=nomes, index=pd.RangeIndex(inicio, inicio + len(buffer)))
+                    inicio += len(buffer)
+                    buffer = []
+            if buffer:
+                yield pd.DataFrame(buffer, columns=nomes, index=pd.RangeIndex(inicio, inicio + len(buffer)))
+        finally:
+            livro.close()
+
+    def get_dataframe(self, colunas=None):
         """
-        Retorna o DataFrame carregado para uso externo (ex: classificação).
+        Retorna o DataFrame carregado para uso externo (ex: avaliação).
+        O arquivo é lido por completo apenas na primeira chamada; com `colunas`,
+        lê somente as colunas pedidas (sem guardar o resultado).
         """
-        return self.df
-    
+        if self.df is not None:
+            return self.df if colunas is None else self.df[list(colunas)]
+        if self.file_path is None:
+            return None
+
+        blocos = list(self.iter_chunks(colunas))
+        df = pd.concat(blocos) if blocos else pd.DataFrame(columns=colunas or self.colunas)
+        if colunas is None:
+            self.df = df
+        return df
+
     def get_coluna_classificacao(self):
         """
         Retorna o nome da coluna mais provável de conter a classificação automática dos quotes.
-        
+
         A função procura por colunas no DataFrame atual cujo nome contenha a palavra 'class'
         (ignorando maiúsculas/minúsculas), assumindo que essa coluna foi gerada pelo processo
         de classificação automatizada.
-        
+
         Returns:
             str or None: O nome da coluna de classificação, se encontrada; caso contrário, None.
         """
-        for col in self.df.columns:
-            if 'class' in col.lower():
+        for col in self.colunas:
+            if 'class' in str(col).lower():
                 return col
         return None
 
@@ -60,7 +249,6 @@ class QuoteDatasetLoader:
         Levanta:
         - ValueError caso alguma das colunas não esteja presente no DataFrame
         """
-        if quote_col not in self.df.columns or class_col not in self.df.columns:
+        if quote_col not in self.colunas or class_col not in self.colunas:
             raise ValueError("Coluna não encontrada.")
-    
-    
\ No newline at end of file
+
@@ -0,0 +1,143 @@
+import os
+import threading
+
+# Modelo de embeddings usado por padrão em todos os classificadores
+MODELO_EMBEDDING_PADRAO = "paraphrase-MiniLM-L6-v2"
+
+# Backends de inferência do modelo de embeddings:
+# - "torch": PyTorch em fp32 (referência)
+# - "onnx": ONNX Runtime (requer optimum[onnxruntime]; o modelo é exportado no primeiro uso)
+# - "int8": PyTorch com quantização dinâmica int8 das camadas lineares (somente CPU)
+BACKENDS_EMBEDDING = ("torch", "onnx", "int8")
+
+# Backend usado quando o classificador não informa outro
+BACKEND_EMBEDDING_PADRAO = os.getenv("BACKEND_EMBEDDING", "torch").strip().lower() or "torch"
+
+
+def resolver_backend(backend=None):
+    """Retorna o backend informado (ou o padrão), validado."""
+    backend = (backend or BACKEND_EMBEDDING_PADRAO).lower()
+    if backend not in BACKENDS_EMBEDDING:
+        raise ValueError(f"Backend de embeddings desconhecido: {backend} (opções: {', '.join(BACKENDS_EMBEDDING)})")
+    return backend
+
+
+def chave_embedding(modelo=MODELO_EMBEDDING_PADRAO, backend=None):
+    """
+    Identificador do par (modelo, backend) usado nas chaves dos caches de embeddings.
+
+    Os vetores do ONNX e do int8 diferem levemente dos do fp32, por isso cada backend
+    tem o seu próprio cache; o PyTorch fp32 mantém apenas o nome do modelo (caches existentes).
+    """
+    backend = resolver_backend(backend)
+    return modelo if backend == "torch" else f"{modelo}@{backend}"
+
+
+def _carregar_modelo(modelo, device, backend):
+    from sentence_transformers import SentenceTransformer
+
+    if backend == "torch":
+        return SentenceTransformer(modelo, device=device)
+
+    if backend == "onnx":
+        try:
+            return SentenceTransformer(modelo, device=device, backend="onnx")
+        except (ImportError, TypeError) as e:
+            raise ImportError(
+                "O backend 'onnx' requer sentence-transformers>=3.2 e ONNX Runtime "
+                "(pip install \"optimum[onnxruntime]\")"
+            ) from e
+
+    # int8: a quantização dinâmica do PyTorch só executa em CPU
+    if device not in (None, "cpu"):
+        raise ValueError(f"O backend 'int8' executa apenas em CPU (device={device})")
+    import torch
+
+    embedder = SentenceTransformer(modelo, device="cpu")
+    return torch.quantization.quantize_dynamic(embedder, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+
+
+class EmbedderRegistry:
+    """
+    Registro compartilhado (por processo) de modelos SentenceTransformer.
+
+    Cada modelo é identificado por (nome do modelo, dispositivo, backend) e carregado
+    apenas no primeiro uso. Execuções seguintes reutilizam a mesma instância,
+    evitando recarregar os pesos a cada classificação.
+    """
+
+    def __init__(self):
+        self._modelos = {}
+        self._lock = threading.Lock()
+
+    def obter(self, modelo=MODELO_EMBEDDING_PADRAO, device=None, backend=None):
+        """
+        Retorna o modelo de embeddings solicitado, carregando-o se necessário.
+
+        Parâmetros:
+        - modelo: nome do modelo SentenceTransformer
+        - device: dispositivo ("cpu", "cuda", ...). None deixa a biblioteca escolher.
+        - backend: "torch", "onnx" ou "int8" (None = BACKEND_EMBEDDING_PADRAO)
+        """
+        chave = (modelo, device, resolver_backend(backend))
+        embedder = self._modelos.get(chave)
+        if embedder is not None:
+            return embedder
+
+        with self._lock:
+            # Outra thread pode ter carregado o modelo enquanto esperávamos o lock
+            embedder = self._modelos.get(chave)
+            if embedder is None:
+                embedder = _carregar_modelo(*chave)
+                self._modelos[chave] = embedder
+        return embedder
+
+    def registrar(self, embedder, modelo=MODELO_EMBEDDING_PADRAO, device=None, backend=None):
+        """Registra uma instância já criada (útil para modelos locais ou de teste)."""
+        with self._lock:
+            self._modelos[(modelo, device, resolver_backend(backend))] = embedder
+
+    def aquecer(self, modelos=(MODELO_EMBEDDING_PADRAO,), device=None, backend=None):
+        """
+        Pré-carrega os modelos informados e executa uma codificação curta,
+        para que a primeira classificação não pague o custo de inicialização.
+        """
+        for modelo in modelos:
+            self.obter(modelo, device, backend).encode(["aquecimento"])
+
+    def descarregar(self, modelo=None, device=None, backend=None):
+        """
+        Remove modelos do registro, liberando a memória quando não houver outras referências.
+
+        - Sem parâmetros: remove todos os modelos.
+        - Com modelo: remove as instâncias do modelo no device informado (de todos os
+          backends, ou apenas do backend informado).
+
+        Retorna a quantidade de modelos removidos.
+        """
+        with self._lock:
+            if modelo is None:
+                removidos = len(self._modelos)
+                self._modelos.clear()
+                return removidos
+            chaves = [
+                chave for chave in self._modelos
+                if chave[:2] == (modelo, device) and (backend is None or chave[2] == backend)
+            ]
+            for chave in chaves:
+                del self._modelos[chave]
+            return len(chaves)
+
+    def carregados(self):
+        """Lista os modelos (modelo, device, backend) atualmente em memória."""
+        with self._lock:
+            return list(self._modelos)
+
+
+# Instância única compartilhada pelo processo
+registry = EmbedderRegistry()
+
+
+def obter_embedder(modelo=MODELO_EMBEDDING_PADRAO, device=None, backend=None):
+    """Atalho para obter um modelo de embeddings do registro compartilhado."""
+    return registry.obter(modelo, device, backend)
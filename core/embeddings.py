@@ -0,0 +1,42 @@
+import numpy as np
+
+# Quantidade padrão de textos enviados ao modelo de embeddings por lote
+TAMANHO_LOTE_PADRAO = 64
+
+
+def codificar_normalizado(embedder, textos, batch_size=TAMANHO_LOTE_PADRAO):
+    """
+    Codifica uma lista de textos e retorna uma matriz float32 com vetores de norma 1.
+
+    Com vetores normalizados, a similaridade de cosseno entre dois conjuntos
+    passa a ser um simples produto matricial.
+    """
+    if len(textos) == 0:
+        dimensao = embedder.get_sentence_embedding_dimension() or 0
+        return np.zeros((0, dimensao), dtype=np.float32)
+
+    vetores = embedder.encode(
+        list(textos),
+        batch_size=batch_size,
+        convert_to_numpy=True,
+        normalize_embeddings=True,
+        show_progress_bar=False,
+    )
+    return np.asarray(vetores, dtype=np.float32)
+
+
+def top_k(similaridades, k=1):
+    """
+    Seleciona os k maiores valores de cada linha de uma matriz de similaridades.
+
+    Empates mantêm a ordem original das colunas (mesmo comportamento de max/sorted).
+
+    Retorna:
+    - Matriz (n, k) com os índices das colunas selecionadas
+    - Matriz (n, k) com os respectivos valores
+    """
+    similaridades = np.atleast_2d(similaridades)
+    k = min(k, similaridades.shape[1])
+    indices = np.argsort(-similaridades, axis=1, kind="stable")[:, :k]
+    valores = np.take_along_axis(similaridades, indices, axis=1)
+    return indices, valores
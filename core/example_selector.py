@@ -0,0 +1,88 @@
+import threading
+from collections import OrderedDict
+
+from langchain_core.example_selectors import BaseExampleSelector
+
+from core.embedder_registry import MODELO_EMBEDDING_PADRAO, obter_embedder
+from core.embeddings import codificar_normalizado, top_k
+from core.llm_scheduler import estimar_tokens
+
+# Quantidade de vetores de consulta (quotes) mantidos em memória pelo seletor
+MAX_CONSULTAS_MEMORIA = 1024
+
+
+class SemanticExampleSelector(BaseExampleSelector):
+    """
+    Seletor de exemplos few-shot por similaridade semântica.
+
+    Os quotes dos exemplos anotados são codificados uma única vez; para cada quote
+    a classificar, apenas os k exemplos mais parecidos entram no prompt, opcionalmente
+    limitados por um orçamento de tokens. Compatível com FewShotPromptTemplate e
+    FewShotChatMessagePromptTemplate (parâmetro example_selector).
+
+    O vetor de cada quote consultado fica em memória (LRU, MAX_CONSULTAS_MEMORIA itens):
+    renderizar o mesmo prompt de novo (ex: estimativa de tokens do LLMScheduler seguida
+    da chamada) não codifica o quote outra vez.
+    """
+
+    def __init__(self, exemplos, k=4, max_tokens=None, modelo_embedding=MODELO_EMBEDDING_PADRAO,
+                 device=None, chave_entrada="quote", backend_embedding=None):
+        """
+        - exemplos: lista de dicionários com campos "quote", "constructo", "justificativa"
+        - k: quantidade máxima de exemplos por prompt
+        - max_tokens: orçamento aproximado de tokens para os exemplos (None = sem limite)
+        - modelo_embedding: modelo SentenceTransformer usado no índice
+        - chave_entrada: variável do prompt usada como consulta
+        - backend_embedding: inferência do modelo ("torch", "onnx" ou "int8"; None = padrão)
+        """
+        self.exemplos = list(exemplos)
+        self.k = k
+        self.max_tokens = max_tokens
+        self.chave_entrada = chave_entrada
+        self.embedder = obter_embedder(modelo_embedding, device, backend_embedding)
+        self._consultas = OrderedDict()  # quote → vetor normalizado (LRU)
+        self._lock = threading.Lock()
+
+        # Índice construído uma vez com os quotes dos exemplos
+        self.matriz_exemplos = codificar_normalizado(
+            self.embedder, [str(ex["quote"]) for ex in self.exemplos]
+        )
+
+    def add_example(self, example):
+        self.exemplos.append(example)
+        self.matriz_exemplos = codificar_normalizado(
+            self.embedder, [str(ex["quote"]) for ex in self.exemplos]
+        )
+
+    def select_examples(self, input_variables):
+        if not self.exemplos:
+            return []
+
+        consulta = self._vetor_consulta(str(input_variables[self.chave_entrada]))
+        indices, _ = top_k(consulta[None, :] @ self.matriz_exemplos.T, self.k)
+
+        selecionados = []
+        tokens = 0
+        for i in indices[0]:
+            exemplo = self.exemplos[i]
+            custo = estimar_tokens(" ".join(str(v) for v in exemplo.values()))
+            if self.max_tokens is not None and selecionados and tokens + custo > self.max_tokens:
+                break
+            selecionados.append(exemplo)
+            tokens += custo
+        return selecionados
+
+    def _vetor_consulta(self, texto):
+        """Retorna o vetor normalizado do quote, codificando-o apenas na primeira consulta."""
+        with self._lock:
+            vetor = self._consultas.get(texto)
+            if vetor is not None:
+                self._consultas.move_to_end(texto)
+                return vetor
+
+        vetor = codificar_normalizado(self.embedder, [texto])[0]
+        with self._lock:
+            self._consultas[texto] = vetor
+            if len(self._consultas) > MAX_CONSULTAS_MEMORIA:
+                self._consultas.popitem(last=False)
+        return vetor
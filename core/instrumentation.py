@@ -0,0 +1,200 @@
+import contextvars
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+# Pasta padrão dos traces de execução (JSONL)
+DIRETORIO_TRACES = os.path.join("results", "traces")
+
+# Etapas instrumentadas, na ordem em que aparecem no resumo
+ETAPA_EMBED = "embed"
+ETAPA_RANK = "rank"
+ETAPA_PROMPT = "render_prompt"
+ETAPA_LLM = "llm"
+ETAPA_PARSE = "parse"
+ETAPA_QUOTE = "quote"
+ETAPAS = (ETAPA_EMBED, ETAPA_RANK, ETAPA_PROMPT, ETAPA_LLM, ETAPA_PARSE, ETAPA_QUOTE)
+
+# Tracer da execução em andamento; propagado para threads e tarefas assíncronas pelo contexto
+_tracer_atual = contextvars.ContextVar("tracer_atual", default=None)
+
+
+def _percentil(valores, p):
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(round((len(ordenados) - 1) * p / 100)))]
+
+
+class Tracer:
+    """
+    Registro estruturado de uma execução: intervalos (spans) por etapa medidos com
+    perf_counter e contadores (chamadas ao LLM, tokens de prompt/resposta, retentativas,
+    acertos e faltas do cache de respostas).
+
+    Cada span é acrescentado a um trace JSONL (se houver caminho) e agregado em memória
+    para o resumo por etapa. O tracer fica ativo no contexto (ativo()), de modo que
+    classificadores, threads e callbacks do LangChain registram nele sem recebê-lo
+    como parâmetro.
+    """
+
+    def __init__(self, caminho=None, run_id=None):
+        """
+        - caminho: arquivo JSONL do trace (None = apenas o resumo em memória)
+        - run_id: identificador gravado em cada linha do trace
+        """
+        self.caminho = caminho
+        self.run_id = run_id or uuid.uuid4().hex[:12]
+        self.duracoes = {}   # etapa → [segundos, ...]
+        self.eventos = []    # Eventos pontuais (registrar_evento), na ordem em que ocorreram
+        self.contadores = {"chamadas_llm": 0, "tokens_prompt": 0, "tokens_resposta": 0,
+                           "retentativas": 0, "erros_llm": 0, "cache_hits": 0, "cache_misses": 0}
+        self._inicio = time.perf_counter()
+        self._arquivo = None
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def ativo(self):
+        """Torna este tracer o tracer atual durante o bloco."""
+        token = _tracer_atual.set(self)
+        try:
+            yield self
+        finally:
+            _tracer_atual.reset(token)
+
+    def _gravar(self, registro):
+        if self.caminho is None:
+            return
+        if self._arquivo is None:
+            os.makedirs(os.path.dirname(self.caminho) or ".", exist_ok=True)
+            self._arquivo = open(self.caminho, "a", encoding="utf-8")
+        self._arquivo.write(json.dumps(registro, ensure_ascii=False, default=str) + "\n")
+
+    def registrar_span(self, etapa, duracao, inicio=None, **atributos):
+        """Registra um intervalo já medido (em segundos)."""
+        with self._lock:
+            self.duracoes.setdefault(etapa, []).append(duracao)
+            self._gravar({
+                "run_id": self.run_id,
+                "etapa": etapa,
+                "inicio_ms": round(((inicio or time.perf_counter() - duracao) - self._inicio) * 1000, 3),
+                "duracao_ms": round(duracao * 1000, 3),
+                **atributos,
+            })
+
+    @contextmanager
+    def span(self, etapa, **atributos):
+        """Mede o bloco com perf_counter e o registra como um span da etapa."""
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.registrar_span(etapa, time.perf_counter() - inicio, inicio=inicio, **atributos)
+
+    def registrar_evento(self, evento, **atributos):
+        """
+        Registra um evento pontual da execução (ex: retomada do diário, interrupção) no trace
+        e em self.eventos, no lugar de mensagens impressas no terminal.
+        """
+        with self._lock:
+            registro = {
+                "run_id": self.run_id,
+                "evento": evento,
+                "instante_ms": round((time.perf_counter() - self._inicio) * 1000, 3),
+                **atributos,
+            }
+            self.eventos.append(registro)
+            self._gravar(registro)
+
+    def contar(self, nome, quantidade=1):
+        with self._lock:
+            self.contadores[nome] = self.contadores.get(nome, 0) + quantidade
+
+    def fechar(self):
+        with self._lock:
+            if self._arquivo is not None:
+                self._arquivo.close()
+                self._arquivo = None
+
+    def resumo(self):
+        """Retorna {"etapas": {etapa: estatísticas}, "contadores": {...}}."""
+        with self._lock:
+            duracoes = {etapa: list(valores) for etapa, valores in self.duracoes.items()}
+            contadores = dict(self.contadores)
+
+        ordem = [e for e in ETAPAS if e in duracoes] + sorted(e for e in duracoes if e not in ETAPAS)
+        etapas = {}
+        for etapa in ordem:
+            valores = duracoes[etapa]
+            etapas[etapa] = {
+                "contagem": len(valores),
+                "total_s": round(sum(valores), 3),
+                "media_ms": round(sum(valores) / len(valores) * 1000, 2),
+                "p50_ms": round(_percentil(valores, 50) * 1000, 2),
+                "p95_ms": round(_percentil(valores, 95) * 1000, 2),
+            }
+        return {"etapas": etapas, "contadores": contadores}
+
+    def tabela_markdown(self):
+        """Resumo por etapa em tabela Markdown, seguido dos contadores de tokens e chamadas."""
+        resumo = self.resumo()
+        if not resumo["etapas"]:
+            return ""
+        linhas = [
+            "### ⏱️ Tempo por etapa",
+            "| Etapa | Spans | Total (s) | Média (ms) | p50 (ms) | p95 (ms) |",
+            "|---|---:|---:|---:|---:|---:|",
+        ]
+        for etapa, e in resumo["etapas"].items():
+            linhas.append(
+                f"| {etapa} | {e['contagem']} | {e['total_s']} | {e['media_ms']} | {e['p50_ms']} | {e['p95_ms']} |"
+            )
+        c = resumo["contadores"]
+        if c["chamadas_llm"]:
+            linhas.append("")
+            linhas.append(
+                f"Chamadas ao LLM: {c['chamadas_llm']} · tokens de prompt: {c['tokens_prompt']} · "
+                f"tokens de resposta: {c['tokens_resposta']} · retentativas: {c['retentativas']} · "
+                f"erros: {c['erros_llm']}"
+            )
+        return "\n".join(linhas)
+
+
+def tracer_atual():
+    """Retorna o tracer ativo no contexto, ou None."""
+    return _tracer_atual.get()
+
+
+@contextmanager
+def span(etapa, **atributos):
+    """Registra o bloco no tracer ativo; sem tracer ativo, não faz nada."""
+    tracer = _tracer_atual.get()
+    if tracer is None:
+        yield
+        return
+    with tracer.span(etapa, **atributos):
+        yield
+
+
+def registrar_span(etapa, duracao, **atributos):
+    tracer = _tracer_atual.get()
+    if tracer is not None:
+        tracer.registrar_span(etapa, duracao, **atributos)
+
+
+def contar(nome, quantidade=1):
+    tracer = _tracer_atual.get()
+    if tracer is not None:
+        tracer.contar(nome, quantidade)
+
+
+def instrumentar(chain):
+    """
+    Anexa o callback de instrumentação a uma chain (prompt | llm | parser).
+    O callback depende do LangChain e só é importado aqui, no primeiro uso.
+    """
+    from core.instrumentation_callback import callback_instrumentacao
+    return chain.with_config(callbacks=[callback_instrumentacao])
@@ -0,0 +1,106 @@
+import threading
+import time
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from core.instrumentation import ETAPA_LLM, ETAPA_PARSE, ETAPA_PROMPT, contar, registrar_span, tracer_atual
+from core.llm_cache import GERACAO_DO_CACHE
+from core.llm_scheduler import estimar_tokens
+
+
+class InstrumentationCallbackHandler(BaseCallbackHandler):
+    """
+    Callback do LangChain que converte os eventos das chains dos classificadores em spans
+    do tracer ativo: renderização do prompt, chamada ao LLM (com tokens) e parse da resposta.
+
+    Os tokens vêm do uso informado pelo provedor (usage_metadata / token_usage); na falta
+    deles, são estimados pelo tamanho do texto. Respostas vindas do LLMResponseCache não
+    contam como chamadas nem somam tokens (os acertos ficam no contador cache_hits).
+    """
+
+    # Executado na própria thread/tarefa do evento (o contexto com o tracer é preservado)
+    run_inline = True
+
+    # Tipos de execução do LangChain → etapa instrumentada
+    _ETAPAS_CHAIN = {"prompt": ETAPA_PROMPT, "parser": ETAPA_PARSE}
+
+    def __init__(self):
+        self._inicios = {}  # run_id → (etapa, perf_counter inicial, tokens estimados do prompt)
+        self._lock = threading.Lock()
+
+    def _iniciar(self, run_id, etapa, tokens_prompt=0):
+        if tracer_atual() is not None:
+            with self._lock:
+                self._inicios[run_id] = (etapa, time.perf_counter(), tokens_prompt)
+
+    def _terminar(self, run_id):
+        with self._lock:
+            return self._inicios.pop(run_id, None)
+
+    def on_chain_start(self, serialized, inputs, *, run_id, run_type=None, **kwargs):
+        etapa = self._ETAPAS_CHAIN.get(run_type)
+        if etapa:
+            self._iniciar(run_id, etapa)
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        inicio = self._terminar(run_id)
+        if inicio is not None:
+            registrar_span(inicio[0], time.perf_counter() - inicio[1], inicio=inicio[1])
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self._terminar(run_id)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        texto = "\n".join(str(m.content) for lista in messages for m in lista)
+        self._iniciar(run_id, ETAPA_LLM, estimar_tokens(texto))
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._iniciar(run_id, ETAPA_LLM, estimar_tokens("\n".join(prompts)))
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        inicio = self._terminar(run_id)
+        tracer = tracer_atual()
+        if inicio is None or tracer is None or self._do_cache(response):
+            return
+        duracao = time.perf_counter() - inicio[1]
+        tokens_prompt, tokens_resposta = self._tokens(response, inicio[2])
+        tracer.contar("chamadas_llm")
+        tracer.contar("tokens_prompt", tokens_prompt)
+        tracer.contar("tokens_resposta", tokens_resposta)
+        tracer.registrar_span(
+            ETAPA_LLM, duracao, inicio=inicio[1], tokens_prompt=tokens_prompt, tokens_resposta=tokens_resposta
+        )
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        if self._terminar(run_id) is not None:
+            contar("erros_llm")
+
+    def on_retry(self, retry_state, *, run_id, **kwargs):
+        contar("retentativas")
+
+    @staticmethod
+    def _do_cache(response):
+        """Indica se todas as gerações da resposta vieram do cache (nenhuma chamada ao provedor)."""
+        geracoes = [geracao for lista in response.generations or [] for geracao in lista]
+        return bool(geracoes) and all((g.generation_info or {}).get(GERACAO_DO_CACHE) for g in geracoes)
+
+    @staticmethod
+    def _tokens(response, tokens_prompt_estimados):
+        """Extrai (tokens de prompt, tokens de resposta) do resultado do LLM."""
+        for geracoes in response.generations or []:
+            for geracao in geracoes:
+                uso = getattr(getattr(geracao, "message", None), "usage_metadata", None)
+                if uso:
+                    return uso.get("input_tokens", 0), uso.get("output_tokens", 0)
+
+        uso = (response.llm_output or {}).get("token_usage") or {}
+        if uso:
+            return uso.get("prompt_tokens", 0), uso.get("completion_tokens", 0)
+
+        texto = "".join(geracao.text for geracoes in response.generations or [] for geracao in geracoes)
+        return tokens_prompt_estimados, estimar_tokens(texto)
+
+
+# Instância única, anexada às chains dos classificadores (sem efeito se não houver tracer ativo)
+callback_instrumentacao = InstrumentationCallbackHandler()
+
@@ -0,0 +1,203 @@
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Estados de um job
+JOB_NA_FILA = "na fila"
+JOB_EXECUTANDO = "executando"
+JOB_CONCLUIDO = "concluído"
+JOB_INTERROMPIDO = "interrompido"
+JOB_CANCELADO = "cancelado"
+JOB_ERRO = "erro"
+ESTADOS_FINAIS = (JOB_CONCLUIDO, JOB_INTERROMPIDO, JOB_CANCELADO, JOB_ERRO)
+
+# Jobs finalizados mantidos por sessão (os mais antigos saem da listagem)
+HISTORICO_POR_SESSAO = 20
+
+
+class Job:
+    """
+    Uma classificação enviada por uma sessão: estado, progresso, resultado e o
+    pedido de interrupção, que vale apenas para este job.
+    """
+
+    def __init__(self, id, sessao, descricao):
+        self.id = id
+        self.sessao = sessao
+        self.descricao = descricao
+        self.estado = JOB_NA_FILA
+        self.criado_em = time.time()
+        self.iniciado_em = None
+        self.concluido_em = None
+        self.processados = 0
+        self.total = None
+        self.resultado = None
+        self.erro = None
+        self._interromper = threading.Event()
+        self._concluido = threading.Event()
+        self._future = None
+
+    @property
+    def finalizado(self):
+        return self.estado in ESTADOS_FINAIS
+
+    def deve_interromper(self):
+        """Usado como `deve_interromper` do pipeline: consulta apenas o pedido deste job."""
+        return self._interromper.is_set()
+
+    def atualizar_progresso(self, processados, total=None):
+        """Usado como `progress` do pipeline."""
+        self.processados = processados
+        if total is not None:
+            self.total = total
+
+    def aguardar(self, timeout=None):
+        """Espera o job terminar; retorna True se ele já estiver finalizado."""
+        return self._concluido.wait(timeout)
+
+    def _finalizar(self, estado):
+        self.estado = estado
+        self.concluido_em = time.time()
+        self._concluido.set()
+
+    def descrever_progresso(self):
+        if self.total:
+            return f"{self.processados}/{self.total} ({self.processados / self.total:.0%})"
+        return f"{self.processados} quote(s)"
+
+    def resumo(self):
+        """Linha da tabela de jobs exibida ao usuário."""
+        fim = self.concluido_em or time.time()
+        duracao = fim - self.iniciado_em if self.iniciado_em else 0.0
+        return {
+            "id": self.id,
+            "descrição": self.descricao,
+            "estado": self.estado,
+            "progresso": self.descrever_progresso(),
+            "enviado": time.strftime("%H:%M:%S", time.localtime(self.criado_em)),
+            "duração (s)": round(duracao, 1),
+        }
+
+
+class JobExecutor:
+    """
+    Executor de classificações em segundo plano, compartilhado pelas sessões do app.
+
+    - No máximo `max_jobs` classificações rodam ao mesmo tempo; as demais aguardam na fila
+      (com `max_fila`, novos envios são recusados quando a fila está cheia)
+    - Cada sessão enxerga e interrompe apenas os seus próprios jobs
+    - Interromper um job não afeta os demais, nem os da mesma sessão
+    """
+
+    def __init__(self, max_jobs=2, max_fila=None):
+        self.max_jobs = max(1, int(max_jobs))
+        self.max_fila = max_fila
+        self._executor = ThreadPoolExecutor(max_workers=self.max_jobs, thread_name_prefix="job-classificacao")
+        self._jobs = {}  # id → Job, em ordem de envio
+        self._ids = itertools.count(1)
+        self._descartadas = set()
+        self._lock = threading.Lock()
+
+    def submeter(self, sessao, descricao, funcao):
+        """
+        Enfileira `funcao(job)` e retorna o Job. A função recebe o próprio job, para
+        informar o progresso e consultar o pedido de interrupção.
+        """
+        with self._lock:
+            if self.max_fila is not None and self._contar(JOB_NA_FILA) >= self.max_fila:
+                raise RuntimeError(f"Fila de classificações cheia ({self.max_fila} jobs aguardando).")
+            job = Job(next(self._ids), sessao, descricao)
+            self._jobs[job.id] = job
+            self._descartadas.discard(sessao)
+            self._podar_historico(sessao)
+            job._future = self._executor.submit(self._executar, job, funcao)
+        return job
+
+    def _executar(self, job, funcao):
+        with self._lock:
+            if job.finalizado:  # Cancelado enquanto aguardava na fila
+                return
+            job.estado = JOB_EXECUTANDO
+            job.iniciado_em = time.time()
+        try:
+            job.resultado = funcao(job)
+            estado = JOB_INTERROMPIDO if job.deve_interromper() else JOB_CONCLUIDO
+        except Exception as e:
+            job.erro = str(e)
+            estado = JOB_ERRO
+        with self._lock:
+            job._finalizar(estado)
+            # Sessão encerrada durante a execução: o job sai da listagem ao terminar
+            if job.sessao in self._descartadas:
+                self._jobs.pop(job.id, None)
+
+    def _contar(self, estado):
+        return sum(1 for job in self._jobs.values() if job.estado == estado)
+
+    def _podar_historico(self, sessao):
+        finalizados = [job for job in self._jobs.values() if job.sessao == sessao and job.finalizado]
+        for job in finalizados[:max(0, len(finalizados) - HISTORICO_POR_SESSAO)]:
+            del self._jobs[job.id]
+
+    def obter(self, job_id, sessao=None):
+        """Retorna o job (None se não existir ou se pertencer a outra sessão)."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None or (sessao is not None and job.sessao != sessao):
+            return None
+        return job
+
+    def listar(self, sessao):
+        """Jobs da sessão, em ordem de envio."""
+        with self._lock:
+            return [job for job in self._jobs.values() if job.sessao == sessao]
+
+    def posicao_na_fila(self, job):
+        """Posição do job na fila (1 = o próximo a executar), ou 0 se não estiver na fila."""
+        with self._lock:
+            if job.estado != JOB_NA_FILA:
+                return 0
+            return sum(1 for outro in self._jobs.values() if outro.estado == JOB_NA_FILA and outro.id <= job.id)
+
+    def interromper(self, job_id, sessao):
+        """
+        Solicita a interrupção de um job da sessão. Se ainda estiver na fila, ele é
+        cancelado sem executar. Retorna False se o job não existir ou já tiver terminado.
+        """
+        job = self.obter(job_id, sessao)
+        if job is None:
+            return False
+        with self._lock:
+            if job.finalizado:
+                return False
+            job._interromper.set()
+            if job.estado == JOB_NA_FILA:
+                job._future.cancel()
+                job._finalizar(JOB_CANCELADO)
+        return True
+
+    def descartar_sessao(self, sessao):
+        """
+        Remove da listagem os jobs finalizados de uma sessão encerrada. Jobs em andamento
+        continuam (o arquivo de resultado é gravado normalmente) e saem ao terminar.
+        """
+        with self._lock:
+            self._descartadas.add(sessao)
+            for job in [job for job in self._jobs.values() if job.sessao == sessao and job.finalizado]:
+                del self._jobs[job.id]
+
+    def ocupacao(self):
+        """Retorna (jobs em execução, jobs na fila) somando todas as sessões."""
+        with self._lock:
+            return self._contar(JOB_EXECUTANDO), self._contar(JOB_NA_FILA)
+
+    def fechar(self):
+        """Interrompe os jobs em andamento e cancela os que estão na fila."""
+        with self._lock:
+            for job in self._jobs.values():
+                if not job.finalizado:
+                    job._interromper.set()
+                    if job.estado == JOB_NA_FILA:
+                        job._finalizar(JOB_CANCELADO)
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,149 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+from langchain_core.caches import BaseCache
+from langchain_core.load import dumps, loads
+
+from core.instrumentation import contar
+
+# Arquivo padrão do cache de respostas do LLM
+CAMINHO_CACHE_LLM = os.path.join("cache", "llm", "respostas.sqlite")
+
+# Quantidade máxima de respostas armazenadas antes da remoção por LRU
+MAX_ITENS_PADRAO = 50_000
+
+# Marca (em generation_info) das gerações devolvidas pelo cache, para que a instrumentação
+# não as conte como chamadas ao LLM nem some os seus tokens
+GERACAO_DO_CACHE = "resposta_do_cache"
+
+
+class LLMResponseCache(BaseCache):
+    """
+    Cache local (SQLite) de respostas do LLM, plugado nos chat models do LangChain.
+
+    A chave é o hash de (configuração do modelo — nome, temperatura etc. — e prompt
+    totalmente renderizado), então repetir o mesmo escopo, codebook e quotes não
+    gera novas chamadas pagas.
+
+    - ttl_segundos: respostas mais antigas que isso são descartadas (None = sem validade)
+    - max_itens: limite de respostas; ao ultrapassar, remove as menos usadas (LRU)
+    - ativo: False ignora o cache (não lê nem grava)
+    """
+
+    def __init__(self, caminho=CAMINHO_CACHE_LLM, max_itens=MAX_ITENS_PADRAO, ttl_segundos=None, ativo=True):
+        self.caminho = caminho
+        self.max_itens = max_itens
+        self.ttl_segundos = ttl_segundos
+        self.ativo = ativo
+        self.hits = 0
+        self.misses = 0
+        self._insercoes = 0
+        self._conexao = None
+        self._lock = threading.Lock()
+
+    def _conectar(self):
+        if self._conexao is None:
+            os.makedirs(os.path.dirname(self.caminho) or ".", exist_ok=True)
+            conexao = sqlite3.connect(self.caminho, check_same_thread=False)
+            conexao.execute("PRAGMA journal_mode=WAL")
+            conexao.execute(
+                "CREATE TABLE IF NOT EXISTS respostas ("
+                "chave TEXT PRIMARY KEY, valor TEXT, criado_em REAL, ultimo_acesso REAL)"
+            )
+            conexao.execute("CREATE INDEX IF NOT EXISTS idx_lru ON respostas (ultimo_acesso)")
+            self._conexao = conexao
+        return self._conexao
+
+    @staticmethod
+    def _chave(prompt, llm_string):
+        return hashlib.sha256(f"{llm_string}\n{prompt}".encode("utf-8")).hexdigest()
+
+    def lookup(self, prompt, llm_string):
+        if not self.ativo:
+            return None
+
+        chave = self._chave(prompt, llm_string)
+        agora = time.time()
+        with self._lock:
+            conexao = self._conectar()
+            linha = conexao.execute(
+                "SELECT valor, criado_em FROM respostas WHERE chave = ?", (chave,)
+            ).fetchone()
+
+            if linha is not None and self.ttl_segundos is not None and agora - linha[1] > self.ttl_segundos:
+                with conexao:
+                    conexao.execute("DELETE FROM respostas WHERE chave = ?", (chave,))
+                linha = None
+
+            if linha is None:
+                self.misses += 1
+                contar("cache_misses")
+                return None
+
+            with conexao:
+                conexao.execute("UPDATE respostas SET ultimo_acesso = ? WHERE chave = ?", (agora, chave))
+            self.hits += 1
+        contar("cache_hits")
+        geracoes = loads(linha[0])
+        for geracao in geracoes:
+            geracao.generation_info = {**(geracao.generation_info or {}), GERACAO_DO_CACHE: True}
+        return geracoes
+
+    def update(self, prompt, llm_string, return_val):
+        if not self.ativo:
+            return
+
+        chave = self._chave(prompt, llm_string)
+        agora = time.time()
+        with self._lock:
+            conexao = self._conectar()
+            with conexao:
+                conexao.execute(
+                    "INSERT OR REPLACE INTO respostas VALUES (?, ?, ?, ?)",
+                    (chave, dumps(list(return_val)), agora, agora),
+                )
+                self._insercoes += 1
+                # Verifica o limite periodicamente para não contar a tabela a cada inserção
+                if self._insercoes % 100 == 0:
+                    self._remover_excedentes(conexao)
+
+    def _remover_excedentes(self, conexao):
+        total = conexao.execute("SELECT COUNT(*) FROM respostas").fetchone()[0]
+        excedente = total - self.max_itens
+        if excedente > 0:
+            conexao.execute(
+                "DELETE FROM respostas WHERE chave IN "
+                "(SELECT chave FROM respostas ORDER BY ultimo_acesso LIMIT ?)",
+                (excedente,),
+            )
+
+    def clear(self, **kwargs):
+        with self._lock:
+            conexao = self._conectar()
+            with conexao:
+                conexao.execute("DELETE FROM respostas")
+
+    def estatisticas(self):
+        """Retorna os contadores de acertos/faltas e a taxa de acerto do cache."""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "taxa_acerto": self.hits / total if total else 0.0,
+        }
+
+
+_cache_padrao = None
+_cache_lock = threading.Lock()
+
+
+def obter_cache_padrao():
+    """Retorna o cache de respostas compartilhado pelo processo (criado no primeiro uso)."""
+    global _cache_padrao
+    with _cache_lock:
+        if _cache_padrao is None:
+            _cache_padrao = LLMResponseCache()
+        return _cache_padrao
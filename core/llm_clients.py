@@ -0,0 +1,32 @@
+import threading
+
+_clientes = {}
+_lock = threading.Lock()
+
+
+def obter_chat_model(modelo, temperature=0.4, gerenciado_por_scheduler=False, **kwargs):
+    """
+    Retorna um cliente ChatOpenAI compartilhado para a configuração informada.
+
+    Reaproveitar a mesma instância mantém o pool de conexões HTTP (keep-alive)
+    entre quotes, classificadores e execuções.
+
+    Com gerenciado_por_scheduler=True, o cliente não repete chamadas por conta própria
+    (max_retries=0): o LLMScheduler já faz as retentativas, e as duas se somariam.
+    """
+    if gerenciado_por_scheduler:
+        kwargs["max_retries"] = 0
+    chave = (modelo, temperature, tuple(sorted(kwargs.items())))
+    with _lock:
+        cliente = _clientes.get(chave)
+        if cliente is None:
+            from langchain_openai import ChatOpenAI
+            cliente = ChatOpenAI(model=modelo, temperature=temperature, **kwargs)
+            _clientes[chave] = cliente
+        return cliente
+
+
+def limpar_clientes():
+    """Descarta os clientes compartilhados (ex: após trocar a chave da API)."""
+    with _lock:
+        _clientes.clear()
@@ -0,0 +1,179 @@
+import os
+import random
+import threading
+import time
+from collections import deque
+
+from core import instrumentation
+
+
+def estimar_tokens(texto):
+    """Estimativa simples de tokens (~4 caracteres por token), suficiente para controle de cota."""
+    return max(1, len(str(texto)) // 4)
+
+
+def eh_cota_esgotada(erro):
+    """
+    Indica se a exceção é de cota/crédito esgotado (429 "insufficient_quota"), que nunca
+    se resolve esperando e portanto não deve ser repetida.
+    """
+    corpo = getattr(erro, "body", None)
+    codigo = getattr(erro, "code", None) or (corpo.get("code") if isinstance(corpo, dict) else None)
+    return codigo == "insufficient_quota" or "insufficient_quota" in str(erro).lower()
+
+
+def eh_erro_limite(erro):
+    """
+    Indica se a exceção corresponde a um limite de taxa temporário (HTTP 429 / rate limit),
+    que vale a pena repetir. Cota esgotada (insufficient_quota) não entra.
+    """
+    if eh_cota_esgotada(erro):
+        return False
+    if type(erro).__name__ == "RateLimitError":
+        return True
+    if getattr(erro, "status_code", None) == 429:
+        return True
+    mensagem = str(erro).lower()
+    return "429" in mensagem or "rate limit" in mensagem or "rate_limit" in mensagem
+
+
+def _espera_sugerida(erro):
+    """Lê o cabeçalho Retry-After da resposta, quando disponível."""
+    resposta = getattr(erro, "response", None)
+    cabecalhos = getattr(resposta, "headers", None) or {}
+    try:
+        return float(cabecalhos.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """
+    Balde de fichas com reposição contínua, usado para limitar uma cota por minuto.
+    Uma capacidade None desativa o limite.
+    """
+
+    def __init__(self, capacidade_por_minuto=None):
+        self.capacidade = capacidade_por_minuto
+        self.disponivel = float(capacidade_por_minuto or 0)
+        self._ultimo = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _repor(self):
+        agora = time.monotonic()
+        self.disponivel = min(
+            self.capacidade, self.disponivel + (agora - self._ultimo) * self.capacidade / 60.0
+        )
+        self._ultimo = agora
+
+    def consumir(self, quantidade=1):
+        """Bloqueia até haver fichas suficientes e as consome."""
+        if not self.capacidade:
+            return
+        quantidade = min(quantidade, self.capacidade)
+        while True:
+            with self._lock:
+                self._repor()
+                if self.disponivel >= quantidade:
+                    self.disponivel -= quantidade
+                    return
+                espera = (quantidade - self.disponivel) * 60.0 / self.capacidade
+            time.sleep(espera)
+
+
+class LLMScheduler:
+    """
+    Agendador compartilhado de chamadas ao LLM.
+
+    - Envia as entradas em lotes com Runnable.batch (chamadas simultâneas limitadas)
+    - Respeita cotas de requisições/minuto e tokens/minuto (token bucket)
+    - Em erros de limite de taxa, aguarda com backoff exponencial + jitter e
+      recoloca os itens na fila, em vez de descartá-los
+
+    As retentativas ficam todas aqui: os clientes usados com o agendador são criados
+    sem retentativas próprias (obter_chat_model(..., gerenciado_por_scheduler=True)).
+    """
+
+    def __init__(self, requisicoes_por_minuto=None, tokens_por_minuto=None, tamanho_lote=20,
+                 max_concurrency=8, max_tentativas=6, espera_base=1.0, espera_maxima=60.0):
+        self.requisicoes = TokenBucket(requisicoes_por_minuto)
+        self.tokens = TokenBucket(tokens_por_minuto)
+        self.tamanho_lote = max(1, int(tamanho_lote))
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.max_tentativas = max_tentativas
+        self.espera_base = espera_base
+        self.espera_maxima = espera_maxima
+        self.retentativas = 0  # Total de itens recolocados na fila por limite de taxa
+
+    @classmethod
+    def from_env(cls):
+        """
+        Cria o agendador a partir das variáveis de ambiente, ou retorna None se nenhuma
+        cota estiver configurada (LLM_REQUISICOES_POR_MINUTO / LLM_TOKENS_POR_MINUTO).
+        """
+        rpm = os.getenv("LLM_REQUISICOES_POR_MINUTO")
+        tpm = os.getenv("LLM_TOKENS_POR_MINUTO")
+        if not (rpm or tpm):
+            return None
+        return cls(
+            requisicoes_por_minuto=int(rpm) if rpm else None,
+            tokens_por_minuto=int(tpm) if tpm else None,
+            tamanho_lote=int(os.getenv("LLM_TAMANHO_LOTE", "20")),
+            max_concurrency=int(os.getenv("MAX_CONCORRENCIA_LLM", "8")),
+        )
+
+    def _espera(self, tentativa, erro):
+        sugerida = _espera_sugerida(erro)
+        if sugerida is not None:
+            return min(sugerida, self.espera_maxima)
+        espera = min(self.espera_maxima, self.espera_base * (2 ** (tentativa - 1)))
+        return espera * random.uniform(0.5, 1.5)
+
+    def executar(self, runnable, entradas, estimar=None):
+        """
+        Executa o runnable para todas as entradas e retorna as respostas na mesma ordem.
+
+        Parâmetros:
+        - runnable: chain LangChain (prompt | llm | parser)
+        - entradas: lista de dicionários com as variáveis do prompt
+        - estimar: função entrada → tokens estimados (padrão: tamanho dos valores)
+
+        Erros que não são de limite de taxa (ou que esgotaram as tentativas) são
+        devolvidos como exceções na posição correspondente.
+        """
+        estimar = estimar or (lambda entrada: estimar_tokens(" ".join(map(str, entrada.values()))))
+        resultados = [None] * len(entradas)
+        tentativas = [0] * len(entradas)
+        pendentes = deque(range(len(entradas)))
+
+        while pendentes:
+            lote = [pendentes.popleft() for _ in range(min(self.tamanho_lote, len(pendentes)))]
+            for i in lote:
+                self.requisicoes.consumir(1)
+                self.tokens.consumir(estimar(entradas[i]))
+
+            respostas = runnable.batch(
+                [entradas[i] for i in lote],
+                config={"max_concurrency": self.max_concurrency},
+                return_exceptions=True,
+            )
+
+            falhas = []
+            ultimo_erro = None
+            for i, resposta in zip(lote, respostas):
+                if isinstance(resposta, Exception) and eh_erro_limite(resposta) \
+                        and tentativas[i] < self.max_tentativas:
+                    tentativas[i] += 1
+                    falhas.append(i)
+                    ultimo_erro = resposta
+                else:
+                    resultados[i] = resposta
+
+            if falhas:
+                self.retentativas += len(falhas)
+                instrumentation.contar("retentativas", len(falhas))
+                time.sleep(self._espera(max(tentativas[i] for i in falhas), ultimo_erro))
+                # Recoloca no início da fila para manter a ordem aproximada de conclusão
+                pendentes.extendleft(reversed(falhas))
+
+        return resultados
@@ -0,0 +1,185 @@
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+# Janela padrão (s) para agrupar pedidos concorrentes em um único lote
+JANELA_PADRAO = 0.01
+
+# Quantidade de tempos de espera mantidos para os percentis das métricas
+AMOSTRAS_METRICAS = 1000
+
+_FIM = object()
+
+
+def _faixa_histograma(tamanho):
+    """Faixa (potência de 2) do histograma de tamanhos de lote: 1, 2, 4, 8, ..."""
+    limite = 1
+    while limite < tamanho:
+        limite *= 2
+    return limite
+
+
+def _percentil(valores, p):
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(round((len(ordenados) - 1) * p / 100)))]
+
+
+class MicroBatcher:
+    """
+    Agrupa pedidos concorrentes de um item cada em lotes, processados por uma única thread.
+
+    O primeiro pedido abre uma janela de `janela` segundos; os pedidos que chegam nesse
+    intervalo (até `tamanho_maximo`) entram no mesmo lote, e `processar_lote(itens)` é
+    chamado uma vez, devolvendo um resultado por item, na mesma ordem. Assim, por exemplo,
+    vários quotes enviados ao mesmo tempo por clientes diferentes são codificados em uma
+    única passada do modelo de embeddings.
+
+    Como apenas a thread do batcher chama `processar_lote`, o objeto processado (ex: um
+    classificador) não precisa ser seguro para uso concorrente.
+
+    A falha de um item não derruba os demais do lote: se `processar_lote` levantar uma
+    exceção, os itens são reprocessados um a um e apenas os que falharem de novo recebem
+    o erro. `processar_lote` também pode devolver a exceção de um item no lugar do seu resultado.
+    """
+
+    def __init__(self, processar_lote, janela=JANELA_PADRAO, tamanho_maximo=64, max_fila=None, nome="batcher"):
+        """
+        - processar_lote: função lista de itens → lista de resultados (mesma ordem e tamanho)
+        - janela: tempo máximo (s) que o primeiro item de um lote espera por companhia
+        - tamanho_maximo: itens por lote (o lote é enviado assim que atinge esse tamanho)
+        - max_fila: itens aguardando além dos quais novos pedidos são recusados (None = sem limite)
+        """
+        self.processar_lote = processar_lote
+        self.janela = janela
+        self.tamanho_maximo = max(1, int(tamanho_maximo))
+        self.max_fila = max_fila
+        self._fila = queue.Queue()
+        self._lock = threading.Lock()
+        self._fechado = False
+        self._metricas = {
+            "pedidos": 0, "lotes": 0, "itens_processados": 0, "erros": 0, "recusados": 0, "fila_maxima": 0,
+        }
+        self._histograma = {}  # faixa de tamanho → quantidade de lotes
+        self._esperas = deque(maxlen=AMOSTRAS_METRICAS)  # s entre a chegada e o início do lote
+        self._duracoes = deque(maxlen=AMOSTRAS_METRICAS)  # s de processamento de cada lote
+        self._thread = threading.Thread(target=self._executar, name=nome, daemon=True)
+        self._thread.start()
+
+    def submeter(self, item):
+        """Enfileira um item e retorna um Future com o seu resultado."""
+        with self._lock:
+            if self._fechado:
+                raise RuntimeError("Batcher encerrado.")
+            profundidade = self._fila.qsize()
+            if self.max_fila is not None and profundidade >= self.max_fila:
+                self._metricas["recusados"] += 1
+                raise RuntimeError(f"Fila cheia ({profundidade} itens aguardando).")
+            self._metricas["pedidos"] += 1
+            self._metricas["fila_maxima"] = max(self._metricas["fila_maxima"], profundidade + 1)
+            future = Future()
+            self._fila.put((item, future, time.perf_counter()))
+        return future
+
+    def processar(self, item, timeout=None):
+        """Atalho: submete o item e aguarda o resultado."""
+        return self.submeter(item).result(timeout)
+
+    def _coletar_lote(self):
+        """Aguarda o primeiro pedido e reúne os que chegarem dentro da janela."""
+        primeiro = self._fila.get()
+        if primeiro is _FIM:
+            return None
+        lote = [primeiro]
+        prazo = time.perf_counter() + self.janela
+        while len(lote) < self.tamanho_maximo:
+            restante = prazo - time.perf_counter()
+            try:
+                pedido = self._fila.get(timeout=restante) if restante > 0 else self._fila.get_nowait()
+            except queue.Empty:
+                break
+            if pedido is _FIM:
+                self._fila.put(_FIM)  # Encerra após processar o lote atual
+                break
+            lote.append(pedido)
+        return lote
+
+    def _executar(self):
+        while True:
+            lote = self._coletar_lote()
+            if lote is None:
+                return
+            # Pedidos cancelados pelo cliente enquanto aguardavam não são processados
+            lote = [pedido for pedido in lote if pedido[1].set_running_or_notify_cancel()]
+            if not lote:
+                continue
+
+            inicio = time.perf_counter()
+            itens = [item for item, _, _ in lote]
+            try:
+                resultados = self._processar(itens)
+            except Exception as e:
+                # Isola o(s) item(ns) com problema: cada um é processado sozinho
+                resultados = [e] if len(itens) == 1 else [self._processar_isolado(item) for item in itens]
+
+            erros = 0
+            for (_, future, _), resultado in zip(lote, resultados):
+                if isinstance(resultado, Exception):
+                    future.set_exception(resultado)
+                    erros += 1
+                else:
+                    future.set_result(resultado)
+
+            with self._lock:
+                self._metricas["lotes"] += 1
+                self._metricas["itens_processados"] += len(lote)
+                self._metricas["erros"] += erros
+                faixa = _faixa_histograma(len(lote))
+                self._histograma[faixa] = self._histograma.get(faixa, 0) + 1
+                self._esperas.extend(inicio - chegada for _, _, chegada in lote)
+                self._duracoes.append(time.perf_counter() - inicio)
+
+    def _processar(self, itens):
+        resultados = self.processar_lote(itens)
+        if len(resultados) != len(itens):
+            raise RuntimeError(f"processar_lote devolveu {len(resultados)} resultados para {len(itens)} itens")
+        return resultados
+
+    def _processar_isolado(self, item):
+        """Processa um único item, devolvendo a exceção (em vez de levantá-la) se ele falhar."""
+        try:
+            return self._processar([item])[0]
+        except Exception as e:
+            return e
+
+    def metricas(self):
+        """Profundidade da fila, histograma de tamanhos de lote e tempos de espera/processamento."""
+        with self._lock:
+            metricas = dict(self._metricas)
+            histograma = dict(sorted(self._histograma.items()))
+            esperas = list(self._esperas)
+            duracoes = list(self._duracoes)
+        lotes = metricas["lotes"]
+        return {
+            **metricas,
+            "profundidade_fila": self._fila.qsize(),
+            "tamanho_medio_lote": round(metricas["itens_processados"] / lotes, 2) if lotes else 0.0,
+            # Chave = limite superior da faixa: "4" conta os lotes com 3 ou 4 itens
+            "histograma_lotes": {str(faixa): quantidade for faixa, quantidade in histograma.items()},
+            "espera_p50_ms": round(_percentil(esperas, 50) * 1000, 2),
+            "espera_p95_ms": round(_percentil(esperas, 95) * 1000, 2),
+            "lote_p50_ms": round(_percentil(duracoes, 50) * 1000, 2),
+            "lote_p95_ms": round(_percentil(duracoes, 95) * 1000, 2),
+        }
+
+    def fechar(self, timeout=None):
+        """Processa os pedidos já enfileirados e encerra a thread do batcher."""
+        with self._lock:
+            if self._fechado:
+                return
+            self._fechado = True
+            self._fila.put(_FIM)
+        self._thread.join(timeout)
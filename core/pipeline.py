@@ -1,67 +1,172 @@
 import pandas as pd
 from pathlib import Path
-from classifiers.base import BaseQuoteClassifier
+from classifiers.base import BaseQuoteClassifier, JustificativaComFalha
+from core.construct_cache import hash_texto
+from core.instrumentation import ETAPA_QUOTE, Tracer
+from core.result_writer import criar_writer
 
 class ClassificationPipeline:
     """
     Classe responsável por executar o pipeline de classificação de quotes.
-    Recebe um DataFrame, o nome da coluna com os quotes, o nome da coluna onde será
-    inserida a classificação, e um classificador que implementa a interface BaseQuoteClassifier.
+    Recebe um DataFrame (ou um iterável de blocos de DataFrame, ex: QuoteDatasetLoader.iter_chunks),
+    o nome da coluna com os quotes, o nome da coluna onde será inserida a classificação,
+    e um classificador que implementa a interface BaseQuoteClassifier.
+
+    Com entrada em blocos, o resultado é gravado bloco a bloco por um ResultWriter (obrigatório),
+    mantendo a memória constante em planilhas grandes; apenas um DataFrame único pode ser
+    classificado sem writer, com o resultado devolvido em memória.
     """    
-    def __init__(self, df, quote_column, class_column, classifier: BaseQuoteClassifier):
-        # Criando uma cópia do DataFrame original para preservar os dados de entrada
-        self.df = df.copy()
+    def __init__(self, df, quote_column, class_column, classifier: BaseQuoteClassifier, journal=None,
+                 total=None, writer=None, tracer=None):
+        if writer is None and not isinstance(df, pd.DataFrame):
+            raise ValueError(
+                "Entrada em blocos requer um writer: cada bloco é gravado ao terminar, sem acumular em memória."
+            )
+        # Blocos de entrada; um DataFrame único é tratado como um só bloco. Os blocos não são
+        # copiados: as colunas de resultado são atribuídas como colunas novas em cada bloco
+        self.blocos = [df] if isinstance(df, pd.DataFrame) else df
+        self.df = None  # DataFrame classificado, disponível ao final de run()
         self.quote_column = quote_column  # Nome da coluna com os trechos (quotes)
         self.class_column = class_column  #Nome da coluna onde será inserida a classificação
         self.classifier = classifier # Instância do classificador (LLM, embedding ou híbrido,ou outro)
         self.tempos = []  # Lista para armazenar o tempo de processamento de cada quote
+        self.journal = journal  # RunJournal opcional: grava cada quote concluído e permite retomar
+        self.retomados = 0  # Quantidade de quotes reaproveitados do diário
+        self.falhas = 0  # Quotes com erro na consulta ao LLM (não registrados no diário)
+        # Total de quotes, quando conhecido de antemão (usado apenas no progresso)
+        self.total = len(df) if isinstance(df, pd.DataFrame) else total
+        self.interrompido = False
+        # ResultWriter opcional: cada bloco concluído é gravado e descartado da memória
+        self.writer = writer
+        # Tracer da execução: spans por etapa (embed, rank, prompt, LLM, parse, quote) e tokens
+        self.tracer = tracer or Tracer()
+        self.processados = 0  # Quotes concluídos (classificados ou retomados do diário)
 
     def run(self, progress=None, deve_interromper=None) -> pd.DataFrame:
         """
         Executa o pipeline de classificação dos quotes no DataFrame,
         utilizando o classificador fornecido.
 
+        Os blocos de entrada são lidos um de cada vez e os resultados são consumidos de
+        forma incremental (classify_iter): o progresso é atualizado a cada quote concluído
+        e, ao ser solicitada a interrupção, o classificador deixa de iniciar novas chamadas
+        imediatamente (os blocos restantes seguem para a saída sem classificação).
+
         Parâmetros:
             progress (callable, opcional): função para indicar progresso ao usuário.
             deve_interromper (callable, opcional): função que retorna True se o processo
             deve ser interrompido (ex: clique do usuário em botão de parar).
 
         Retorna:
-            pd.DataFrame: DataFrame com as colunas de classificação e justificativa adicionadas.
+            pd.DataFrame: DataFrame com as colunas de classificação e justificativa adicionadas
+            (None se um writer foi informado: os blocos são gravados à medida que terminam).
         """
-        quotes = self.df[self.quote_column].tolist()
+        concluidos = self.journal.carregar() if self.journal is not None else {}
 
-        resultados, justificativas, tempos = self.classifier.classify(quotes)
+        saida = []
+        deslocamento = 0  # Posição do primeiro quote do bloco na planilha
+        try:
+            # Tracer ativo no contexto: classificadores e callbacks do LLM registram nele
+            with self.tracer.ativo():
+                for bloco in self.blocos:
+                    if self.interrompido:
+                        # Bloco não classificado: recebe as colunas de resultado vazias para manter
+                        # o mesmo esquema dos blocos anteriores (exigido pelo Parquet/Arrow)
+                        bloco = self._com_resultados(bloco, {})
+                    else:
+                        bloco = self._classificar_bloco(bloco, deslocamento, concluidos, progress, deve_interromper)
+                    deslocamento += len(bloco)
+                    if self.writer is not None:
+                        self.writer.escrever(bloco)
+                    else:
+                        saida.append(bloco)
+        finally:
+            # Conclui o arquivo mesmo em caso de erro, preservando os blocos já gravados
+            if self.writer is not None:
+                self.writer.fechar()
+            self.tracer.fechar()
 
-        resultados_finais = []
-        justificativas_finais = []
+        if self.writer is not None:
+            # Resultado já gravado no arquivo; nada fica em memória
+            return None
 
-        for i, t in enumerate(tempos):
-            # Verifica se uma função de interrupção foi fornecida e se ela retorna True.
-            # Isso permite que o pipeline seja interrompido de forma segura durante a execução,
-            # útil, por exemplo, quando o usuário clica em um botão "Interromper" na interface.
-            if deve_interromper and deve_interromper():
-                print("⚠️ Interrupção solicitada. Encerrando processamento.")
-                break
+        self.df = pd.concat(saida) if saida else pd.DataFrame()
+        return self.df
 
-            print(f"Quote {i+1} levou {t:.2f} segundos")
+    def _classificar_bloco(self, bloco, deslocamento, concluidos, progress, deve_interromper):
+        """Classifica os quotes de um bloco e devolve o bloco com as colunas de resultado."""
+        quotes = bloco[self.quote_column].tolist()
 
-            resultados_finais.append(resultados[i])
-            justificativas_finais.append(justificativas[i])
+        # Reaproveita os quotes já registrados no diário e classifica apenas os pendentes
+        resultados = {}
+        pendentes = []
+        for i, quote in enumerate(quotes):
+            registro = concluidos.get(hash_texto(quote)) if concluidos else None
+            if registro is None:
+                pendentes.append(i)
+            else:
+                resultados[i] = registro[:2]
+        if resultados:
+            self.retomados += len(resultados)
+            self.processados += len(resultados)
+            self.tracer.registrar_evento("retomada", quotes=len(resultados), posicao=deslocamento + 1)
 
-            if progress:
-                progress(i + 1, len(quotes))
+        iterador = self.classifier.classify_iter([quotes[i] for i in pendentes])
+        try:
+            while True:
+                # Verifica se uma função de interrupção foi fornecida e se ela retorna True.
+                # Isso permite que o pipeline seja interrompido de forma segura durante a execução,
+                # útil, por exemplo, quando o usuário clica em um botão "Interromper" na interface.
+                if deve_interromper and deve_interromper():
+                    self.interrompido = True
+                    self.tracer.registrar_evento("interrupcao", processados=self.processados)
+                    break
 
-        # Preenche os resultados no DataFrame (inclusive se incompleto por interrupção)
-        self.df.loc[:len(resultados_finais)-1, self.class_column] = resultados_finais
-        self.df.loc[:len(justificativas_finais)-1, self.class_column + "_justificativa"] = justificativas_finais
+                try:
+                    j, resultado, justificativa, t = next(iterador)
+                except StopIteration:
+                    break
 
-        return self.df
-    
-    def export(self, path: str | Path):
+                i = pendentes[j]
+                self.tracer.registrar_span(ETAPA_QUOTE, t, posicao=deslocamento + i + 1)
+                resultados[i] = (resultado, justificativa)
+                self.tempos.append(t)
+                self.processados += 1
+                if isinstance(justificativa, JustificativaComFalha):
+                    # Fica fora do diário: uma nova execução tenta o quote de novo
+                    self.falhas += 1
+                elif self.journal is not None:
+                    self.journal.registrar(quotes[i], resultado, justificativa, t)
+
+                if progress:
+                    progress(self.processados, self.total)
+        finally:
+            # Encerra o classificador: nenhuma nova chamada é iniciada após a interrupção
+            iterador.close()
+
+        # Preenche os resultados no bloco (inclusive se incompleto por interrupção)
+        return self._com_resultados(bloco, resultados)
+
+    def _com_resultados(self, bloco, resultados):
+        """
+        Devolve o bloco com as colunas de classificação e justificativa preenchidas com
+        `resultados` ({posição: (constructo, justificativa)}). As colunas são substituídas por
+        inteiro, preservando os valores originais (ou None) das linhas não classificadas.
+        """
+        bloco = bloco.copy(deep=False)
+        for coluna, posicao in ((self.class_column, 0), (self.class_column + "_justificativa", 1)):
+            valores = bloco[coluna].tolist() if coluna in bloco.columns else [None] * len(bloco)
+            for i, resultado in resultados.items():
+                valores[i] = resultado[posicao]
+            bloco[coluna] = valores
+        return bloco
+
+    def export(self, path: str | Path, formato=None):
         """
-        Exporta o DataFrame classificado para um arquivo Excel (.xlsx).
+        Exporta o DataFrame classificado para um arquivo Excel (.xlsx), Parquet,
+        Arrow IPC ou CSV (formato informado ou deduzido da extensão).
         Retorna o caminho do arquivo salvo.
         """
-        self.df.to_excel(path, index=False)
-        return str(path)
\ No newline at end of file
+        writer = criar_writer(path, formato)
+        writer.escrever(self.df)
+        return writer.fechar()
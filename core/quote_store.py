@@ -0,0 +1,218 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+from core.construct_cache import hash_texto
+from core.embeddings import TAMANHO_LOTE_PADRAO, codificar_normalizado
+
+# Pasta padrão do armazenamento de embeddings de quotes
+DIRETORIO_STORE_QUOTES = os.path.join("cache", "quotes")
+
+# Quantidade máxima de embeddings mantidos por modelo antes da remoção por LRU
+MAX_ITENS_PADRAO = 200_000
+
+
+class QuoteEmbeddingStore:
+    """
+    Armazenamento local de embeddings de quotes, endereçado pelo conteúdo.
+
+    - Índice em SQLite: (modelo, hash do quote) → posição na matriz e último acesso
+    - Vetores em um arquivo float16 via memory-map (um arquivo por modelo)
+    - Capacidade limitada por modelo; ao lotar, os itens usados há mais tempo são
+      removidos (LRU) e suas posições reaproveitadas
+
+    Os vetores são armazenados normalizados; por estarem em float16, as similaridades
+    de um quote lido do armazenamento podem diferir na 3ª/4ª casa decimal das de
+    uma codificação nova.
+    """
+
+    def __init__(self, diretorio=DIRETORIO_STORE_QUOTES, max_itens=MAX_ITENS_PADRAO):
+        self.diretorio = diretorio
+        self.max_itens = max_itens
+        self.hits = 0
+        self.misses = 0
+        self._conexao = None
+        self._matrizes = {}
+        self._lock = threading.Lock()
+
+    def _conectar(self):
+        if self._conexao is None:
+            os.makedirs(self.diretorio, exist_ok=True)
+            conexao = sqlite3.connect(
+                os.path.join(self.diretorio, "indice.sqlite"), check_same_thread=False
+            )
+            conexao.execute("PRAGMA journal_mode=WAL")
+            conexao.execute("PRAGMA synchronous=NORMAL")
+            conexao.execute(
+                "CREATE TABLE IF NOT EXISTS modelos ("
+                "modelo TEXT PRIMARY KEY, dimensao INTEGER, capacidade INTEGER, proximo_slot INTEGER)"
+            )
+            conexao.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "modelo TEXT, chave TEXT, slot INTEGER, ultimo_acesso REAL, "
+                "PRIMARY KEY (modelo, chave))"
+            )
+            conexao.execute(
+                "CREATE INDEX IF NOT EXISTS idx_lru ON embeddings (modelo, ultimo_acesso)"
+            )
+            self._conexao = conexao
+        return self._conexao
+
+    def _arquivo_vetores(self, modelo):
+        nome_seguro = re.sub(r"[^\w.-]", "_", modelo)
+        return os.path.join(self.diretorio, f"{nome_seguro}.f16")
+
+    def _matriz(self, modelo, dimensao):
+        """Abre (ou cria) a matriz float16 do modelo, recriando-a se a capacidade mudou."""
+        if modelo in self._matrizes:
+            return self._matrizes[modelo]
+
+        conexao = self._conectar()
+        linha = conexao.execute(
+            "SELECT dimensao, capacidade FROM modelos WHERE modelo = ?", (modelo,)
+        ).fetchone()
+        caminho = self._arquivo_vetores(modelo)
+
+        if linha == (dimensao, self.max_itens) and os.path.exists(caminho):
+            matriz = np.memmap(caminho, dtype=np.float16, mode="r+", shape=(self.max_itens, dimensao))
+        else:
+            matriz = np.memmap(caminho, dtype=np.float16, mode="w+", shape=(self.max_itens, dimensao))
+            with conexao:
+                conexao.execute("DELETE FROM embeddings WHERE modelo = ?", (modelo,))
+                conexao.execute(
+                    "INSERT OR REPLACE INTO modelos VALUES (?, ?, ?, 0)",
+                    (modelo, dimensao, self.max_itens),
+                )
+        self._matrizes[modelo] = matriz
+        return matriz
+
+    def _reservar_slots(self, conexao, modelo, quantidade):
+        """Reserva posições livres na matriz, removendo os itens menos usados se necessário."""
+        proximo = conexao.execute(
+            "SELECT proximo_slot FROM modelos WHERE modelo = ?", (modelo,)
+        ).fetchone()[0]
+        livres = min(quantidade, self.max_itens - proximo)
+        slots = list(range(proximo, proximo + livres))
+        conexao.execute(
+            "UPDATE modelos SET proximo_slot = ? WHERE modelo = ?", (proximo + livres, modelo)
+        )
+
+        faltantes = quantidade - livres
+        if faltantes > 0:
+            removidos = conexao.execute(
+                "SELECT chave, slot FROM embeddings WHERE modelo = ? ORDER BY ultimo_acesso LIMIT ?",
+                (modelo, faltantes),
+            ).fetchall()
+            conexao.executemany(
+                "DELETE FROM embeddings WHERE modelo = ? AND chave = ?",
+                [(modelo, chave) for chave, _ in removidos],
+            )
+            slots.extend(slot for _, slot in removidos)
+        return slots
+
+    def obter(self, embedder, modelo, textos, batch_size=TAMANHO_LOTE_PADRAO):
+        """
+        Retorna a matriz (len(textos), dimensão) de embeddings normalizados dos quotes,
+        lendo do armazenamento os já conhecidos e codificando apenas os demais.
+
+        Parâmetros:
+        - embedder: modelo SentenceTransformer usado para os quotes ausentes
+        - modelo: nome do modelo (compõe a chave)
+        - textos: lista de quotes
+        """
+        dimensao = embedder.get_sentence_embedding_dimension()
+        chaves = [hash_texto(texto) for texto in textos]
+        resultado = np.zeros((len(textos), dimensao), dtype=np.float32)
+        agora = time.time()
+
+        with self._lock:
+            conexao = self._conectar()
+            matriz = self._matriz(modelo, dimensao)
+
+            slots_conhecidos = {}
+            unicas = list(dict.fromkeys(chaves))
+            for inicio in range(0, len(unicas), 500):
+                parte = unicas[inicio:inicio + 500]
+                marcadores = ",".join("?" * len(parte))
+                slots_conhecidos.update(conexao.execute(
+                    f"SELECT chave, slot FROM embeddings WHERE modelo = ? AND chave IN ({marcadores})",
+                    (modelo, *parte),
+                ).fetchall())
+
+            ausentes = {}
+            for posicao, (chave, texto) in enumerate(zip(chaves, textos)):
+                if chave in slots_conhecidos:
+                    resultado[posicao] = matriz[slots_conhecidos[chave]]
+                    self.hits += 1
+                else:
+                    ausentes.setdefault(chave, (texto, []))[1].append(posicao)
+                    self.misses += 1
+
+            with conexao:
+                conexao.executemany(
+                    "UPDATE embeddings SET ultimo_acesso = ? WHERE modelo = ? AND chave = ?",
+                    [(agora, modelo, chave) for chave in slots_conhecidos],
+                )
+
+                if ausentes:
+                    novos = codificar_normalizado(
+                        embedder, [texto for texto, _ in ausentes.values()], batch_size
+                    )
+                    for vetor, (_, posicoes) in zip(novos, ausentes.values()):
+                        resultado[posicoes] = vetor
+
+                    # Só armazena o que cabe na capacidade; os mais recentes têm prioridade
+                    armazenar = list(zip(ausentes, novos))[-self.max_itens:]
+                    slots = self._reservar_slots(conexao, modelo, len(armazenar))
+                    for slot, (_, vetor) in zip(slots, armazenar):
+                        matriz[slot] = vetor
+                    conexao.executemany(
+                        "INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?)",
+                        [(modelo, chave, slot, agora) for slot, (chave, _) in zip(slots, armazenar)],
+                    )
+                    matriz.flush()
+
+        return resultado
+
+    def estatisticas(self):
+        """Retorna os contadores de acertos/faltas e a taxa de acerto do armazenamento."""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "taxa_acerto": self.hits / total if total else 0.0,
+        }
+
+    def fechar(self):
+        """Fecha a conexão com o índice e libera os arquivos mapeados."""
+        with self._lock:
+            for matriz in self._matrizes.values():
+                matriz.flush()
+            self._matrizes.clear()
+            if self._conexao is not None:
+                self._conexao.close()
+                self._conexao = None
+
+
+_store_padrao = None
+_store_lock = threading.Lock()
+
+
+def obter_store_padrao():
+    """Retorna o armazenamento de quotes compartilhado pelo processo (criado no primeiro uso)."""
+    global _store_padrao
+    with _store_lock:
+        if _store_padrao is None:
+            _store_padrao = QuoteEmbeddingStore()
+        return _store_padrao
+
+
+def codificar_quotes(embedder, modelo, quotes, batch_size=TAMANHO_LOTE_PADRAO, quote_store=None):
+    """Codifica quotes (normalizados), consultando o armazenamento local quando informado."""
+    if quote_store is None:
+        return codificar_normalizado(embedder, quotes, batch_size)
+    return quote_store.obter(embedder, modelo, quotes, batch_size)
@@ -0,0 +1,240 @@
+import os
+import time
+from abc import ABC, abstractmethod
+
+import pandas as pd
+
+# Formatos de saída suportados (o valor é a extensão do arquivo)
+FORMATO_XLSX = "xlsx"
+FORMATO_PARQUET = "parquet"
+FORMATO_ARROW = "arrow"
+FORMATO_CSV = "csv"
+FORMATOS_SAIDA = (FORMATO_XLSX, FORMATO_PARQUET, FORMATO_ARROW, FORMATO_CSV)
+
+
+def formato_saida_padrao():
+    """
+    Formato usado quando nenhum é configurado: Parquet se o pyarrow estiver instalado,
+    senão CSV. Ambos são gravados bloco a bloco; o .xlsx fica para gerar_excel (sob demanda).
+    """
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return FORMATO_CSV
+    return FORMATO_PARQUET
+
+
+def _normalizar_bloco(bloco):
+    """
+    Prepara um bloco para gravação colunar com esquema estável entre blocos:
+    colunas de texto/mistas viram string (nulos preservados) e inteiros viram float,
+    já que um bloco seguinte pode trazer células vazias na mesma coluna.
+    """
+    bloco = bloco.reset_index(drop=True)
+    colunas = {}
+    for coluna in bloco.columns:
+        serie = bloco[coluna]
+        if pd.api.types.is_bool_dtype(serie) or pd.api.types.is_float_dtype(serie) \
+                or pd.api.types.is_datetime64_any_dtype(serie):
+            colunas[coluna] = serie
+        elif pd.api.types.is_integer_dtype(serie):
+            colunas[coluna] = serie.astype("float64")
+        else:
+            colunas[coluna] = serie.where(serie.isna(), serie.astype(str)).astype("string")
+    return pd.DataFrame(colunas)
+
+
+class ResultWriter(ABC):
+    """
+    Gravador incremental do resultado da classificação.
+
+    Cada bloco classificado é gravado assim que termina (escrever) e descartado da
+    memória; fechar() conclui o arquivo. O tempo gasto gravando e o tamanho final
+    ficam disponíveis para o relatório da execução.
+    """
+
+    formato = None
+
+    def __init__(self, caminho):
+        self.caminho = str(caminho)
+        self.linhas = 0
+        self.tempo_escrita = 0.0
+        self.tamanho_bytes = 0
+        os.makedirs(os.path.dirname(self.caminho) or ".", exist_ok=True)
+
+    def escrever(self, bloco):
+        inicio = time.perf_counter()
+        self._escrever(bloco)
+        self.linhas += len(bloco)
+        self.tempo_escrita += time.perf_counter() - inicio
+
+    def fechar(self):
+        """Conclui o arquivo e retorna o seu caminho."""
+        inicio = time.perf_counter()
+        self._fechar()
+        self.tempo_escrita += time.perf_counter() - inicio
+        self.tamanho_bytes = os.path.getsize(self.caminho) if os.path.exists(self.caminho) else 0
+        return self.caminho
+
+    @abstractmethod
+    def _escrever(self, bloco):
+        """Grava um bloco no arquivo (implementado por cada formato)."""
+        pass
+
+    def _fechar(self):
+        pass
+
+    def resumo(self):
+        """Linha de relatório com formato, linhas, tempo de gravação e tamanho do arquivo."""
+        return (
+            f"{self.formato.upper()}: {self.linhas} linhas gravadas em {self.tempo_escrita:.2f}s "
+            f"({self.tamanho_bytes / 1024 / 1024:.2f} MB)"
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fechar()
+
+
+class ParquetResultWriter(ResultWriter):
+    """Grava os blocos como row groups de um arquivo Parquet (requer pyarrow)."""
+
+    formato = FORMATO_PARQUET
+
+    def __init__(self, caminho, compressao="zstd"):
+        super().__init__(caminho)
+        self.compressao = compressao
+        self._writer = None
+        self._schema = None
+
+    def _tabela(self, bloco):
+        import pyarrow as pa
+        return pa.Table.from_pandas(_normalizar_bloco(bloco), schema=self._schema, preserve_index=False)
+
+    def _escrever(self, bloco):
+        import pyarrow.parquet as pq
+
+        tabela = self._tabela(bloco)
+        if self._writer is None:
+            self._schema = tabela.schema
+            self._writer = pq.ParquetWriter(self.caminho, self._schema, compression=self.compressao)
+        self._writer.write_table(tabela)
+
+    def _fechar(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+class ArrowResultWriter(ParquetResultWriter):
+    """Grava os blocos como record batches de um arquivo Arrow IPC / Feather v2 (requer pyarrow)."""
+
+    formato = FORMATO_ARROW
+
+    def __init__(self, caminho):
+        super().__init__(caminho, compressao=None)
+        self._arquivo = None
+
+    def _escrever(self, bloco):
+        import pyarrow as pa
+
+        tabela = self._tabela(bloco)
+        if self._writer is None:
+            self._schema = tabela.schema
+            self._arquivo = pa.OSFile(self.caminho, "wb")
+            self._writer = pa.ipc.new_file(self._arquivo, self._schema)
+        self._writer.write_table(tabela)
+
+    def _fechar(self):
+        super()._fechar()
+        if self._arquivo is not None:
+            self._arquivo.close()
+            self._arquivo = None
+
+
+class CSVResultWriter(ResultWriter):
+    """Acrescenta os blocos a um arquivo CSV (UTF-8 com BOM, para abrir corretamente no Excel)."""
+
+    formato = FORMATO_CSV
+
+    def _escrever(self, bloco):
+        primeiro = self.linhas == 0
+        bloco.to_csv(
+            self.caminho, mode="w" if primeiro else "a", header=primeiro, index=False,
+            encoding="utf-8-sig" if primeiro else "utf-8",
+        )
+
+
+class ExcelResultWriter(ResultWriter):
+    """
+    Saída .xlsx gravada em modo streaming (openpyxl write_only): as linhas de cada bloco
+    vão para o arquivo temporário da planilha à medida que chegam, sem manter os blocos
+    em memória; fechar() conclui o arquivo.
+    """
+
+    formato = FORMATO_XLSX
+
+    def __init__(self, caminho):
+        super().__init__(caminho)
+        self._workbook = None
+        self._planilha = None
+
+    def _escrever(self, bloco):
+        if self._workbook is None:
+            from openpyxl import Workbook
+
+            self._workbook = Workbook(write_only=True)
+            self._planilha = self._workbook.create_sheet()
+            self._planilha.append([str(coluna) for coluna in bloco.columns])
+        # Células vazias (NaN/NA) viram None, que o openpyxl grava como célula em branco
+        valores = bloco.astype(object).where(bloco.notna(), None)
+        for linha in valores.itertuples(index=False, name=None):
+            self._planilha.append(linha)
+
+    def _fechar(self):
+        if self._workbook is None:
+            pd.DataFrame().to_excel(self.caminho, index=False)
+            return
+        self._workbook.save(self.caminho)
+        self._workbook = None
+        self._planilha = None
+
+
+_WRITERS = {
+    FORMATO_XLSX: ExcelResultWriter,
+    FORMATO_PARQUET: ParquetResultWriter,
+    FORMATO_ARROW: ArrowResultWriter,
+    FORMATO_CSV: CSVResultWriter,
+}
+
+
+def criar_writer(caminho, formato=None):
+    """Cria o gravador do formato informado (ou deduzido da extensão do caminho)."""
+    formato = formato or os.path.splitext(str(caminho))[1].lstrip(".").lower()
+    if formato not in _WRITERS:
+        raise ValueError(f"Formato de saída inválido: {formato} (opções: {', '.join(FORMATOS_SAIDA)})")
+    return _WRITERS[formato](caminho)
+
+
+def ler_resultado(caminho):
+    """Lê um arquivo de resultado gravado em qualquer um dos formatos suportados."""
+    formato = os.path.splitext(str(caminho))[1].lstrip(".").lower()
+    if formato == FORMATO_PARQUET:
+        return pd.read_parquet(caminho)
+    if formato == FORMATO_ARROW:
+        return pd.read_feather(caminho)
+    if formato == FORMATO_CSV:
+        return pd.read_csv(caminho, encoding="utf-8-sig")
+    return pd.read_excel(caminho)
+
+
+def gerar_excel(caminho, caminho_xlsx=None):
+    """
+    Gera, sob demanda, a versão .xlsx de um resultado gravado em formato colunar.
+    Retorna o caminho do arquivo Excel.
+    """
+    caminho_xlsx = caminho_xlsx or os.path.splitext(str(caminho))[0] + ".xlsx"
+    ler_resultado(caminho).to_excel(caminho_xlsx, index=False)
+    return caminho_xlsx
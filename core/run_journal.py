@@ -0,0 +1,89 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+from core.construct_cache import hash_texto
+
+# Pasta padrão dos diários de execução
+DIRETORIO_JOURNAL = os.path.join("results", "journal")
+
+
+def hash_config(config):
+    """Gera um identificador estável para uma configuração de classificação (dicionário)."""
+    serializado = json.dumps(config, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(serializado.encode("utf-8")).hexdigest()[:16]
+
+
+class RunJournal:
+    """
+    Diário de execução (JSONL, somente acréscimo) de uma classificação.
+
+    Cada quote concluído é gravado imediatamente com o hash do texto e o hash da
+    configuração do classificador. Se o processo cair ou a cota da API acabar,
+    uma nova execução com a mesma configuração (mesmo run_id) retoma do ponto
+    em que parou, sem pagar novamente pelas chamadas já feitas.
+    """
+
+    def __init__(self, config, diretorio=DIRETORIO_JOURNAL):
+        """
+        - config: dicionário com tudo que influencia o resultado (modelo, escopo,
+          constructos, exemplos, planilha, coluna...). Define o run_id.
+        - diretorio: pasta onde os diários são gravados
+        """
+        self.config_hash = hash_config(config)
+        self.run_id = self.config_hash
+        self.caminho = os.path.join(diretorio, f"{self.run_id}.jsonl")
+        self._config = config
+        self._lock = threading.Lock()
+
+    def carregar(self):
+        """
+        Lê o diário e retorna {hash do quote: (constructo, justificativa, tempo)}.
+        Linhas incompletas (ex: gravação interrompida) são ignoradas.
+        """
+        concluidos = {}
+        if not os.path.exists(self.caminho):
+            return concluidos
+
+        with open(self.caminho, encoding="utf-8") as f:
+            for linha in f:
+                try:
+                    registro = json.loads(linha)
+                except json.JSONDecodeError:
+                    continue
+                if registro.get("config_hash") != self.config_hash or "quote_hash" not in registro:
+                    continue
+                concluidos[registro["quote_hash"]] = (
+                    registro["constructo"], registro["justificativa"], registro.get("tempo", 0.0)
+                )
+        return concluidos
+
+    def registrar(self, quote, constructo, justificativa, tempo):
+        """Acrescenta o resultado de um quote ao diário (o arquivo é fechado a cada gravação)."""
+        registro = {
+            "run_id": self.run_id,
+            "config_hash": self.config_hash,
+            "quote_hash": hash_texto(quote),
+            "constructo": constructo,
+            "justificativa": justificativa,
+            "tempo": tempo,
+            "registrado_em": time.time(),
+        }
+        with self._lock:
+            novo = not os.path.exists(self.caminho)
+            os.makedirs(os.path.dirname(self.caminho) or ".", exist_ok=True)
+            with open(self.caminho, "a", encoding="utf-8") as f:
+                if novo:
+                    # Cabeçalho com a configuração completa, para auditoria
+                    f.write(json.dumps(
+                        {"run_id": self.run_id, "config": self._config}, ensure_ascii=False, default=str
+                    ) + "\n")
+                f.write(json.dumps(registro, ensure_ascii=False) + "\n")
+
+    def descartar(self):
+        """Apaga o diário, fazendo com que a próxima execução comece do zero."""
+        with self._lock:
+            if os.path.exists(self.caminho):
+                os.remove(self.caminho)
@@ -0,0 +1,33 @@
+import threading
+
+
+class SessionRegistry:
+    """
+    Estado de cada sessão do navegador, indexado pelo `session_hash` do Gradio.
+
+    Cada sessão recebe o seu próprio controlador (planilha, constructos, escopo, exemplos),
+    criado no primeiro acesso pela `fabrica`. Caches, modelos e o agendador do LLM
+    continuam compartilhados pelo processo.
+    """
+
+    def __init__(self, fabrica):
+        self.fabrica = fabrica
+        self._sessoes = {}  # session_hash → controlador
+        self._lock = threading.Lock()
+
+    def obter(self, sessao):
+        """Retorna o controlador da sessão, criando-o no primeiro acesso."""
+        with self._lock:
+            controlador = self._sessoes.get(sessao)
+            if controlador is None:
+                controlador = self._sessoes[sessao] = self.fabrica()
+            return controlador
+
+    def encerrar(self, sessao):
+        """Descarta o estado da sessão (o próximo acesso recomeça com um controlador novo)."""
+        with self._lock:
+            return self._sessoes.pop(sessao, None) is not None
+
+    def __len__(self):
+        with self._lock:
+            return len(self._sessoes)
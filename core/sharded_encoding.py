@@ -0,0 +1,125 @@
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from core.embedder_registry import MODELO_EMBEDDING_PADRAO, obter_embedder
+from core.embeddings import TAMANHO_LOTE_PADRAO, codificar_normalizado
+
+# Quantidade padrão de quotes por shard enviado a cada processo
+TAMANHO_SHARD_PADRAO = 2048
+
+# Configuração do modelo no processo trabalhador (definida pelo inicializador)
+_config_trabalhador = {}
+
+
+def _inicializar_trabalhador(modelo, device, batch_size, threads, backend=None):
+    """Executado uma vez em cada processo: limita as threads e carrega o modelo."""
+    if threads:
+        import torch
+        torch.set_num_threads(threads)
+    _config_trabalhador.update(modelo=modelo, device=device, batch_size=batch_size, backend=backend)
+    obter_embedder(modelo, device, backend)
+
+
+def _codificar_shard(inicio, textos):
+    """Codifica um shard no processo trabalhador e retorna (início, vetores, pid, segundos)."""
+    embedder = obter_embedder(
+        _config_trabalhador["modelo"], _config_trabalhador["device"], _config_trabalhador["backend"]
+    )
+    start = time.perf_counter()
+    vetores = codificar_normalizado(embedder, textos, _config_trabalhador["batch_size"])
+    return inicio, vetores, os.getpid(), time.perf_counter() - start
+
+
+class ShardedEncoder:
+    """
+    Codificação de grandes volumes de quotes em vários processos (somente CPU).
+
+    Os quotes são divididos em shards consecutivos, distribuídos entre n_processos
+    trabalhadores (cada um com sua própria cópia do modelo) e devolvidos na ordem
+    original. Apenas alguns shards ficam em andamento ao mesmo tempo, limitando a
+    memória; ao encerrar o gerador (ex: interrupção do pipeline), os shards ainda
+    não iniciados são cancelados. Os processos são mantidos entre chamadas (ex: blocos
+    de uma planilha lida em partes) até fechar().
+    """
+
+    def __init__(self, modelo=MODELO_EMBEDDING_PADRAO, device=None, n_processos=None,
+                 tamanho_shard=TAMANHO_SHARD_PADRAO, batch_size=TAMANHO_LOTE_PADRAO, backend=None):
+        """
+        - modelo / device: modelo SentenceTransformer carregado em cada processo
+        - n_processos: quantidade de processos trabalhadores (None = número de CPUs)
+        - tamanho_shard: quantidade de quotes enviados a cada processo por vez
+        - batch_size: lote interno de codificação em cada processo
+        - backend: inferência do modelo ("torch", "onnx" ou "int8"; None = padrão)
+        """
+        self.modelo = modelo
+        self.device = device
+        self.backend = backend
+        self.n_processos = max(1, int(n_processos or os.cpu_count() or 1))
+        self.tamanho_shard = max(1, int(tamanho_shard))
+        self.batch_size = batch_size
+        self.estatisticas = {}  # pid → {"quotes": n, "segundos": s}, acumulado entre chamadas
+        self._executor = None
+
+    def _obter_executor(self):
+        """Cria o pool na primeira chamada; os processos (e modelos) são reaproveitados depois."""
+        if self._executor is None:
+            # Divide os núcleos entre os processos para evitar disputa entre as threads do torch
+            threads = max(1, (os.cpu_count() or 1) // self.n_processos)
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.n_processos,
+                # "spawn" evita herdar o estado de threads do processo principal (torch/tokenizers)
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_inicializar_trabalhador,
+                initargs=(self.modelo, self.device, self.batch_size, threads, self.backend),
+            )
+        return self._executor
+
+    def iterar(self, quotes):
+        """
+        Entrega (posição inicial, matriz normalizada do shard) na ordem dos quotes,
+        à medida que os shards ficam prontos.
+        """
+        shards = deque(
+            (inicio, list(quotes[inicio:inicio + self.tamanho_shard]))
+            for inicio in range(0, len(quotes), self.tamanho_shard)
+        )
+        if not shards:
+            return
+
+        executor = self._obter_executor()
+        em_andamento = deque()
+        try:
+            while shards or em_andamento:
+                # Mantém no máximo dois shards por processo em andamento
+                while shards and len(em_andamento) < 2 * self.n_processos:
+                    em_andamento.append(executor.submit(_codificar_shard, *shards.popleft()))
+
+                inicio, vetores, pid, segundos = em_andamento.popleft().result()
+                estatistica = self.estatisticas.setdefault(pid, {"quotes": 0, "segundos": 0.0})
+                estatistica["quotes"] += len(vetores)
+                estatistica["segundos"] += segundos
+                yield inicio, vetores
+        finally:
+            # Encerrado antes do fim (ex: interrupção): cancela os shards ainda não iniciados
+            for futuro in em_andamento:
+                futuro.cancel()
+
+    def fechar(self):
+        """Encerra os processos trabalhadores, cancelando os shards pendentes."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    def resumo_throughput(self):
+        """Retorna uma linha por processo com quotes codificados e quotes/segundo."""
+        linhas = []
+        for n, (pid, estatistica) in enumerate(sorted(self.estatisticas.items()), start=1):
+            taxa = estatistica["quotes"] / estatistica["segundos"] if estatistica["segundos"] else 0.0
+            linhas.append(
+                f"Processo {n} (pid {pid}): {estatistica['quotes']} quotes em "
+                f"{estatistica['segundos']:.1f}s ({taxa:.0f} quotes/s)"
+            )
+        return linhas
@@ -1,16 +1,21 @@
 from core.construct_loader import ConstructLoader
-from core.dataset_loader import QuoteDatasetLoader
+from core.dataset_loader import QuoteDatasetLoader, TAMANHO_BLOCO_PADRAO
 from core.pipeline import ClassificationPipeline
-from classifiers.embedding import EmbeddingQuoteClassifier
-from classifiers.llm import LLMQuoteClassifier
-from classifiers.hybrid_classifier import HybridQuoteClassifier
-from classifiers.similarity_classifier import ConstructSimilarityClassifier
-from sklearn.metrics import accuracy_score, classification_report
+from core.embedder_registry import MODELO_EMBEDDING_PADRAO, registry as embedder_registry
+from core.quote_store import obter_store_padrao
+from core.llm_scheduler import LLMScheduler
+from core.run_journal import RunJournal
+from core.result_writer import criar_writer, formato_saida_padrao, gerar_excel
+from core.instrumentation import DIRETORIO_TRACES, Tracer
 from datetime import datetime
 import pandas as pd
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_pdf import PdfPages
+import copy
 import os
+import time
+import uuid
+
+# Classificadores (torch, LangChain), sklearn e matplotlib são importados apenas no primeiro
+# uso de cada etapa, para que a interface inicie rapidamente e sem chave da API
 
 # Garante que a pasta 'results/' exista
 os.makedirs("results", exist_ok=True)
@@ -21,12 +26,29 @@ class MainController:
     seleção de modelo e execução da classificação de quotes com base nos constructos definidos.
     """
 
-    def __init__(self):
+    def __init__(self, llm_scheduler=None):
+        """
+        - llm_scheduler: agendador de chamadas ao LLM compartilhado entre controladores
+          (ex: sessões do app); se None, é criado a partir das variáveis de ambiente
+        """
         self.construct_loader = ConstructLoader()
         self.quote_loader = QuoteDatasetLoader()
         self.escopo_pesquisa = ""  # Texto do escopo definido pelo usuário
         self.interromper = False   # Flag para interrupção da classificação
         self.exemplos_usuario = []  # Exemplos fornecidos pelo usuário (para few-shot)
+        self.quote_store = obter_store_padrao()  # Embeddings de quotes reaproveitados entre execuções
+        # Lotes e cotas de LLM (None = desativado)
+        self.llm_scheduler = llm_scheduler if llm_scheduler is not None else LLMScheduler.from_env()
+        self._llm_cache = None  # Respostas do LLM reaproveitadas entre execuções (aberto no primeiro uso)
+        self.ultima_execucao = None  # Métricas da classificação mais recente (ver classificar)
+
+    @property
+    def llm_cache(self):
+        """Cache local de respostas do LLM, aberto na primeira classificação que usa o LLM."""
+        if self._llm_cache is None:
+            from core.llm_cache import obter_cache_padrao
+            self._llm_cache = obter_cache_padrao()
+        return self._llm_cache
 
     def carregar_exemplos_usuario(self, file_path):
         """Carrega exemplos anotados pelo usuário a partir de um arquivo Excel."""
@@ -78,23 +100,64 @@ class MainController:
         return self.construct_loader.get_formatted_summary()
 
     def carregar_planilha_quotes(self, file_path):
-        """Carrega os quotes de um arquivo Excel e retorna os nomes das colunas disponíveis."""
+        """
+        Registra o arquivo de quotes (Excel, CSV ou Parquet) e retorna os nomes das colunas
+        disponíveis. Apenas o cabeçalho é lido; os dados são lidos em blocos na classificação.
+        """
         colunas = self.quote_loader.load_excel(file_path)
         return colunas
 
-    def carregar_exemplos_anotados(self, caminho_arquivo):
-        """Carrega exemplos anotados diretamente em formato dicionário."""
+    def carregar_exemplos_anotados(self, caminho_arquivo, coluna_quote="Quote", coluna_constructo="Constructo",
+                                   coluna_justificativa="Justificativa"):
+        """
+        Carrega exemplos anotados diretamente em formato dicionário.
+        Os nomes das colunas são comparados sem diferenciar maiúsculas e espaços nas bordas
+        ("Quote" encontra "quote"); a coluna de justificativa é opcional.
+        """
         df = pd.read_excel(caminho_arquivo)
+        colunas = {str(coluna).strip().casefold(): coluna for coluna in df.columns}
+
+        def coluna(nome, obrigatoria=True):
+            encontrada = colunas.get(nome.strip().casefold())
+            if encontrada is None and obrigatoria:
+                raise ValueError(f"Coluna não encontrada na planilha de exemplos: {nome}")
+            return encontrada
+
+        col_quote, col_constructo = coluna(coluna_quote), coluna(coluna_constructo)
+        col_justificativa = coluna(coluna_justificativa, obrigatoria=False)
+
         exemplos = []
         for _, row in df.iterrows():
             exemplo = {
-                "quote": str(row["quote"]).strip(),
-                "constructo": str(row["constructo"]).strip(),
-                "justificativa": str(row.get("justificativa", "")).strip()
+                "quote": str(row[col_quote]).strip(),
+                "constructo": str(row[col_constructo]).strip(),
+                "justificativa": str(row[col_justificativa]).strip() if col_justificativa is not None else ""
             }
             exemplos.append(exemplo)
         return exemplos
 
+    def aquecer_modelos(self, modelos=(MODELO_EMBEDDING_PADRAO,)):
+        """Pré-carrega os modelos de embeddings no registro compartilhado."""
+        embedder_registry.aquecer(modelos)
+
+    def liberar_modelos(self, modelo=None):
+        """Remove modelos de embeddings da memória (todos, se nenhum for informado)."""
+        return embedder_registry.descarregar(modelo)
+
+    def copiar_para_job(self):
+        """
+        Retorna uma cópia do controlador para executar uma classificação em segundo plano.
+        A planilha, os constructos, o escopo e os exemplos ficam fixos no momento do envio,
+        mesmo que a sessão carregue outros dados enquanto o job aguarda ou executa.
+        Caches e agendador do LLM continuam compartilhados.
+        """
+        copia = copy.copy(self)
+        copia.quote_loader = copy.copy(self.quote_loader)
+        copia.construct_loader = copy.copy(self.construct_loader)
+        copia.exemplos_usuario = list(self.exemplos_usuario)
+        copia.interromper = False
+        return copia
+
     def resetar_interrupcao(self):
         self.interromper = False
 
@@ -104,7 +167,7 @@ class MainController:
     def verificar_interrupcao(self):
         return self.interromper
 
-    def avaliar_resultados(self, col_manual, col_automatica, col_resultado):
+    def avaliar_resultados(self, col_manual, col_automatica, col_resultado, formato_saida=None):
         """
         Avalia a acurácia da classificação automática comparando com a classificação manual.
         Também gera um relatório em PDF com a matriz de confusão e estatísticas.
@@ -113,18 +176,24 @@ class MainController:
             col_manual (str): Nome da coluna com os rótulos manuais.
             col_automatica (str): Nome da coluna com os rótulos gerados pelo modelo.
             col_resultado (str): Nome da coluna onde será registrada a comparação ("Certa"/"Errada").
+            formato_saida (str): Formato do arquivo com os resultados ("xlsx", "parquet", "arrow" ou "csv";
+                None = Parquet se o pyarrow estiver instalado, senão CSV).
     
         Retorna:
             - markdown (str): Resumo da avaliação formatado em Markdown.
-            - nome_saida (str): Nome do arquivo Excel salvo com os resultados.
+            - nome_saida (str): Nome do arquivo salvo com os resultados.
             - matriz_confusao (DataFrame): Matriz de confusão calculada.
             - acertos (int): Quantidade de classificações corretas.
             - erros (int): Quantidade de classificações incorretas.
             - pdf_path (str): Caminho do arquivo PDF gerado com o relatório.
             - relatorio_md (str): Relatório de classificação formatado em Markdown.
         """
+        from sklearn.metrics import accuracy_score, classification_report
+        import matplotlib.pyplot as plt
+        from matplotlib.backends.backend_pdf import PdfPages
+
         # Verifica se há dados carregados
-        if not self.quote_loader or self.quote_loader.get_dataframe().empty:
+        if not self.quote_loader or not self.quote_loader.file_path or self.quote_loader.get_dataframe().empty:
             raise ValueError("❌ Nenhum dado foi carregado.")
     
         # Carrega o DataFrame com os quotes
@@ -163,10 +232,13 @@ class MainController:
         caminho_original = self.quote_loader.file_path
         nome_base = os.path.splitext(os.path.basename(caminho_original))[0]
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        nome_saida = os.path.join("results", f"{nome_base}_avaliado_{timestamp}.xlsx")
+        formato_saida = formato_saida or formato_saida_padrao()
+        nome_saida = os.path.join("results", f"{nome_base}_avaliado_{timestamp}.{formato_saida}")
     
-        # Salva os resultados no Excel
-        df.to_excel(nome_saida, index=False)
+        # Salva os resultados no formato escolhido
+        writer = criar_writer(nome_saida, formato_saida)
+        writer.escrever(df)
+        writer.fechar()
     
         # Prepara o Markdown com resumo da avaliação (para exibir no Gradio)
         markdown = f"""
@@ -177,6 +249,7 @@ class MainController:
     - Total de registros: **{len(df) - 1}**
     - Acertos: **{acertos}**
     - Erros: **{erros}**
+    - Exportação {writer.resumo()}
     """
     
         # Formata o relatório de classificação como Markdown para o app
@@ -207,59 +280,224 @@ class MainController:
         return markdown, nome_saida, matriz_confusao, acertos, erros, pdf_path, relatorio_md
 
 
+    def exportar_excel(self, caminho):
+        """
+        Gera sob demanda a versão .xlsx de um resultado gravado em Parquet, Arrow ou CSV.
+        Retorna o caminho do arquivo Excel (o próprio caminho, se já for .xlsx).
+        """
+        if caminho.lower().endswith(".xlsx"):
+            return caminho
+        return gerar_excel(caminho)
+
+    @staticmethod
+    def _config_llm(classifier):
+        """Modelo e temperatura do LLM do classificador (fazem parte da configuração do diário)."""
+        llm = getattr(classifier, "llm", None)
+        return {
+            "modelo": getattr(llm, "model_name", None) or getattr(classifier, "modelo", None),
+            "temperatura": getattr(llm, "temperature", None),
+        }
+
     def get_coluna_classificacao(self):
         """Retorna a primeira coluna com 'class' no nome (útil para autocompletar)."""
-        for col in self.quote_loader.get_dataframe().columns:
-            if 'class' in col.lower():
-                return col
-        return None
+        return self.quote_loader.get_coluna_classificacao()
 
 
-    def classificar(self, col_quote, col_class, modelo, progress=None, deve_interromper=None, exemplos=None):
+    def classificar(self, col_quote, col_class, modelo, progress=None, deve_interromper=None, exemplos=None,
+                    max_concurrency=1, modo_avaliacao="par", retomar=True,
+                    usar_cache_llm=True, k_exemplos=None, max_tokens_exemplos=None,
+                    cascata=False, limiar_score=0.6, limiar_margem=0.1, auditar_cascata=False,
+                    n_processos_embedding=1, colunas_saida=None, tamanho_bloco=TAMANHO_BLOCO_PADRAO,
+                    formato_saida=None, diretorio_saida="results"):
 
         """
         Executa a classificação dos quotes utilizando o modelo selecionado.
-        Retorna mensagem de sucesso e nome do arquivo Excel gerado.
+        - max_concurrency: número máximo de chamadas simultâneas ao LLM (1 = sequencial).
+        - modo_avaliacao: no ConstructSimilarityClassifier, "par" (uma chamada por constructo)
+          ou "conjunto" (uma chamada por quote com todos os candidatos).
+        - retomar: se True, reaproveita os quotes já gravados no diário de uma execução
+          anterior com a mesma configuração (results/journal); se False, recomeça do zero.
+        - usar_cache_llm: se False, ignora o cache local de respostas do LLM.
+        - k_exemplos / max_tokens_exemplos: com mais exemplos que k_exemplos, cada prompt recebe
+          apenas os k exemplos mais similares ao quote (None = envia todos os exemplos).
+        - cascata / limiar_score / limiar_margem / auditar_cascata: no HybridQuoteClassifier,
+          aceita o rótulo dos embeddings quando o constructo mais similar domina com folga
+          e envia ao LLM apenas os quotes ambíguos (com auditoria, consulta o LLM em todos
+          para medir a concordância).
+        - n_processos_embedding: no EmbeddingQuoteClassifier, quantidade de processos usados
+          para codificar os quotes em shards (1 = processo único).
+        - colunas_saida: colunas da planilha copiadas para o arquivo de resultado (None = todas);
+          a planilha é lida em blocos de `tamanho_bloco` linhas, apenas com essas colunas.
+        - formato_saida: "parquet", "arrow", "csv" ou "xlsx" (None = Parquet se o pyarrow estiver
+          instalado, senão CSV). Cada bloco é gravado assim que termina; a versão Excel de um
+          resultado colunar pode ser gerada depois (exportar_excel).
+        - diretorio_saida: pasta onde o arquivo de resultado é gravado.
+        Retorna mensagem de sucesso e nome do arquivo gerado. As métricas da execução
+        (quotes, tempo, etapas, tokens) ficam em self.ultima_execucao.
         """
         constructos = self.construct_loader.get_constructs()
-        df = self.quote_loader.get_dataframe()
+
+        # Lê a planilha em blocos, materializando apenas as colunas necessárias
+        if colunas_saida is not None:
+            colunas_saida = list(dict.fromkeys([col_quote, *colunas_saida]))
+        blocos = self.quote_loader.iter_chunks(colunas_saida, tamanho_bloco)
+
+        # O classificador só de embeddings não consulta o LLM (nem o seu cache)
+        usa_llm = modelo != "EmbeddingQuoteClassifier"
+        llm_cache = self.llm_cache if usa_llm and usar_cache_llm else None
 
         # Seleciona e instancia o classificador conforme o modelo informado
+        # (o módulo de cada classificador é importado apenas quando ele é escolhido)
         if modelo == "EmbeddingQuoteClassifier":
-            classifier = EmbeddingQuoteClassifier(constructos)
+            from classifiers.embedding import EmbeddingQuoteClassifier
+            classifier = EmbeddingQuoteClassifier(
+                constructos, quote_store=self.quote_store, n_processos=n_processos_embedding
+            )
         elif modelo == "HybridQuoteClassifier":
+            from classifiers.hybrid_classifier import HybridQuoteClassifier
             classifier = HybridQuoteClassifier(
                 constructos,
                 escopo=self.escopo_pesquisa,
                 modelo="gpt-4",
-                exemplos=exemplos
+                exemplos=exemplos,
+                quote_store=self.quote_store,
+                scheduler=self.llm_scheduler,
+                llm_cache=llm_cache,
+                k_exemplos=k_exemplos,
+                max_tokens_exemplos=max_tokens_exemplos,
+                cascata=cascata,
+                limiar_score=limiar_score,
+                limiar_margem=limiar_margem,
+                auditar_cascata=auditar_cascata
             )
         elif modelo == "ConstructSimilarityClassifier":
+            from classifiers.similarity_classifier import ConstructSimilarityClassifier
             classifier = ConstructSimilarityClassifier(
                 constructos,
                 escopo=self.escopo_pesquisa,
-                modelo="gpt-4"
-                
+                modelo="gpt-4",
+                quote_store=self.quote_store,
+                scheduler=self.llm_scheduler,
+                # Garante ao menos as duas avaliações de cada quote em paralelo
+                max_concurrency=max(2, max_concurrency),
+                modo_avaliacao=modo_avaliacao,
+                llm_cache=llm_cache
             )
         else:
+            from classifiers.llm import LLMQuoteClassifier
             classifier = LLMQuoteClassifier(
                 constructos,
                 escopo=self.escopo_pesquisa,
                 modelo="gpt-3.5-turbo" if modelo == "openai-3.5" else "gpt-4",
-                exemplos=exemplos
-
+                exemplos=exemplos,
+                max_concurrency=max_concurrency,
+                scheduler=self.llm_scheduler,
+                llm_cache=llm_cache,
+                k_exemplos=k_exemplos,
+                max_tokens_exemplos=max_tokens_exemplos
             )
 
-        # Executa o pipeline
-        pipeline = ClassificationPipeline(df, col_quote, col_class, classifier)
-        pipeline.run(progress=progress, deve_interromper=deve_interromper)
+        # Diário da execução: cada quote concluído é gravado e uma nova execução com a
+        # mesma configuração retoma de onde parou (não usado no classificador só de embeddings,
+        # que não faz chamadas pagas)
+        journal = None
+        if usa_llm:
+            journal = RunJournal({
+                "modelo": modelo,
+                "escopo": self.escopo_pesquisa,
+                "constructos": constructos,
+                "exemplos": exemplos or [],
+                "k_exemplos": k_exemplos,
+                "max_tokens_exemplos": max_tokens_exemplos,
+                "llm": self._config_llm(classifier),
+                "top_k": getattr(classifier, "top_k", getattr(classifier, "top_n", None)),
+                "modo_avaliacao": modo_avaliacao,
+                "cascata": [limiar_score, limiar_margem] if cascata and modelo == "HybridQuoteClassifier" else None,
+                "planilha": os.path.basename(self.quote_loader.file_path or ""),
+                "coluna_quote": col_quote,
+            })
+            if not retomar:
+                journal.descartar()
 
         caminho_original = self.quote_loader.file_path
         nome_base = os.path.splitext(os.path.basename(caminho_original))[0]
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M")
+        # Segundos e um sufixo aleatório: execuções simultâneas (jobs do app, CLI) não
+        # compartilham o arquivo de resultado nem o trace
+        timestamp = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:6]}"
         sufixo_few_shot = "_FEW-SHOT" if exemplos else ""
-        nome_arquivo = os.path.join("results", f"{nome_base}_{modelo.replace('-', '_')}{sufixo_few_shot}_{timestamp}.xlsx")
-        
+        formato_saida = formato_saida or formato_saida_padrao()
+        nome_arquivo = os.path.join(
+            diretorio_saida, f"{nome_base}_{modelo.replace('-', '_')}{sufixo_few_shot}_{timestamp}.{formato_saida}"
+        )
+        writer = criar_writer(nome_arquivo, formato_saida)
+
+        # Trace da execução (JSONL): tempo por etapa, chamadas ao LLM, tokens e retentativas
+        nome_trace = os.path.splitext(os.path.basename(nome_arquivo))[0] + ".jsonl"
+        tracer = Tracer(os.path.join(DIRETORIO_TRACES, nome_trace))
+
+        # Executa o pipeline, gravando cada bloco no arquivo de saída assim que termina
+        pipeline = ClassificationPipeline(
+            blocos, col_quote, col_class, classifier, journal=journal,
+            total=self.quote_loader.total_linhas(), writer=writer, tracer=tracer
+        )
+        inicio = time.perf_counter()
+        try:
+            pipeline.run(progress=progress, deve_interromper=deve_interromper)
+        finally:
+            # Libera recursos do classificador (ex: processos de codificação)
+            if hasattr(classifier, "fechar"):
+                classifier.fechar()
+
+        if pipeline.interrompido:
+            status = "⚠️ Classificação interrompida: o arquivo contém os quotes já classificados."
+        else:
+            status = "✅ Classificação concluída!"
+        if pipeline.retomados:
+            status += f" ({pipeline.retomados} quote(s) retomados de execução anterior)"
+        if pipeline.falhas:
+            status += (
+                f"\n\n⚠️ {pipeline.falhas} quote(s) com erro na consulta ao LLM: não foram registrados "
+                "no diário e serão classificados novamente na próxima execução."
+            )
+        status += f"\n\n📁 Exportação {writer.resumo()}"
+
+        # Resumo do cache de respostas do LLM nesta execução (contado pelo tracer da execução,
+        # não pelos contadores globais do cache, compartilhados com execuções simultâneas)
+        contadores = tracer.resumo()["contadores"]
+        hits = contadores["cache_hits"]
+        consultas = hits + contadores["cache_misses"]
+        if consultas:
+            status += f"\n\n💾 Cache do LLM: {hits}/{consultas} respostas reaproveitadas ({hits / consultas:.0%})"
+
+        encoder_processos = getattr(classifier, "encoder_processos", None)
+        if encoder_processos is not None and encoder_processos.estatisticas:
+            status += "\n\n⚙️ Codificação multiprocesso:\n" + "\n".join(
+                f"- {linha}" for linha in encoder_processos.resumo_throughput()
+            )
+
+        resumo_cascata = getattr(classifier, "resumo_cascata", None)
+        if resumo_cascata and resumo_cascata():
+            status += "\n\n" + resumo_cascata()
+
+        tabela_etapas = tracer.tabela_markdown()
+        if tabela_etapas:
+            status += f"\n\n{tabela_etapas}\n\nTrace detalhado: `{tracer.caminho}`"
 
-        pipeline.export(nome_arquivo)
-        return "✅ Classificação concluída!", nome_arquivo
+        # Métricas da execução, para relatórios fora da interface (ex: resumo JSON da CLI)
+        self.ultima_execucao = {
+            "arquivo_saida": nome_arquivo,
+            # Quotes classificados nesta execução (base do throughput); os retomados do diário
+            # não passam pelo classificador e são contados à parte
+            "quotes": pipeline.processados - pipeline.retomados,
+            "retomados": pipeline.retomados,
+            "falhas": pipeline.falhas,
+            "interrompido": pipeline.interrompido,
+            "segundos": round(time.perf_counter() - inicio, 3),
+            "linhas_gravadas": writer.linhas,
+            "tempo_escrita_s": round(writer.tempo_escrita, 3),
+            "tamanho_bytes": writer.tamanho_bytes,
+            "cache_llm": {"hits": hits, "consultas": consultas},
+            "trace": tracer.caminho,
+            **tracer.resumo(),
+        }
+        return status, nome_arquivo
@@ -0,0 +1,407 @@
+"""
+Serviço HTTP local de classificação, para uso por outras ferramentas internas.
+
+Mantém classificadores aquecidos (EmbeddingQuoteClassifier / HybridQuoteClassifier) por
+codebook, em vez de criar classificador e modelo a cada requisição. Pedidos concorrentes de
+quotes isolados são agrupados por um micro-batcher em uma única passada de embeddings,
+dentro de uma janela de latência configurável.
+
+Endpoints (JSON):
+    GET  /saude                 → {"status": "ok"}
+    GET  /metricas              → profundidade da fila e histograma de lotes por classificador
+    POST /codebooks             {"constructos": {nome: definição}, "escopo": "..."} → {"codebook": id}
+    POST /classificar           {"quote": "...", "codebook": id | "constructos": {...}, "classificador": "embedding"}
+    POST /classificar/lote      {"quotes": ["...", ...], "codebook": id, "classificador": "hybrid"}
+
+Codebooks sem uso são descartados (LRU): um id descartado responde 404, e o cliente registra
+de novo (POST /codebooks) ou envia "constructos" junto com a requisição. No lote, um quote
+que falha recebe {"erro": ...} sem afetar os demais.
+
+Uso:
+    python server.py --porta 8765 --janela-ms 10 --lote-maximo 64
+    curl -s localhost:8765/classificar -d '{"quote": "...", "constructos": {"Motivação": "..."}}'
+"""
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, TimeoutError as FuturoTimeoutError
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+from dotenv import load_dotenv
+
+from classifiers.base import JustificativaComFalha
+from core.embedder_registry import BACKENDS_EMBEDDING
+from core.micro_batcher import MicroBatcher
+
+# Classificadores expostos pelo serviço (nome na API → classe)
+CLASSIFICADORES_SERVICO = {
+    "embedding": "EmbeddingQuoteClassifier",
+    "hybrid": "HybridQuoteClassifier",
+}
+
+# Tamanho máximo do corpo de uma requisição (bytes)
+MAX_CORPO = 10 * 1024 * 1024
+
+
+class ErroRequisicao(Exception):
+    """Erro causado pela requisição do cliente, devolvido com o status HTTP informado."""
+
+    def __init__(self, mensagem, status=400):
+        super().__init__(mensagem)
+        self.status = status
+
+
+class ClassifierPool:
+    """
+    Classificadores aquecidos por (codebook, classificador), cada um atrás do seu próprio
+    MicroBatcher. Um codebook é o conjunto de constructos mais o escopo da pesquisa,
+    identificado pelo hash do conteúdo (o mesmo codebook enviado de novo reaproveita a instância).
+
+    Com mais de `max_instancias`, a instância usada há mais tempo é encerrada (LRU), e o seu
+    codebook é descartado se nenhuma outra instância o usa. Codebooks registrados e não usados
+    ficam limitados a `max_codebooks` (os mais antigos são descartados; o cliente recebe 404
+    e registra de novo). Modelo de embeddings, caches e agendador do LLM são compartilhados
+    por todas as instâncias.
+    """
+
+    def __init__(self, janela=0.01, lote_maximo=64, max_fila=None, max_instancias=8,
+                 modelo_llm="gpt-4", cascata=False, limiar_score=0.6, limiar_margem=0.1, backend_embedding=None,
+                 max_codebooks=None):
+        self.janela = janela
+        self.lote_maximo = lote_maximo
+        self.max_fila = max_fila
+        self.max_instancias = max_instancias
+        self.modelo_llm = modelo_llm
+        self.cascata = cascata
+        self.limiar_score = limiar_score
+        self.limiar_margem = limiar_margem
+        self.backend_embedding = backend_embedding
+        self.max_codebooks = max_codebooks or 4 * max_instancias
+        self._codebooks = OrderedDict()  # id → {"constructos": {...}, "escopo": "..."}, do menos ao mais recente
+        self._instancias = OrderedDict()  # (codebook, classificador) → (classificador, batcher)
+        # Instâncias em criação: (codebook, classificador) → Future do batcher. Quem pede a mesma
+        # chave enquanto o classificador é criado (fora do lock) aguarda o mesmo Future
+        self._criando = {}
+        self._scheduler = None
+        self._lock = threading.Lock()
+
+    def registrar_codebook(self, constructos, escopo=""):
+        """Registra (ou reencontra) um codebook e retorna o seu identificador."""
+        if not isinstance(constructos, dict) or not constructos:
+            raise ErroRequisicao("'constructos' deve ser um objeto {nome: definição} não vazio.")
+        constructos = {str(nome): str(definicao) for nome, definicao in constructos.items()}
+        escopo = str(escopo or "")
+        serializado = json.dumps([constructos, escopo], sort_keys=True, ensure_ascii=False)
+        codebook = hashlib.sha256(serializado.encode("utf-8")).hexdigest()[:16]
+        with self._lock:
+            self._codebooks.setdefault(codebook, {"constructos": constructos, "escopo": escopo})
+            self._codebooks.move_to_end(codebook)
+            self._podar_codebooks()
+        return codebook
+
+    def batcher(self, codebook, classificador):
+        """Retorna o batcher do classificador aquecido para o codebook, criando-o no primeiro uso."""
+        if classificador not in CLASSIFICADORES_SERVICO:
+            raise ErroRequisicao(
+                f"Classificador inválido: {classificador} (opções: {', '.join(CLASSIFICADORES_SERVICO)})"
+            )
+        chave = (codebook, classificador)
+        with self._lock:
+            if codebook not in self._codebooks:
+                raise ErroRequisicao(
+                    f"Codebook não registrado (ou descartado por falta de uso): {codebook}. "
+                    "Registre-o de novo em POST /codebooks ou envie 'constructos' na requisição.",
+                    status=404,
+                )
+            self._codebooks.move_to_end(codebook)
+            if chave in self._instancias:
+                self._instancias.move_to_end(chave)
+                return self._instancias[chave][1]
+            futuro = self._criando.get(chave)
+            if futuro is None:
+                futuro = self._criando[chave] = Future()
+                dados_codebook = self._codebooks[codebook]
+            else:
+                dados_codebook = None
+
+        if dados_codebook is None:
+            # Outra requisição já está criando este classificador
+            return futuro.result()
+
+        # A criação (carregar modelo, codificar constructos) acontece fora do lock, sem bloquear
+        # as requisições de outros codebooks
+        try:
+            instancia = self._criar_classificador(classificador, **dados_codebook)
+            batcher = MicroBatcher(
+                lambda quotes: list(zip(*instancia.classify(quotes))),
+                janela=self.janela, tamanho_maximo=self.lote_maximo, max_fila=self.max_fila,
+                nome=f"batcher-{classificador}-{codebook}",
+            )
+        except BaseException as e:
+            with self._lock:
+                del self._criando[chave]
+            futuro.set_exception(e)
+            raise
+
+        encerradas = []
+        with self._lock:
+            del self._criando[chave]
+            self._instancias[chave] = (instancia, batcher)
+            while len(self._instancias) > self.max_instancias:
+                chave_antiga, antiga = self._instancias.popitem(last=False)
+                encerradas.append(antiga)
+                if not self._codebook_em_uso(chave_antiga[0]):
+                    self._codebooks.pop(chave_antiga[0], None)
+        futuro.set_result(batcher)
+
+        for antiga, batcher_antigo in encerradas:
+            self._encerrar(antiga, batcher_antigo)
+        return batcher
+
+    def _codebook_em_uso(self, codebook):
+        """Indica se alguma instância (pronta ou em criação) usa o codebook. Chamar com o lock."""
+        return any(c == codebook for c, _ in self._instancias) or any(c == codebook for c, _ in self._criando)
+
+    def _podar_codebooks(self):
+        """Descarta os codebooks sem instância mais antigos além de max_codebooks. Chamar com o lock."""
+        excedente = len(self._codebooks) - self.max_codebooks
+        for codebook in list(self._codebooks)[:-1]:  # O mais recente nunca é descartado
+            if excedente <= 0:
+                break
+            if not self._codebook_em_uso(codebook):
+                del self._codebooks[codebook]
+                excedente -= 1
+
+    def _criar_classificador(self, classificador, constructos, escopo):
+        from core.quote_store import obter_store_padrao
+
+        if classificador == "embedding":
+            from classifiers.embedding import EmbeddingQuoteClassifier
+            return EmbeddingQuoteClassifier(
+                constructos, quote_store=obter_store_padrao(), backend_embedding=self.backend_embedding
+            )
+
+        from classifiers.hybrid_classifier import HybridQuoteClassifier
+        from core.llm_cache import obter_cache_padrao
+        from core.llm_scheduler import LLMScheduler
+
+        with self._lock:
+            if self._scheduler is None:
+                # Os quotes escalados de um lote vão ao LLM em paralelo (com as cotas do .env, se houver)
+                self._scheduler = LLMScheduler.from_env() or LLMScheduler()
+        return HybridQuoteClassifier(
+            constructos, escopo=escopo, modelo=self.modelo_llm, quote_store=obter_store_padrao(),
+            scheduler=self._scheduler, llm_cache=obter_cache_padrao(), cascata=self.cascata,
+            limiar_score=self.limiar_score, limiar_margem=self.limiar_margem,
+            backend_embedding=self.backend_embedding,
+        )
+
+    @staticmethod
+    def _encerrar(instancia, batcher):
+        batcher.fechar()
+        if hasattr(instancia, "fechar"):
+            instancia.fechar()
+
+    def metricas(self):
+        with self._lock:
+            instancias = list(self._instancias.items())
+            total_codebooks = len(self._codebooks)
+        return {
+            "codebooks": total_codebooks,
+            "instancias": [
+                {
+                    "codebook": codebook,
+                    "classificador": classificador,
+                    "constructos": len(instancia.constructos),
+                    **batcher.metricas(),
+                }
+                for (codebook, classificador), (instancia, batcher) in instancias
+            ],
+        }
+
+    def fechar(self):
+        with self._lock:
+            instancias = list(self._instancias.values())
+            self._instancias.clear()
+        for instancia, batcher in instancias:
+            self._encerrar(instancia, batcher)
+
+
+class ClassificationHandler(BaseHTTPRequestHandler):
+    """Rotas JSON do serviço; o pool e as configurações ficam no servidor (self.server)."""
+
+    server_version = "QuoteClassifier/1.0"
+
+    def do_GET(self):
+        self._responder(self._rotear_get)
+
+    def do_POST(self):
+        self._responder(self._rotear_post)
+
+    def _responder(self, rotear):
+        try:
+            status, corpo = rotear(urlparse(self.path).path.rstrip("/") or "/")
+        except ErroRequisicao as e:
+            status, corpo = e.status, {"erro": str(e)}
+        except FuturoTimeoutError:
+            status, corpo = 504, {"erro": "Tempo limite excedido aguardando a classificação."}
+        except RuntimeError as e:
+            # Fila cheia ou instância encerrada: o cliente pode tentar novamente
+            status, corpo = 503, {"erro": str(e)}
+        except Exception as e:
+            status, corpo = 500, {"erro": f"{type(e).__name__}: {e}"}
+
+        dados = json.dumps(corpo, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(dados)))
+        self.end_headers()
+        self.wfile.write(dados)
+
+    def _ler_json(self):
+        tamanho = int(self.headers.get("Content-Length") or 0)
+        if tamanho > MAX_CORPO:
+            raise ErroRequisicao("Corpo da requisição muito grande.", status=413)
+        try:
+            corpo = json.loads(self.rfile.read(tamanho) or b"{}")
+        except (UnicodeDecodeError, json.JSONDecodeError) as e:
+            raise ErroRequisicao(f"JSON inválido: {e}")
+        if not isinstance(corpo, dict):
+            raise ErroRequisicao("O corpo deve ser um objeto JSON.")
+        return corpo
+
+    def _rotear_get(self, caminho):
+        if caminho == "/saude":
+            return 200, {"status": "ok"}
+        if caminho == "/metricas":
+            return 200, {"uptime_s": round(time.time() - self.server.inicio, 1), **self.server.pool.metricas()}
+        raise ErroRequisicao(f"Rota não encontrada: {caminho}", status=404)
+
+    def _rotear_post(self, caminho):
+        corpo = self._ler_json()
+        if caminho == "/codebooks":
+            codebook = self.server.pool.registrar_codebook(corpo.get("constructos"), corpo.get("escopo", ""))
+            return 200, {"codebook": codebook}
+        if caminho == "/classificar":
+            quote = corpo.get("quote")
+            if not isinstance(quote, str) or not quote.strip():
+                raise ErroRequisicao("'quote' deve ser um texto não vazio.")
+            resultado = self._classificar(corpo, [quote])[0]
+            if "erro" in resultado:
+                return 500, {"erro": resultado["erro"]}
+            return 200, resultado
+        if caminho == "/classificar/lote":
+            quotes = corpo.get("quotes")
+            if not isinstance(quotes, list) or not quotes or not all(isinstance(q, str) for q in quotes):
+                raise ErroRequisicao("'quotes' deve ser uma lista não vazia de textos.")
+            if len(quotes) > self.server.max_quotes_lote:
+                raise ErroRequisicao(f"Máximo de {self.server.max_quotes_lote} quotes por requisição.", status=413)
+            return 200, {"resultados": self._classificar(corpo, quotes)}
+        raise ErroRequisicao(f"Rota não encontrada: {caminho}", status=404)
+
+    def _classificar(self, corpo, quotes):
+        """
+        Envia cada quote ao micro-batcher do classificador: quotes desta requisição e de
+        requisições concorrentes para o mesmo codebook são codificados juntos.
+
+        Com "constructos" no corpo, o codebook é (re)registrado pelo conteúdo, de modo que um
+        id descartado do pool não impede a classificação. O erro de um quote vira {"erro": ...}
+        apenas no resultado desse quote; "falha" indica a consulta ao LLM que não deu certo.
+        """
+        pool = self.server.pool
+        codebook = corpo.get("codebook")
+        if corpo.get("constructos") is not None:
+            registrado = pool.registrar_codebook(corpo.get("constructos"), corpo.get("escopo", ""))
+            if codebook is not None and str(codebook) != registrado:
+                raise ErroRequisicao("'codebook' não corresponde aos 'constructos' e 'escopo' enviados.")
+            codebook = registrado
+        elif codebook is None:
+            raise ErroRequisicao("Informe 'codebook' ou 'constructos'.")
+        batcher = pool.batcher(str(codebook), corpo.get("classificador", self.server.classificador_padrao))
+
+        inicio = time.perf_counter()
+        futuros = [batcher.submeter(quote) for quote in quotes]
+        prazo = inicio + self.server.timeout_classificacao
+        resultados = []
+        for futuro in futuros:
+            try:
+                constructo, justificativa, tempo = futuro.result(max(0.0, prazo - time.perf_counter()))
+            except FuturoTimeoutError:
+                raise
+            except Exception as e:
+                resultados.append({"constructo": None, "justificativa": None, "erro": f"{type(e).__name__}: {e}"})
+                continue
+            resultados.append({
+                "constructo": constructo,
+                "justificativa": justificativa,
+                "falha": isinstance(justificativa, JustificativaComFalha),
+                "tempo_s": round(tempo, 4),
+            })
+        return resultados
+
+
+def criar_servidor(host, porta, pool, classificador_padrao="embedding", timeout=120.0, max_quotes_lote=1000):
+    """Cria o ThreadingHTTPServer (uma thread por conexão) com o pool de classificadores."""
+    servidor = ThreadingHTTPServer((host, porta), ClassificationHandler)
+    servidor.daemon_threads = True
+    servidor.pool = pool
+    servidor.classificador_padrao = classificador_padrao
+    servidor.timeout_classificacao = timeout
+    servidor.max_quotes_lote = max_quotes_lote
+    servidor.inicio = time.time()
+    return servidor
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=os.getenv("SERVICO_HOST", "127.0.0.1"))
+    parser.add_argument("--porta", type=int, default=int(os.getenv("SERVICO_PORTA", "8765")))
+    parser.add_argument("--janela-ms", type=float, default=float(os.getenv("SERVICO_JANELA_MS", "10")),
+                        help="tempo máximo que um quote espera por outros para formar um lote")
+    parser.add_argument("--lote-maximo", type=int, default=int(os.getenv("SERVICO_LOTE_MAXIMO", "64")),
+                        help="quotes por passada de embeddings")
+    parser.add_argument("--max-fila", type=int, default=None,
+                        help="quotes aguardando por classificador antes de responder 503")
+    parser.add_argument("--max-instancias", type=int, default=8, help="classificadores aquecidos mantidos (LRU)")
+    parser.add_argument("--classificador", choices=list(CLASSIFICADORES_SERVICO), default="embedding",
+                        help="classificador usado quando a requisição não informa")
+    parser.add_argument("--modelo-llm", default="gpt-4", help="modelo do HybridQuoteClassifier")
+    parser.add_argument("--cascata", action="store_true", help="ativa a cascata no HybridQuoteClassifier")
+    parser.add_argument("--limiar-score", type=float, default=0.6)
+    parser.add_argument("--limiar-margem", type=float, default=0.1)
+    parser.add_argument("--timeout", type=float, default=120.0, help="segundos aguardando cada requisição")
+    parser.add_argument("--backend-embedding", choices=BACKENDS_EMBEDDING, default=None,
+                        help="inferência do modelo de embeddings (padrão: BACKEND_EMBEDDING ou torch)")
+    parser.add_argument("--aquecer", action="store_true", help="carrega o modelo de embeddings na inicialização")
+    args = parser.parse_args()
+
+    pool = ClassifierPool(
+        janela=args.janela_ms / 1000, lote_maximo=args.lote_maximo, max_fila=args.max_fila,
+        max_instancias=args.max_instancias, modelo_llm=args.modelo_llm, cascata=args.cascata,
+        limiar_score=args.limiar_score, limiar_margem=args.limiar_margem,
+        backend_embedding=args.backend_embedding,
+    )
+    if args.aquecer:
+        from core.embedder_registry import registry
+        registry.aquecer(backend=args.backend_embedding)
+
+    servidor = criar_servidor(args.host, args.porta, pool, args.classificador, args.timeout)
+    print(f"🚀 Serviço de classificação em http://{args.host}:{args.porta} "
+          f"(janela {args.janela_ms:g} ms, lotes de até {args.lote_maximo} quotes)", flush=True)
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+        pool.fechar()
+
+
+if __name__ == "__main__":
+    load_dotenv()
+    main()
@@ -0,0 +1,18 @@
+import pytest
+
+
+@pytest.fixture
+def embedder_falso(tmp_path, monkeypatch):
+    """
+    Registra o FakeEmbedder no registro compartilhado (nome MODELO_EMBEDDING_FALSO) e executa
+    o teste na pasta temporária, de modo que os caches em disco (cache/) ficam isolados.
+    """
+    pytest.importorskip("langchain_core")
+    from benchmarks.fakes import MODELO_EMBEDDING_FALSO, FakeEmbedder
+    from core.embedder_registry import registry
+
+    monkeypatch.chdir(tmp_path)
+    embedder = FakeEmbedder(dimensao=64)
+    registry.registrar(embedder, modelo=MODELO_EMBEDDING_FALSO)
+    yield embedder
+    registry.descarregar(MODELO_EMBEDDING_FALSO)
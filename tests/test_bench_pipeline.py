@@ -0,0 +1,69 @@
+import pytest
+
+pytest.importorskip("langchain_core")
+
+from benchmarks.bench_pipeline import CLASSIFICADORES, executar_classificador, gerar_dados, percentil
+from benchmarks.fakes import MODELO_EMBEDDING_FALSO, FakeChatModel, FakeRateLimitError
+from core.embedder_registry import registry
+
+
+def configuracao(diretorio, **kwargs):
+    return {
+        "quotes": 12, "constructos": 4, "latencia": 0.0, "taxa_erro": 0.0, "latencia_embedding": 0.0,
+        "concorrencia": 2, "scheduler": False, "tamanho_lote": 5, "cascata": False,
+        "modelo_embedding": None, "semente": 7, "diretorio": str(diretorio), **kwargs,
+    }
+
+
+@pytest.fixture
+def pasta(tmp_path, monkeypatch):
+    # executar_classificador muda o diretório atual e registra o embedder falso
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-teste")
+    yield tmp_path
+    registry.descarregar(MODELO_EMBEDDING_FALSO)
+
+
+def test_dados_sinteticos_sao_reprodutiveis():
+    assert gerar_dados(5, 3, semente=1) == gerar_dados(5, 3, semente=1)
+    assert gerar_dados(5, 3, semente=1) != gerar_dados(5, 3, semente=2)
+
+    constructos, quotes = gerar_dados(5, 3, semente=1)
+    assert list(constructos) == ["Constructo 1", "Constructo 2", "Constructo 3"]
+    assert len(quotes) == 5
+
+
+def test_percentil_interpola_entre_as_posicoes():
+    assert percentil([], 50) == 0.0
+    assert percentil([4, 1, 3, 2], 50) == pytest.approx(2.5)
+    assert percentil([1, 2, 3, 4, 5], 99) == pytest.approx(4.96)
+
+
+def test_llm_falso_e_deterministico_e_simula_429():
+    respostas = [FakeChatModel(latencia=0, constructos=["A", "B"]).invoke("Quote X").content for _ in range(2)]
+    assert respostas[0] == respostas[1]
+    assert respostas[0].startswith("Constructo: ")
+
+    with pytest.raises(FakeRateLimitError):
+        FakeChatModel(latencia=0, taxa_erro=1.0).invoke("Quote X")
+
+
+@pytest.mark.parametrize("nome", CLASSIFICADORES)
+def test_cada_classificador_roda_offline(pasta, nome):
+    resultado = executar_classificador(nome, configuracao(pasta))
+
+    assert resultado["classificador"] == nome
+    assert resultado["quotes"] == 12
+    assert resultado["latencia_p50_ms"] <= resultado["latencia_p99_ms"]
+    if nome == "embedding":
+        assert resultado["chamadas_llm"] == 0
+    else:
+        assert resultado["chamadas_llm"] > 0 and resultado["tokens_enviados"] > 0
+    assert resultado["etapas"]
+
+
+def test_erros_simulados_sao_absorvidos_pelo_agendador(pasta):
+    resultado = executar_classificador("llm", configuracao(pasta, taxa_erro=0.3))
+
+    assert resultado["erros_simulados"] > 0
+    assert resultado["retentativas"] >= resultado["erros_simulados"]
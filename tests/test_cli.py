@@ -0,0 +1,104 @@
+import json
+import signal
+import sys
+
+import pandas as pd
+import pytest
+
+import cli
+from cli import listar_planilhas
+from main_controller import MainController
+
+
+@pytest.fixture
+def controller():
+    return MainController()
+
+
+def test_exemplos_com_as_colunas_padrao_do_app(tmp_path, controller):
+    caminho = tmp_path / "exemplos.xlsx"
+    pd.DataFrame({
+        "Quote": [" Gosto de ajudar "], "Constructo": ["Empatia"], "Justificativa": ["Ajuda os outros"],
+    }).to_excel(caminho, index=False)
+
+    assert controller.carregar_exemplos_anotados(caminho) == [
+        {"quote": "Gosto de ajudar", "constructo": "Empatia", "justificativa": "Ajuda os outros"}
+    ]
+
+
+def test_exemplos_com_cabecalho_minusculo_e_sem_justificativa(tmp_path, controller):
+    caminho = tmp_path / "exemplos.xlsx"
+    pd.DataFrame({"quote": ["Eu guio o time"], "constructo": ["Liderança"]}).to_excel(caminho, index=False)
+
+    assert controller.carregar_exemplos_anotados(caminho) == [
+        {"quote": "Eu guio o time", "constructo": "Liderança", "justificativa": ""}
+    ]
+
+
+def test_exemplos_com_colunas_informadas(tmp_path, controller):
+    caminho = tmp_path / "exemplos.xlsx"
+    pd.DataFrame({"Trecho": ["a"], "Código": ["B"], "Motivo": ["c"]}).to_excel(caminho, index=False)
+
+    exemplos = controller.carregar_exemplos_anotados(caminho, "Trecho", "Código", "Motivo")
+    assert exemplos == [{"quote": "a", "constructo": "B", "justificativa": "c"}]
+
+    with pytest.raises(ValueError, match="Quote"):
+        controller.carregar_exemplos_anotados(caminho)
+
+
+def test_listar_planilhas_expande_pastas(tmp_path):
+    for nome in ("b.csv", "a.xlsx", "~$a.xlsx", "notas.txt"):
+        (tmp_path / nome).write_text("x")
+    avulsa = tmp_path / "avulsa.parquet"
+
+    assert listar_planilhas([str(tmp_path)]) == [str(tmp_path / "a.xlsx"), str(tmp_path / "b.csv")]
+    with pytest.raises(FileNotFoundError):
+        listar_planilhas([str(avulsa)])
+
+
+@pytest.fixture
+def lote(tmp_path, monkeypatch):
+    """Pasta com constructos, duas planilhas de quotes (uma sem a coluna pedida) e o embedder falso."""
+    pytest.importorskip("langchain_core")
+    from benchmarks.fakes import FakeEmbedder
+    from core.embedder_registry import MODELO_EMBEDDING_PADRAO, registry
+
+    monkeypatch.chdir(tmp_path)
+    registry.registrar(FakeEmbedder(dimensao=32), modelo=MODELO_EMBEDDING_PADRAO)
+    # A CLI instala o seu próprio tratador de Ctrl+C
+    monkeypatch.setattr(signal, "signal", lambda sinal, tratador: None)
+
+    pd.DataFrame({
+        "Constructo": ["Empatia", "Liderança"], "Definição": ["ouvir os colegas", "guiar o time"],
+    }).to_excel(tmp_path / "constructos.xlsx", index=False)
+    entrevistas = tmp_path / "entrevistas"
+    entrevistas.mkdir()
+    pd.DataFrame({"Quote": ["gosto de ouvir os colegas", "eu guio o time", "ouvir"]}).to_csv(
+        entrevistas / "a.csv", index=False
+    )
+    pd.DataFrame({"Trecho": ["sem a coluna Quote"]}).to_csv(entrevistas / "b.csv", index=False)
+    yield tmp_path
+    registry.descarregar(MODELO_EMBEDDING_PADRAO)
+
+
+def test_lote_classifica_cada_arquivo_e_grava_o_resumo(lote, monkeypatch):
+    monkeypatch.setattr(sys, "argv", [
+        "cli.py", "--constructos", "constructos.xlsx", "--coluna-quote", "Quote", "--formato-saida", "csv",
+        "--saida", "saida", "--resumo", "resumo.json", "entrevistas",
+    ])
+
+    with pytest.raises(SystemExit) as saida:
+        cli.main()
+
+    # Um arquivo com erro não impede os demais, mas a CLI termina com código 1
+    assert saida.value.code == 1
+    resumo = json.loads((lote / "resumo.json").read_text(encoding="utf-8"))
+    assert resumo["total"]["arquivos"] == 2
+    assert resumo["total"]["concluidos"] == 1
+    assert resumo["total"]["erros"] == 1
+    assert resumo["total"]["quotes"] == 3
+    concluido, com_erro = resumo["arquivos"]
+    assert concluido["estado"] == "concluído" and com_erro["estado"] == "erro"
+
+    classificado = pd.read_csv(next((lote / "saida").glob("a_*.csv")))
+    assert list(classificado["Classificação"]) == ["Empatia", "Liderança", "Empatia"]
@@ -0,0 +1,84 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from benchmarks.fakes import FakeEmbedder
+from core import construct_cache
+from core.construct_cache import ConstructEmbeddingCache, embeddings_constructos, hash_texto
+from core.embeddings import codificar_normalizado
+
+MODELO = "fake-embedder"
+
+
+@pytest.fixture
+def relogio(monkeypatch):
+    """Relógio controlado pelo teste (segundos), usado como último acesso dos embeddings."""
+    agora = [1_000_000.0]
+    monkeypatch.setattr(construct_cache.time, "time", lambda: agora[0])
+    return agora
+
+
+def test_codifica_apenas_os_textos_novos(tmp_path):
+    cache = ConstructEmbeddingCache(tmp_path)
+    embedder = FakeEmbedder(dimensao=16)
+
+    primeira = cache.obter(embedder, MODELO, ["Empatia. Ouvir", "Liderança. Guiar"])
+    assert embedder.textos_codificados == 2
+
+    # Espaços extras geram a mesma chave; só a definição editada é codificada de novo
+    segunda = cache.obter(embedder, MODELO, ["Empatia.  Ouvir ", "Liderança. Guiar o time"])
+    assert embedder.textos_codificados == 3
+    np.testing.assert_allclose(segunda[0], primeira[0])
+    np.testing.assert_allclose(segunda[1], codificar_normalizado(embedder, ["Liderança. Guiar o time"])[0])
+
+
+def test_embeddings_constructos_preserva_a_ordem(tmp_path):
+    cache = ConstructEmbeddingCache(tmp_path)
+    embedder = FakeEmbedder(dimensao=16)
+    constructos = {"B": "segundo", "A": "primeiro"}
+
+    nomes, matriz = embeddings_constructos(constructos, embedder, MODELO, cache=cache)
+
+    assert nomes == ["B", "A"]
+    np.testing.assert_allclose(matriz, codificar_normalizado(embedder, ["B. segundo", "A. primeiro"]), rtol=1e-6)
+
+
+def test_remove_os_menos_usados_ao_passar_do_limite(tmp_path, relogio):
+    cache = ConstructEmbeddingCache(tmp_path, max_itens=3)
+    embedder = FakeEmbedder(dimensao=16)
+
+    cache.obter(embedder, MODELO, ["a", "b", "c"])
+    relogio[0] += 3600
+    cache.obter(embedder, MODELO, ["a"])  # "a" passa a ser o mais recente dos antigos
+    relogio[0] += 3600
+    cache.obter(embedder, MODELO, ["d", "e"])
+
+    pasta = os.path.join(tmp_path, MODELO)
+    with open(os.path.join(pasta, "indice.json"), encoding="utf-8") as f:
+        indice = json.load(f)
+    assert set(indice) == {hash_texto(t) for t in ("a", "d", "e")}
+    assert np.load(os.path.join(pasta, "vetores.npy")).shape == (3, 16)
+    assert sorted(linha for linha, _ in indice.values()) == [0, 1, 2]
+
+    # Os vetores mantidos continuam corretos (e não são recodificados) após a compactação
+    esperado = codificar_normalizado(embedder, ["e", "a"])
+    codificados = embedder.textos_codificados
+    np.testing.assert_allclose(cache.obter(embedder, MODELO, ["e", "a"]), esperado, rtol=1e-6)
+    assert embedder.textos_codificados == codificados
+
+
+def test_le_o_indice_gravado_antes_do_lru(tmp_path):
+    embedder = FakeEmbedder(dimensao=16)
+    pasta = os.path.join(tmp_path, MODELO)
+    os.makedirs(pasta)
+    np.save(os.path.join(pasta, "vetores.npy"), codificar_normalizado(embedder, ["a"]))
+    with open(os.path.join(pasta, "indice.json"), "w", encoding="utf-8") as f:
+        json.dump({hash_texto("a"): 0}, f)
+    codificados = embedder.textos_codificados
+
+    vetores = ConstructEmbeddingCache(tmp_path).obter(embedder, MODELO, ["a"])
+
+    assert embedder.textos_codificados == codificados
+    np.testing.assert_allclose(vetores[0], codificar_normalizado(embedder, ["a"])[0])
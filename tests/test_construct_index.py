@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from core.construct_index import (
+    ConstructIndex, ExactConstructIndex, HNSWConstructIndex, criar_indice_constructos, hnsw_disponivel,
+)
+
+
+def matriz_normalizada(linhas, dimensao=16, semente=0):
+    matriz = np.random.default_rng(semente).standard_normal((linhas, dimensao)).astype(np.float32)
+    return matriz / np.linalg.norm(matriz, axis=1, keepdims=True)
+
+
+def test_indice_base_e_abstrato():
+    with pytest.raises(TypeError):
+        ConstructIndex(["a"], matriz_normalizada(1))
+
+
+def test_indice_exato_ordena_pela_similaridade():
+    matriz = matriz_normalizada(5)
+    indice = ExactConstructIndex(list("abcde"), matriz)
+
+    ranking = indice.ranking(matriz[[3]], k=2)
+
+    assert ranking[0][0][0] == "d"
+    assert ranking[0][0][1] == pytest.approx(1.0, abs=1e-5)
+    assert ranking[0][0][1] >= ranking[0][1][1]
+
+
+def test_indice_exato_sem_constructos_devolve_listas_vazias():
+    indice = ExactConstructIndex([], np.zeros((0, 16), dtype=np.float32))
+
+    assert indice.ranking(matriz_normalizada(2), k=3) == [[], []]
+
+
+def test_auto_usa_o_exato_abaixo_do_limiar():
+    indice = criar_indice_constructos(list("abc"), matriz_normalizada(3))
+
+    assert isinstance(indice, ExactConstructIndex)
+
+
+def test_backend_desconhecido():
+    with pytest.raises(ValueError):
+        criar_indice_constructos(list("abc"), matriz_normalizada(3), backend="faiss")
+
+
+@pytest.mark.skipif(not hnsw_disponivel(), reason="hnswlib não instalado")
+def test_hnsw_concorda_com_o_exato():
+    matriz = matriz_normalizada(200, semente=1)
+    quotes = matriz_normalizada(20, semente=2)
+    nomes = [f"c{i}" for i in range(200)]
+
+    exato = ExactConstructIndex(nomes, matriz).top_k(quotes, k=1)[0]
+    aproximado = HNSWConstructIndex(nomes, matriz).top_k(quotes, k=1)[0]
+
+    assert (exato == aproximado).mean() >= 0.95
@@ -0,0 +1,103 @@
+import pandas as pd
+import pytest
+
+from core.dataset_loader import QuoteDatasetLoader
+
+DF = pd.DataFrame({
+    "Quote": [f"quote {i}" for i in range(7)],
+    "Classificação": [None] * 7,
+    "Entrevistado": [f"P{i % 3}" for i in range(7)],
+})
+
+
+def gravar(df, caminho):
+    formato = caminho.suffix
+    if formato == ".csv":
+        df.to_csv(caminho, index=False)
+    elif formato == ".xlsx":
+        df.to_excel(caminho, index=False)
+    elif formato == ".parquet":
+        df.to_parquet(caminho, index=False)
+    else:
+        df.to_feather(caminho)
+    return str(caminho)
+
+
+@pytest.fixture(params=[".csv", ".xlsx", ".parquet", ".arrow"])
+def arquivo(request, tmp_path):
+    if request.param in (".parquet", ".arrow"):
+        pytest.importorskip("pyarrow")
+    return gravar(DF, tmp_path / f"quotes{request.param}")
+
+
+def test_carregar_le_apenas_o_cabecalho(arquivo):
+    loader = QuoteDatasetLoader()
+
+    assert loader.load_file(arquivo) == list(DF.columns)
+    assert loader.df is None
+
+
+def test_blocos_com_as_colunas_pedidas_e_indice_continuo(arquivo):
+    loader = QuoteDatasetLoader()
+    loader.load_file(arquivo)
+
+    blocos = list(loader.iter_chunks(["Quote"], tamanho=3))
+
+    assert [len(bloco) for bloco in blocos] == [3, 3, 1]
+    assert all(list(bloco.columns) == ["Quote"] for bloco in blocos)
+    juntos = pd.concat(blocos)
+    assert list(juntos.index) == list(range(7))
+    assert list(juntos["Quote"]) == list(DF["Quote"])
+
+
+def test_total_de_linhas_sem_ler_os_dados(arquivo):
+    loader = QuoteDatasetLoader()
+    loader.load_file(arquivo)
+
+    assert loader.total_linhas() in (None, len(DF))
+    assert loader.df is None
+
+
+def test_coluna_inexistente(arquivo):
+    loader = QuoteDatasetLoader()
+    loader.load_file(arquivo)
+
+    with pytest.raises(ValueError, match="Resposta"):
+        next(loader.iter_chunks(["Quote", "Resposta"]))
+
+
+def test_get_dataframe_materializa_uma_vez(arquivo):
+    loader = QuoteDatasetLoader()
+    loader.load_file(arquivo)
+
+    parcial = loader.get_dataframe(["Entrevistado"])
+    assert list(parcial.columns) == ["Entrevistado"]
+    assert loader.df is None
+
+    completo = loader.get_dataframe()
+    assert loader.get_dataframe() is completo
+    assert list(completo["Quote"]) == list(DF["Quote"])
+    assert [len(bloco) for bloco in loader.iter_chunks(tamanho=5)] == [5, 2]
+
+
+def test_excel_descarta_linhas_vazias_do_fim_como_o_pandas(tmp_path):
+    df = pd.DataFrame({"Quote": ["a", None, "c", None, None], "Classe": [None] * 5})
+    caminho = gravar(df, tmp_path / "quotes.xlsx")
+    loader = QuoteDatasetLoader()
+    loader.load_file(caminho)
+
+    lido = pd.concat(loader.iter_chunks(tamanho=2))
+
+    esperado = pd.read_excel(caminho)
+    assert len(lido) == len(esperado) == 3
+    assert list(lido["Quote"].fillna("")) == list(esperado["Quote"].fillna(""))
+
+
+def test_coluna_de_classificacao_pelo_cabecalho(arquivo):
+    loader = QuoteDatasetLoader()
+    loader.load_file(arquivo)
+
+    assert loader.get_coluna_classificacao() == "Classificação"
+    loader.validate_columns("Quote", "Classificação")
+    with pytest.raises(ValueError):
+        loader.validate_columns("Quote", "Resposta")
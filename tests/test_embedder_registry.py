@@ -0,0 +1,76 @@
+import threading
+import time
+
+import pytest
+
+from benchmarks.fakes import MODELO_EMBEDDING_FALSO, FakeEmbedder
+from core import embedder_registry
+from core.embedder_registry import EmbedderRegistry, resolver_backend
+
+
+@pytest.fixture
+def carregamentos(monkeypatch):
+    """Substitui o carregamento do SentenceTransformer por um FakeEmbedder, contando as chamadas."""
+    chamadas = []
+
+    def carregar(modelo, device, backend):
+        chamadas.append((modelo, device, backend))
+        time.sleep(0.05)  # Janela para que threads concorrentes disputem o carregamento
+        return FakeEmbedder(dimensao=8)
+
+    monkeypatch.setattr(embedder_registry, "_carregar_modelo", carregar)
+    return chamadas
+
+
+def test_modelo_e_carregado_uma_vez_mesmo_com_threads_concorrentes(carregamentos):
+    registro = EmbedderRegistry()
+    obtidos = []
+
+    threads = [threading.Thread(target=lambda: obtidos.append(registro.obter("m"))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(carregamentos) == 1
+    assert len({id(embedder) for embedder in obtidos}) == 1
+
+
+def test_device_e_backend_tem_instancias_proprias(carregamentos):
+    registro = EmbedderRegistry()
+
+    torch_cpu = registro.obter("m", "cpu", "torch")
+    assert registro.obter("m", "cpu", "int8") is not torch_cpu
+    assert registro.obter("m", None, "torch") is not torch_cpu
+    assert registro.obter("m", "cpu", "torch") is torch_cpu
+    assert len(carregamentos) == 3
+
+
+def test_descarregar_libera_e_o_proximo_uso_recarrega(carregamentos):
+    registro = EmbedderRegistry()
+    registro.obter("m", "cpu", "torch")
+    registro.obter("m", "cpu", "int8")
+    registro.obter("outro")
+
+    assert registro.descarregar("m", "cpu", backend="int8") == 1
+    assert registro.descarregar("m", "cpu") == 1
+    assert registro.carregados() == [("outro", None, resolver_backend())]
+
+    registro.obter("m", "cpu", "torch")
+    assert len(carregamentos) == 4
+    assert registro.descarregar() == 2
+
+
+def test_backend_desconhecido():
+    with pytest.raises(ValueError):
+        EmbedderRegistry().obter("m", backend="tensorrt")
+
+
+def test_classificadores_compartilham_o_modelo_registrado(embedder_falso):
+    from classifiers.embedding import EmbeddingQuoteClassifier
+
+    constructos = {"Empatia": "Ouvir os outros"}
+    primeiro = EmbeddingQuoteClassifier(constructos, modelo_embedding=MODELO_EMBEDDING_FALSO)
+    segundo = EmbeddingQuoteClassifier(constructos, modelo_embedding=MODELO_EMBEDDING_FALSO)
+
+    assert primeiro.embedder is segundo.embedder is embedder_falso
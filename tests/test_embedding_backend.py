@@ -0,0 +1,89 @@
+import json
+import sys
+
+import pytest
+
+from benchmarks.fakes import MODELO_EMBEDDING_FALSO, FakeEmbedder
+from core import embedder_registry
+from core.embedder_registry import chave_embedding, registry, resolver_backend
+
+
+def test_resolver_backend_valida_e_normaliza():
+    assert resolver_backend("ONNX") == "onnx"
+    assert resolver_backend("int8") == "int8"
+    with pytest.raises(ValueError, match="tensorrt"):
+        resolver_backend("tensorrt")
+
+
+def test_cada_backend_tem_a_sua_chave_de_cache():
+    # O fp32 mantém o nome do modelo, preservando os caches gravados antes dos backends
+    assert chave_embedding("m", "torch") == "m"
+    assert chave_embedding("m", "onnx") == "m@onnx"
+    assert chave_embedding("m", "int8") == "m@int8"
+
+
+@pytest.mark.parametrize("backend", ["torch", "onnx", "int8"])
+def test_sem_sentence_transformers_o_carregamento_falha_com_import_error(monkeypatch, backend):
+    # None em sys.modules faz a importação falhar, como se o pacote não estivesse instalado
+    monkeypatch.setitem(sys.modules, "sentence_transformers", None)
+
+    with pytest.raises(ImportError):
+        embedder_registry._carregar_modelo("m", None, backend)
+
+
+def test_int8_recusa_device_que_nao_seja_cpu():
+    pytest.importorskip("sentence_transformers")
+
+    with pytest.raises(ValueError, match="CPU"):
+        embedder_registry._carregar_modelo(MODELO_EMBEDDING_FALSO, "cuda", "int8")
+
+
+def test_classificador_usa_o_modelo_e_o_cache_do_backend(embedder_falso):
+    from classifiers.embedding import EmbeddingQuoteClassifier
+
+    quantizado = FakeEmbedder(dimensao=64)
+    registry.registrar(quantizado, modelo=MODELO_EMBEDDING_FALSO, backend="int8")
+    constructos = {"Empatia": "ouvir os colegas", "Liderança": "guiar o time"}
+
+    fp32 = EmbeddingQuoteClassifier(constructos, modelo_embedding=MODELO_EMBEDDING_FALSO, backend_embedding="torch")
+    int8 = EmbeddingQuoteClassifier(constructos, modelo_embedding=MODELO_EMBEDDING_FALSO, backend_embedding="int8")
+
+    assert fp32.embedder is embedder_falso and int8.embedder is quantizado
+    assert (fp32.chave_embedding, int8.chave_embedding) == (MODELO_EMBEDDING_FALSO, f"{MODELO_EMBEDDING_FALSO}@int8")
+    assert int8.classify(["eu gosto de ouvir os colegas"])[0] == ["Empatia"]
+
+
+def executar_benchmark(monkeypatch, tmp_path, indisponiveis):
+    from benchmarks import bench_embedding_backend
+
+    def obter(modelo, device, backend):
+        if backend in indisponiveis:
+            raise ImportError(f"{backend} não instalado")
+        return FakeEmbedder(dimensao=32)
+
+    monkeypatch.setattr(bench_embedding_backend, "obter_embedder", obter)
+    saida = tmp_path / "backends.json"
+    monkeypatch.setattr(sys, "argv", [
+        "bench_embedding_backend", "--volume", "20", "--repeticoes", "1", "--json", str(saida),
+    ])
+    bench_embedding_backend.main()
+    return json.loads(saida.read_text(encoding="utf-8"))
+
+
+def test_benchmark_compara_os_backends_com_o_fp32(monkeypatch, tmp_path, capsys):
+    relatorio = executar_benchmark(monkeypatch, tmp_path, indisponiveis={"onnx"})
+
+    saida = capsys.readouterr().out
+    assert "backend onnx ignorado" in saida
+    resultados = {r["backend"]: r for r in relatorio["resultados"]}
+    assert list(resultados) == ["torch", "int8"]
+    assert resultados["int8"]["concordancia_top1"] == 1.0
+    assert resultados["torch"]["ganho"] == 1.0
+
+
+def test_benchmark_sem_fp32_termina_com_codigo_1(monkeypatch, tmp_path, capsys):
+    with pytest.raises(SystemExit) as saida:
+        executar_benchmark(monkeypatch, tmp_path, indisponiveis={"torch"})
+
+    assert saida.value.code == 1
+    assert "referência fp32" in capsys.readouterr().out
@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+
+from benchmarks.fakes import MODELO_EMBEDDING_FALSO
+from core.embeddings import codificar_normalizado, top_k
+
+CONSTRUCTOS = {
+    "Empatia": "ouvir e acolher os colegas",
+    "Liderança": "guiar o time e distribuir tarefas",
+    "Autonomia": "decidir sozinho sem supervisão",
+}
+
+QUOTES = [
+    "eu gosto de ouvir os colegas", "quem distribui as tarefas do time sou eu",
+    "prefiro decidir sozinho", "acolher quem chega", "guiar o time", "sem supervisão",
+    "ouvir", "tarefas",
+]
+
+
+def classificador(**kwargs):
+    from classifiers.embedding import EmbeddingQuoteClassifier
+    return EmbeddingQuoteClassifier(CONSTRUCTOS, modelo_embedding=MODELO_EMBEDDING_FALSO, **kwargs)
+
+
+def referencia(embedder, quotes):
+    """Classificação quote a quote, sem lotes (comportamento original)."""
+    nomes = list(CONSTRUCTOS)
+    constructos = codificar_normalizado(embedder, [f"{n}. {d}" for n, d in CONSTRUCTOS.items()])
+    resultados = []
+    for quote in quotes:
+        similaridades = codificar_normalizado(embedder, [quote])[0] @ constructos.T
+        resultados.append((nomes[int(np.argmax(similaridades))], float(similaridades.max())))
+    return resultados
+
+
+def test_lotes_dao_o_mesmo_resultado_que_quote_a_quote(embedder_falso):
+    resultados, justificativas, tempos = classificador(batch_size=3).classify(QUOTES)
+
+    esperado = referencia(embedder_falso, QUOTES)
+    assert resultados == [nome for nome, _ in esperado]
+    assert justificativas == [f"Similaridade: {sim:.4f}" for _, sim in esperado]
+    assert len(tempos) == len(QUOTES)
+
+
+def test_quotes_sao_codificados_em_lotes(embedder_falso, monkeypatch):
+    chamadas = []
+    encode = embedder_falso.encode
+
+    def encode_contado(textos, **kwargs):
+        chamadas.append(len(textos))
+        return encode(textos, **kwargs)
+
+    monkeypatch.setattr(embedder_falso, "encode", encode_contado)
+
+    classificador(batch_size=3).classify(QUOTES)
+
+    # Uma chamada para os constructos (cache em disco vazio) e uma por lote de quotes
+    assert chamadas == [3, 3, 3, 2]
+
+
+def test_classify_iter_entrega_os_indices_na_ordem(embedder_falso):
+    saidas = list(classificador(batch_size=3).classify_iter(QUOTES))
+
+    assert [idx for idx, *_ in saidas] == list(range(len(QUOTES)))
+
+
+def test_rank_devolve_os_k_mais_similares_em_ordem(embedder_falso):
+    rankings, _ = classificador().rank(QUOTES[:2], k=3)
+
+    for ranking in rankings:
+        assert sorted(nome for nome, _ in ranking) == sorted(CONSTRUCTOS)
+        similaridades = [sim for _, sim in ranking]
+        assert similaridades == sorted(similaridades, reverse=True)
+
+
+def test_top_k_mantem_a_ordem_original_nos_empates():
+    indices, valores = top_k(np.array([[0.5, 0.9, 0.5, 0.9]]), k=3)
+
+    assert indices.tolist() == [[1, 3, 0]]
+    assert valores.tolist() == [[0.9, 0.9, 0.5]]
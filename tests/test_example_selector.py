@@ -0,0 +1,60 @@
+import pytest
+
+pytest.importorskip("langchain_core")
+
+from benchmarks.fakes import MODELO_EMBEDDING_FALSO, FakeChatModel
+from classifiers.llm import LLMQuoteClassifier
+from core.example_selector import SemanticExampleSelector
+from core.llm_scheduler import LLMScheduler
+
+CONSTRUCTOS = {"Empatia": "Capacidade de se colocar no lugar do outro", "Liderança": "Capacidade de guiar o time"}
+
+EXEMPLOS = [
+    {"quote": "Eu escuto os colegas quando estão tristes", "constructo": "Empatia", "justificativa": "a"},
+    {"quote": "Eu organizo o time e distribuo as tarefas", "constructo": "Liderança", "justificativa": "b"},
+    {"quote": "Gosto de plantas e jardinagem no fim de semana", "constructo": "Outro", "justificativa": "c"},
+]
+
+
+def test_seleciona_os_exemplos_mais_parecidos_com_o_quote(embedder_falso):
+    seletor = SemanticExampleSelector(EXEMPLOS, k=1, modelo_embedding=MODELO_EMBEDDING_FALSO)
+
+    selecionados = seletor.select_examples({"quote": "Quem organiza as tarefas do time sou eu"})
+
+    assert [ex["constructo"] for ex in selecionados] == ["Liderança"]
+
+
+def test_quote_repetido_nao_e_codificado_de_novo(embedder_falso):
+    seletor = SemanticExampleSelector(EXEMPLOS, k=2, modelo_embedding=MODELO_EMBEDDING_FALSO)
+    codificados = embedder_falso.textos_codificados
+
+    primeira = seletor.select_examples({"quote": "Eu escuto os colegas"})
+    segunda = seletor.select_examples({"quote": "Eu escuto os colegas"})
+
+    assert primeira == segunda
+    assert embedder_falso.textos_codificados == codificados + 1
+
+
+def test_classificador_llm_usa_o_modelo_de_embeddings_configurado(embedder_falso):
+    classificador = LLMQuoteClassifier(
+        CONSTRUCTOS, escopo="Teste", llm=FakeChatModel(latencia=0, constructos=list(CONSTRUCTOS)),
+        exemplos=EXEMPLOS, k_exemplos=1, modelo_embedding=MODELO_EMBEDDING_FALSO
+    )
+
+    assert classificador.prompt.example_selector.embedder is embedder_falso
+
+
+def test_estimativa_do_scheduler_reaproveita_o_vetor_do_quote(embedder_falso):
+    classificador = LLMQuoteClassifier(
+        CONSTRUCTOS, escopo="Teste", llm=FakeChatModel(latencia=0, constructos=list(CONSTRUCTOS)),
+        exemplos=EXEMPLOS, k_exemplos=1, modelo_embedding=MODELO_EMBEDDING_FALSO,
+        scheduler=LLMScheduler()
+    )
+    quotes = ["Eu escuto os colegas", "Eu distribuo as tarefas", "Cuido do jardim"]
+    codificados = embedder_falso.textos_codificados
+
+    resultados, _, _ = classificador.classify(quotes)
+
+    assert len(resultados) == len(quotes)
+    # Um vetor por quote, embora cada prompt seja renderizado na estimativa e na chamada
+    assert embedder_falso.textos_codificados == codificados + len(quotes)
@@ -0,0 +1,111 @@
+import pytest
+
+pytest.importorskip("langchain_core")
+
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from benchmarks.fakes import MODELO_EMBEDDING_FALSO, FakeChatModel
+from classifiers.hybrid_classifier import HybridQuoteClassifier
+from core.llm_scheduler import LLMScheduler
+
+CONSTRUCTOS = {
+    "Empatia": "colocar no lugar do outro sentir acolher",
+    "Liderança": "guiar o time tomar decisões definir rumo",
+}
+# Quotes quase idênticos a um constructo (aceitos pela cascata) e um sem relação (escalado)
+FACEIS = ["Empatia colocar no lugar do outro sentir acolher", "Liderança guiar o time tomar decisões definir rumo"]
+AMBIGUO = "banana laranja abacaxi"
+
+
+class ChatModelLideranca(FakeChatModel):
+    """Responde sempre "Liderança"; falha quando o prompt contém `gatilho_falha`."""
+
+    gatilho_falha: str = "\0"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        prompt = self._texto(messages)
+        self._registrar_chamada(prompt)
+        # Apenas o quote classificado (a última mensagem), não as definições do prompt de sistema
+        quote = prompt.rsplit("Quote:", 1)[-1].split("Classifique o trecho")[0]
+        if self.gatilho_falha in quote:
+            raise ValueError("500 Internal Server Error")
+        resposta = "Constructo: Liderança\nJustificativa: simulada."
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=resposta))])
+
+
+class SchedulerRegistrado(LLMScheduler):
+    def __init__(self, **kwargs):
+        super().__init__(tamanho_lote=8, espera_base=0.001, **kwargs)
+        self.lotes = []
+
+    def executar(self, runnable, entradas, estimar=None):
+        self.lotes.append([entrada["quote"] for entrada in entradas])
+        return super().executar(runnable, entradas, estimar)
+
+
+def criar(llm, **kwargs):
+    return HybridQuoteClassifier(
+        CONSTRUCTOS, escopo="Teste", llm=llm, modelo_embedding=MODELO_EMBEDDING_FALSO, cascata=True,
+        limiar_score=0.8, limiar_margem=0.3, custo_por_mil_tokens=0.01, **kwargs
+    )
+
+
+def test_cascata_aceita_os_faceis_e_escala_apenas_os_ambiguos(embedder_falso):
+    llm = ChatModelLideranca(latencia=0)
+    classificador = criar(llm)
+
+    resultados, justificativas, _ = classificador.classify([*FACEIS, AMBIGUO])
+
+    assert resultados[:2] == ["Empatia", "Liderança"]
+    assert "cascata" in justificativas[0]
+    assert resultados[2] == "Liderança"
+    assert llm.contadores["chamadas"] == 1
+    estatisticas = classificador.estatisticas_cascata
+    assert (estatisticas["total"], estatisticas["aceitos"], estatisticas["escalados"]) == (3, 2, 1)
+    assert estatisticas["tokens_economizados"] > 0
+
+
+def test_cascata_desligada_envia_tudo_ao_llm(embedder_falso):
+    llm = ChatModelLideranca(latencia=0)
+    classificador = HybridQuoteClassifier(
+        CONSTRUCTOS, escopo="Teste", llm=llm, modelo_embedding=MODELO_EMBEDDING_FALSO
+    )
+
+    assert classificador.classify([*FACEIS, AMBIGUO])[0] == ["Liderança"] * 3
+    assert llm.contadores["chamadas"] == 3
+    assert classificador.resumo_cascata() == ""
+
+
+def test_auditoria_usa_o_scheduler_e_reporta_economia_e_concordancia(embedder_falso):
+    llm = ChatModelLideranca(latencia=0, gatilho_falha="Empatia colocar")
+    scheduler = SchedulerRegistrado()
+    classificador = criar(llm, scheduler=scheduler, auditar_cascata=True)
+
+    resultados, _, _ = classificador.classify([*FACEIS, AMBIGUO])
+
+    # O rótulo da cascata é mantido; a auditoria vai em lote pelo scheduler, depois dos escalados
+    assert resultados[:2] == ["Empatia", "Liderança"]
+    assert scheduler.lotes == [[AMBIGUO], FACEIS]
+    estatisticas = classificador.estatisticas_cascata
+    assert (estatisticas["auditados"], estatisticas["concordancias"], estatisticas["falhas_auditoria"]) == (1, 1, 1)
+    assert estatisticas["tokens_economizados"] > 0
+
+    resumo = classificador.resumo_cascata()
+    assert "Escalados para o LLM: 1/3" in resumo
+    assert "Chamadas economizadas: 2" in resumo
+    assert "Custo estimado economizado" in resumo
+    assert "Concordância com o LLM nos aceitos (auditoria): 1/1" in resumo
+    assert "auditoria com erro (ignoradas): 1" in resumo
+
+
+def test_auditoria_sem_scheduler_vai_em_lote_e_nao_interrompe_a_execucao(embedder_falso):
+    llm = ChatModelLideranca(latencia=0, gatilho_falha="Liderança guiar")
+    classificador = criar(llm, auditar_cascata=True)
+
+    saidas = list(classificador.classify_iter(FACEIS))
+
+    assert [s[1] for s in saidas] == ["Empatia", "Liderança"]
+    assert llm.contadores["chamadas"] == 2
+    estatisticas = classificador.estatisticas_cascata
+    assert (estatisticas["auditados"], estatisticas["concordancias"], estatisticas["falhas_auditoria"]) == (1, 0, 1)
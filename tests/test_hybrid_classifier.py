@@ -0,0 +1,69 @@
+import pytest
+
+pytest.importorskip("langchain_core")
+
+from benchmarks.fakes import MODELO_EMBEDDING_FALSO, FakeChatModel
+from classifiers.hybrid_classifier import HybridQuoteClassifier
+from core.llm_clients import limpar_clientes, obter_chat_model
+
+CONSTRUCTOS = {
+    "Empatia": "colocar no lugar do outro",
+    "Liderança": "guiar o time",
+    "Autonomia": "decidir sozinho",
+    "Motivação": "vontade de aprender",
+}
+
+
+def criar(**kwargs):
+    llm = FakeChatModel(latencia=0, constructos=list(CONSTRUCTOS))
+    return HybridQuoteClassifier(
+        CONSTRUCTOS, escopo="Teste", llm=llm, modelo_embedding=MODELO_EMBEDDING_FALSO, **kwargs
+    ), llm
+
+
+def test_prompt_chain_e_indice_sao_montados_uma_vez(embedder_falso, monkeypatch):
+    montagens = []
+    criar_chain = HybridQuoteClassifier._criar_chain
+
+    def criar_chain_contado(self):
+        montagens.append(self)
+        return criar_chain(self)
+
+    monkeypatch.setattr(HybridQuoteClassifier, "_criar_chain", criar_chain_contado)
+    classificador, llm = criar()
+    chain = classificador.chain
+
+    classificador.classify(["eu guio o time", "gosto de aprender"])
+    codificados = embedder_falso.textos_codificados
+    classificador.classify(["decido sozinho"])
+
+    assert len(montagens) == 1
+    assert classificador.chain is chain
+    # Na segunda chamada só o quote novo é codificado (constructos já estão no índice)
+    assert embedder_falso.textos_codificados == codificados + 1
+    assert llm.contadores["chamadas"] == 3
+
+
+def test_prompt_traz_apenas_os_top_n_constructos(embedder_falso):
+    classificador, _ = criar(top_n=2)
+
+    entradas, _, _ = classificador._entradas(["eu guio o time"])
+
+    definicoes = entradas[0]["top_definicoes"].splitlines()
+    assert len(definicoes) == 2
+    assert definicoes[0] == "Liderança: guiar o time"
+
+
+def test_clientes_do_llm_sao_compartilhados_por_configuracao(monkeypatch):
+    pytest.importorskip("langchain_openai")
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-teste")
+    limpar_clientes()
+
+    cliente = obter_chat_model("gpt-4", temperature=0.4)
+    assert obter_chat_model("gpt-4", temperature=0.4) is cliente
+    assert obter_chat_model("gpt-4", temperature=0) is not cliente
+    assert obter_chat_model("gpt-4", temperature=0.4, gerenciado_por_scheduler=True) is not cliente
+
+    limpar_clientes()
+    assert obter_chat_model("gpt-4", temperature=0.4) is not cliente
+    limpar_clientes()
@@ -0,0 +1,49 @@
+import pytest
+
+pytest.importorskip("langchain_core")
+
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import ChatPromptTemplate
+
+from benchmarks.fakes import FakeChatModel
+from core.instrumentation import ETAPA_LLM, Tracer, instrumentar
+from core.llm_cache import LLMResponseCache
+
+
+def criar_chain(llm):
+    prompt = ChatPromptTemplate.from_template("Classifique o trecho: {quote}")
+    return instrumentar(prompt | llm | StrOutputParser())
+
+
+def test_chamadas_e_tokens_do_llm_sao_contados_por_execucao():
+    chain = criar_chain(FakeChatModel(latencia=0, constructos=["Empatia"]))
+
+    tracer = Tracer()
+    with tracer.ativo():
+        chain.invoke({"quote": "um"})
+        chain.invoke({"quote": "dois"})
+
+    resumo = tracer.resumo()
+    assert resumo["contadores"]["chamadas_llm"] == 2
+    assert resumo["contadores"]["tokens_prompt"] > 0 and resumo["contadores"]["tokens_resposta"] > 0
+    assert resumo["etapas"][ETAPA_LLM]["contagem"] == 2
+
+
+def test_acertos_do_cache_nao_contam_como_chamadas_nem_tokens(tmp_path):
+    llm = FakeChatModel(latencia=0, constructos=["Empatia"], cache=LLMResponseCache(str(tmp_path / "cache.sqlite")))
+    chain = criar_chain(llm)
+
+    uma_chamada = Tracer()
+    with uma_chamada.ativo():
+        chain.invoke({"quote": "mesmo quote"})
+    duas_consultas = Tracer()
+    with duas_consultas.ativo():
+        chain.invoke({"quote": "mesmo quote"})
+        chain.invoke({"quote": "mesmo quote"})
+
+    assert llm.contadores["chamadas"] == 1
+    assert uma_chamada.contadores["chamadas_llm"] == 1
+    contadores = duas_consultas.contadores
+    assert contadores["chamadas_llm"] == 0
+    assert contadores["tokens_prompt"] == 0 and contadores["tokens_resposta"] == 0
+    assert contadores["cache_hits"] == 2
@@ -0,0 +1,164 @@
+import threading
+
+import pytest
+
+from core.jobs import (
+    HISTORICO_POR_SESSAO, JOB_CANCELADO, JOB_CONCLUIDO, JOB_ERRO, JOB_EXECUTANDO, JOB_INTERROMPIDO, JOB_NA_FILA,
+    JobExecutor,
+)
+from core.sessions import SessionRegistry
+
+ESPERA = 5
+
+
+@pytest.fixture
+def executor():
+    executor = JobExecutor(max_jobs=1)
+    yield executor
+    executor.fechar()
+
+
+def job_bloqueado(liberar, iniciado=None):
+    """Job que informa o progresso e espera `liberar`, parando se for interrompido."""
+    def funcao(job):
+        job.atualizar_progresso(1, total=4)
+        if iniciado is not None:
+            iniciado.set()
+        while not liberar.wait(0.01):
+            if job.deve_interromper():
+                return "parcial"
+        return "ok"
+    return funcao
+
+
+def test_sessoes_recebem_controladores_proprios():
+    sessoes = SessionRegistry(fabrica=object)
+
+    a = sessoes.obter("a")
+    assert sessoes.obter("a") is a
+    assert sessoes.obter("b") is not a
+    assert len(sessoes) == 2
+
+    assert sessoes.encerrar("a")
+    assert not sessoes.encerrar("a")
+    assert sessoes.obter("a") is not a
+
+
+def test_job_concluido_com_resultado_e_progresso(executor):
+    job = executor.submeter("a", "planilha.xlsx", lambda job: job.atualizar_progresso(3, 3) or "resultado.csv")
+
+    assert job.aguardar(ESPERA)
+    assert job.estado == JOB_CONCLUIDO
+    assert job.resultado == "resultado.csv"
+    assert job.resumo()["progresso"] == "3/3 (100%)"
+
+
+def test_erro_no_job_fica_registrado(executor):
+    def falhar(job):
+        raise ValueError("planilha inválida")
+
+    job = executor.submeter("a", "x", falhar)
+
+    assert job.aguardar(ESPERA)
+    assert job.estado == JOB_ERRO
+    assert job.erro == "planilha inválida"
+
+
+def test_interromper_afeta_apenas_o_job_pedido():
+    executor = JobExecutor(max_jobs=2)
+    liberar = threading.Event()
+    iniciados = [threading.Event(), threading.Event()]
+    primeiro = executor.submeter("a", "1", job_bloqueado(liberar, iniciados[0]))
+    segundo = executor.submeter("a", "2", job_bloqueado(liberar, iniciados[1]))
+    assert all(evento.wait(ESPERA) for evento in iniciados)
+
+    assert executor.interromper(primeiro.id, "a")
+    assert primeiro.aguardar(ESPERA)
+    assert primeiro.estado == JOB_INTERROMPIDO
+    assert primeiro.resultado == "parcial"
+    assert segundo.estado == JOB_EXECUTANDO
+
+    liberar.set()
+    assert segundo.aguardar(ESPERA)
+    assert segundo.estado == JOB_CONCLUIDO
+    assert not executor.interromper(segundo.id, "a")
+    executor.fechar()
+
+
+def test_fila_limita_envios_e_cancela_sem_executar():
+    executor = JobExecutor(max_jobs=1, max_fila=1)
+    liberar, iniciado = threading.Event(), threading.Event()
+    executor.submeter("a", "1", job_bloqueado(liberar, iniciado))
+    assert iniciado.wait(ESPERA)
+
+    executados = []
+    na_fila = executor.submeter("b", "2", executados.append)
+    assert na_fila.estado == JOB_NA_FILA
+    assert executor.posicao_na_fila(na_fila) == 1
+    assert executor.ocupacao() == (1, 1)
+    with pytest.raises(RuntimeError):
+        executor.submeter("c", "3", executados.append)
+
+    assert executor.interromper(na_fila.id, "b")
+    assert na_fila.estado == JOB_CANCELADO
+    liberar.set()
+    executor.fechar()
+    assert executados == []
+
+
+def test_sessao_enxerga_apenas_os_proprios_jobs(executor):
+    job_a = executor.submeter("a", "1", lambda job: None)
+    job_b = executor.submeter("b", "2", lambda job: None)
+    assert job_a.aguardar(ESPERA) and job_b.aguardar(ESPERA)
+
+    assert executor.listar("a") == [job_a]
+    assert executor.obter(job_b.id, "a") is None
+    assert not executor.interromper(job_b.id, "a")
+
+    executor.descartar_sessao("a")
+    assert executor.listar("a") == []
+    assert executor.listar("b") == [job_b]
+
+
+def test_job_em_andamento_sai_da_listagem_ao_terminar_se_a_sessao_foi_descartada(executor):
+    liberar, iniciado = threading.Event(), threading.Event()
+    job = executor.submeter("a", "1", job_bloqueado(liberar, iniciado))
+    assert iniciado.wait(ESPERA)
+
+    executor.descartar_sessao("a")
+    assert executor.listar("a") == [job]
+
+    liberar.set()
+    assert job.aguardar(ESPERA)
+    assert job.estado == JOB_CONCLUIDO
+    assert executor.listar("a") == []
+
+
+def test_historico_limitado_por_sessao(executor):
+    jobs = [executor.submeter("a", str(i), lambda job: None) for i in range(HISTORICO_POR_SESSAO + 1)]
+    assert all(job.aguardar(ESPERA) for job in jobs)
+
+    executor.submeter("a", "último", lambda job: None).aguardar(ESPERA)
+
+    listados = executor.listar("a")
+    assert jobs[0] not in listados
+    assert len(listados) == HISTORICO_POR_SESSAO + 1
+
+
+def test_copia_para_job_nao_acompanha_a_sessao(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    from main_controller import MainController
+
+    controller = MainController()
+    controller.exemplos_usuario = [{"quote": "a"}]
+    controller.quote_loader.file_path = "primeira.xlsx"
+    controller.interromper = True
+
+    copia = controller.copiar_para_job()
+    controller.quote_loader.file_path = "segunda.xlsx"
+    controller.exemplos_usuario.append({"quote": "b"})
+
+    assert copia.quote_loader.file_path == "primeira.xlsx"
+    assert copia.exemplos_usuario == [{"quote": "a"}]
+    assert copia.interromper is False
+    assert copia.quote_store is controller.quote_store
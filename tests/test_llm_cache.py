@@ -0,0 +1,96 @@
+import pytest
+
+pytest.importorskip("langchain_core")
+
+from langchain_core.outputs import Generation
+
+from core.instrumentation import Tracer
+from core.llm_cache import LLMResponseCache
+
+
+def test_acertos_do_cache_sao_contados_por_execucao(tmp_path):
+    cache = LLMResponseCache(caminho=str(tmp_path / "respostas.sqlite"))
+    cache.update("prompt", "modelo", [Generation(text="resposta")])
+
+    primeira, segunda = Tracer(), Tracer()
+    with primeira.ativo():
+        cache.lookup("prompt", "modelo")
+        cache.lookup("outro prompt", "modelo")
+    with segunda.ativo():
+        cache.lookup("prompt", "modelo")
+
+    assert (primeira.contadores["cache_hits"], primeira.contadores["cache_misses"]) == (1, 1)
+    assert (segunda.contadores["cache_hits"], segunda.contadores["cache_misses"]) == (1, 0)
+    # Os contadores globais do cache somam todas as execuções
+    assert (cache.hits, cache.misses) == (2, 1)
+
+
+def test_resposta_repetida_nao_chama_o_provedor(tmp_path):
+    from benchmarks.fakes import FakeChatModel
+
+    cache = LLMResponseCache(caminho=str(tmp_path / "respostas.sqlite"))
+    llm = FakeChatModel(latencia=0, constructos=["A", "B"], cache=cache)
+
+    primeira = llm.invoke("Classifique: eu guio o time").content
+    segunda = llm.invoke("Classifique: eu guio o time").content
+    llm.invoke("Classifique: outro quote")
+
+    assert primeira == segunda
+    assert llm.contadores["chamadas"] == 2
+
+    # Outro processo (nova instância) reaproveita as respostas gravadas em disco
+    reaberto = FakeChatModel(
+        latencia=0, constructos=["A", "B"], cache=LLMResponseCache(caminho=cache.caminho)
+    )
+    assert reaberto.invoke("Classifique: eu guio o time").content == primeira
+    assert reaberto.contadores["chamadas"] == 0
+
+
+def test_configuracao_do_modelo_compoe_a_chave(tmp_path):
+    cache = LLMResponseCache(caminho=str(tmp_path / "respostas.sqlite"))
+    cache.update("prompt", "modelo=gpt-4 temperatura=0", [Generation(text="resposta")])
+
+    assert cache.lookup("prompt", "modelo=gpt-4 temperatura=0.4") is None
+    assert cache.lookup("prompt", "modelo=gpt-4 temperatura=0")[0].text == "resposta"
+
+
+def test_respostas_expiradas_sao_descartadas(tmp_path, monkeypatch):
+    import core.llm_cache as modulo_cache
+
+    agora = [1_000.0]
+    monkeypatch.setattr(modulo_cache.time, "time", lambda: agora[0])
+    cache = LLMResponseCache(caminho=str(tmp_path / "respostas.sqlite"), ttl_segundos=60)
+    cache.update("prompt", "modelo", [Generation(text="resposta")])
+
+    agora[0] += 30
+    assert cache.lookup("prompt", "modelo") is not None
+    agora[0] += 60
+    assert cache.lookup("prompt", "modelo") is None
+
+
+def test_limite_remove_as_menos_usadas(tmp_path, monkeypatch):
+    import core.llm_cache as modulo_cache
+
+    agora = [1_000.0]
+    monkeypatch.setattr(modulo_cache.time, "time", lambda: agora[0])
+    cache = LLMResponseCache(caminho=str(tmp_path / "respostas.sqlite"), max_itens=10)
+    cache.update("mais usado", "modelo", [Generation(text="x")])
+    for i in range(99):
+        agora[0] += 1
+        if i == 95:
+            cache.lookup("mais usado", "modelo")
+        cache.update(f"prompt {i}", "modelo", [Generation(text="x")])
+
+    # O limite é verificado a cada 100 inserções
+    total = cache._conectar().execute("SELECT COUNT(*) FROM respostas").fetchone()[0]
+    assert total == 10
+    assert cache.lookup("mais usado", "modelo") is not None
+    assert cache.lookup("prompt 0", "modelo") is None
+
+
+def test_cache_inativo_nao_le_nem_grava(tmp_path):
+    cache = LLMResponseCache(caminho=str(tmp_path / "respostas.sqlite"), ativo=False)
+    cache.update("prompt", "modelo", [Generation(text="resposta")])
+
+    assert cache.lookup("prompt", "modelo") is None
+    assert not (tmp_path / "respostas.sqlite").exists()
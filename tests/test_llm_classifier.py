@@ -0,0 +1,94 @@
+import asyncio
+import re
+import time
+
+import pytest
+
+pytest.importorskip("langchain_core")
+
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from pydantic import PrivateAttr
+
+from benchmarks.fakes import FakeChatModel
+from classifiers.llm import LLMQuoteClassifier
+
+CONSTRUCTOS = {"Empatia": "Capacidade de se colocar no lugar do outro", "Liderança": "Capacidade de guiar o time"}
+
+
+class ChatModelEco(FakeChatModel):
+    """
+    Chat model falso que responde com o próprio quote ("quote-<n>") e mede quantas
+    chamadas ficam em andamento ao mesmo tempo. Quotes de número maior respondem
+    mais rápido, de modo que terminam fora da ordem de envio.
+    """
+
+    _em_andamento = PrivateAttr(default=0)
+    _pico = PrivateAttr(default=0)
+
+    @property
+    def pico(self):
+        return self._pico
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        prompt = self._texto(messages)
+        self._registrar_chamada(prompt)
+        numero = int(re.search(r"quote-(\d+)", prompt).group(1))
+        self._em_andamento += 1
+        self._pico = max(self._pico, self._em_andamento)
+        try:
+            await asyncio.sleep(self.latencia / (numero + 1))
+        finally:
+            self._em_andamento -= 1
+        resposta = f"Constructo: quote-{numero}\nJustificativa: eco"
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=resposta))])
+
+
+def criar_classificador(max_concurrency, latencia=0.05):
+    llm = ChatModelEco(latencia=latencia)
+    classificador = LLMQuoteClassifier(CONSTRUCTOS, escopo="Teste", llm=llm, max_concurrency=max_concurrency)
+    return classificador, llm
+
+
+def test_classify_async_preserva_a_ordem_dos_quotes():
+    classificador, _ = criar_classificador(max_concurrency=4)
+    quotes = [f"quote-{i}" for i in range(10)]
+
+    resultados, justificativas, tempos = asyncio.run(classificador.classify_async(quotes))
+
+    assert resultados == quotes
+    assert justificativas == ["eco"] * len(quotes)
+    assert len(tempos) == len(quotes) and all(t > 0 for t in tempos)
+
+
+@pytest.mark.parametrize("max_concurrency", [1, 3, 8])
+def test_classify_async_respeita_o_limite_de_concorrencia(max_concurrency):
+    classificador, llm = criar_classificador(max_concurrency)
+
+    asyncio.run(classificador.classify_async([f"quote-{i}" for i in range(12)]))
+
+    assert llm.pico == max_concurrency
+    assert llm.contadores["chamadas"] == 12
+
+
+def test_classify_async_sobrepoe_a_latencia_das_chamadas():
+    latencia = 0.2
+    classificador, _ = criar_classificador(max_concurrency=8, latencia=latencia)
+    quotes = ["quote-0"] * 8  # Todas as chamadas com a latência cheia
+
+    inicio = time.perf_counter()
+    asyncio.run(classificador.classify_async(quotes))
+    duracao = time.perf_counter() - inicio
+
+    # Sequencial levaria 8 x latência; em paralelo, pouco mais de uma latência
+    assert duracao < latencia * 4
+
+
+def test_classify_usa_o_caminho_assincrono_com_concorrencia():
+    classificador, llm = criar_classificador(max_concurrency=4)
+    quotes = [f"quote-{i}" for i in range(6)]
+
+    resultados, _, _ = classificador.classify(quotes)
+
+    assert resultados == quotes
+    assert llm.pico > 1
@@ -0,0 +1,105 @@
+import pytest
+
+pytest.importorskip("langchain_core")
+
+from langchain_core.runnables import RunnableLambda
+
+from benchmarks.fakes import MODELO_EMBEDDING_FALSO, FakeChatModel, FakeRateLimitError
+from classifiers.base import JustificativaComFalha
+from classifiers.hybrid_classifier import HybridQuoteClassifier
+from classifiers.llm import LLMQuoteClassifier
+from core.llm_scheduler import LLMScheduler, eh_cota_esgotada, eh_erro_limite
+
+CONSTRUCTOS = {"Empatia": "Capacidade de se colocar no lugar do outro", "Liderança": "Capacidade de guiar o time"}
+
+
+class ErroCotaEsgotada(Exception):
+    status_code = 429
+    code = "insufficient_quota"
+
+
+class ChatModelComFalha(FakeChatModel):
+    """Chat model falso que falha (erro não repetível) sempre que o prompt contém `quote_com_falha`."""
+
+    quote_com_falha: str = "quote-2"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        if self.quote_com_falha in self._texto(messages):
+            raise ValueError("400 Bad Request: conteúdo recusado")
+        return super()._generate(messages, stop, run_manager, **kwargs)
+
+
+def agendador(**kwargs):
+    return LLMScheduler(tamanho_lote=4, max_concurrency=4, espera_base=0.001, espera_maxima=0.01, **kwargs)
+
+
+def test_limite_de_taxa_e_repetido_mas_cota_esgotada_nao():
+    assert eh_erro_limite(FakeRateLimitError("429 Too Many Requests"))
+    assert eh_erro_limite(Exception("Rate limit reached for gpt-4"))
+
+    cota = ErroCotaEsgotada("Error code: 429 - You exceeded your current quota (insufficient_quota)")
+    assert eh_cota_esgotada(cota)
+    assert not eh_erro_limite(cota)
+    assert not eh_erro_limite(Exception("429 {'error': {'code': 'insufficient_quota'}}"))
+    assert not eh_erro_limite(ValueError("400 Bad Request"))
+
+
+def test_executar_repete_limites_de_taxa_e_devolve_os_demais_erros_na_posicao():
+    tentativas = {}
+
+    def responder(entrada):
+        n = entrada["n"]
+        tentativas[n] = tentativas.get(n, 0) + 1
+        if n == 1 and tentativas[n] < 3:
+            raise FakeRateLimitError("429 Too Many Requests")
+        if n == 2:
+            raise ErroCotaEsgotada("insufficient_quota")
+        return f"ok-{n}"
+
+    scheduler = agendador()
+    respostas = scheduler.executar(RunnableLambda(responder), [{"n": n} for n in range(4)])
+
+    assert respostas[0] == "ok-0" and respostas[1] == "ok-1" and respostas[3] == "ok-3"
+    assert isinstance(respostas[2], ErroCotaEsgotada)
+    assert tentativas == {0: 1, 1: 3, 2: 1, 3: 1}
+    assert scheduler.retentativas == 2
+
+
+def test_llm_agendado_marca_apenas_o_quote_com_falha():
+    llm = ChatModelComFalha(latencia=0, constructos=list(CONSTRUCTOS))
+    classificador = LLMQuoteClassifier(CONSTRUCTOS, escopo="Teste", llm=llm, scheduler=agendador())
+    quotes = [f"quote-{i}" for i in range(6)]
+
+    saidas = sorted(classificador.classify_iter(quotes))
+
+    assert [i for i, *_ in saidas] == list(range(6))
+    falhas = [i for i, _, justificativa, _ in saidas if isinstance(justificativa, JustificativaComFalha)]
+    assert falhas == [2]
+    assert saidas[2][1] == "" and "conteúdo recusado" in saidas[2][2]
+    assert all(saidas[i][1].split(" |")[0] in CONSTRUCTOS for i in (0, 1, 3, 4, 5))
+
+
+def test_hibrido_agendado_marca_apenas_o_quote_com_falha(embedder_falso):
+    llm = ChatModelComFalha(latencia=0, constructos=list(CONSTRUCTOS))
+    classificador = HybridQuoteClassifier(
+        CONSTRUCTOS, escopo="Teste", llm=llm, scheduler=agendador(), modelo_embedding=MODELO_EMBEDDING_FALSO
+    )
+
+    resultados, justificativas, _ = classificador.classify([f"quote-{i}" for i in range(5)])
+
+    assert [isinstance(j, JustificativaComFalha) for j in justificativas] == [False, False, True, False, False]
+    assert resultados[2] == ""
+    assert all(resultados[i].split(" |")[0] in CONSTRUCTOS for i in (0, 1, 3, 4))
+
+
+def test_clientes_do_agendador_nao_repetem_chamadas_por_conta_propria(monkeypatch):
+    pytest.importorskip("langchain_openai")
+    from core.llm_clients import limpar_clientes, obter_chat_model
+
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-teste")
+    limpar_clientes()
+    try:
+        assert obter_chat_model("gpt-4o-mini", gerenciado_por_scheduler=True).max_retries == 0
+        assert obter_chat_model("gpt-4o-mini").max_retries != 0
+    finally:
+        limpar_clientes()
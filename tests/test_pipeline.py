@@ -0,0 +1,145 @@
+import pandas as pd
+import pytest
+
+from classifiers.base import BaseQuoteClassifier, JustificativaComFalha
+from core.construct_cache import hash_texto
+from core.pipeline import ClassificationPipeline
+from core.result_writer import criar_writer, ler_resultado
+from core.run_journal import RunJournal
+
+
+class ClassificadorFalso(BaseQuoteClassifier):
+    """Classifica cada quote como "C-<quote>"; os quotes em `falhas` simulam erro na consulta ao LLM."""
+
+    def __init__(self, falhas=()):
+        self.falhas = set(falhas)
+        self.classificados = []
+
+    def classify(self, quotes):
+        saidas = list(self.classify_iter(quotes))
+        return [s[1] for s in saidas], [s[2] for s in saidas], [s[3] for s in saidas]
+
+    def classify_iter(self, quotes):
+        for i, quote in enumerate(quotes):
+            self.classificados.append(quote)
+            justificativa = f"ok {quote}"
+            if quote in self.falhas:
+                justificativa = JustificativaComFalha(f"⚠️ Erro ao consultar o modelo: 429 ({quote})")
+            yield i, f"C-{quote}", justificativa, 0.01
+
+
+def test_quotes_com_falha_nao_entram_no_diario_e_sao_reclassificados(tmp_path):
+    df = pd.DataFrame({"quote": ["a", "b", "c", "d"]})
+    journal = RunJournal({"teste": "falhas"}, diretorio=tmp_path)
+
+    pipeline = ClassificationPipeline(df, "quote", "classe", ClassificadorFalso(falhas={"c"}), journal=journal)
+    resultado = pipeline.run()
+
+    assert pipeline.falhas == 1
+    assert resultado["classe"].tolist() == ["C-a", "C-b", "C-c", "C-d"]
+    assert set(journal.carregar()) == {hash_texto(q) for q in ("a", "b", "d")}
+
+    # Nova execução com a mesma configuração: apenas o quote que falhou vai ao classificador
+    classificador = ClassificadorFalso()
+    retomada = ClassificationPipeline(df, "quote", "classe", classificador, journal=journal)
+    retomada.run()
+
+    assert classificador.classificados == ["c"]
+    assert retomada.retomados == 3
+    assert retomada.falhas == 0
+    assert set(journal.carregar()) == {hash_texto(q) for q in df["quote"]}
+
+
+def test_entrada_em_blocos_exige_writer():
+    blocos = iter([pd.DataFrame({"quote": ["a"]})])
+
+    with pytest.raises(ValueError):
+        ClassificationPipeline(blocos, "quote", "classe", ClassificadorFalso())
+
+
+def test_blocos_sao_gravados_pelo_writer_sem_acumular_em_memoria(tmp_path):
+    blocos = [pd.DataFrame({"quote": ["a", "b"]}), pd.DataFrame({"quote": ["c"]})]
+    writer = criar_writer(tmp_path / "saida.csv")
+
+    pipeline = ClassificationPipeline(iter(blocos), "quote", "classe", ClassificadorFalso(), writer=writer)
+
+    assert pipeline.run() is None
+    assert pipeline.df is None
+    assert ler_resultado(writer.caminho)["classe"].tolist() == ["C-a", "C-b", "C-c"]
+
+
+@pytest.mark.parametrize("formato", ["parquet", "arrow", "csv", "xlsx"])
+def test_blocos_nao_classificados_apos_interrupcao_mantem_o_esquema(tmp_path, formato):
+    if formato in ("parquet", "arrow"):
+        pytest.importorskip("pyarrow")
+    blocos = [pd.DataFrame({"quote": ["a", "b"]}), pd.DataFrame({"quote": ["c", "d"]})]
+    writer = criar_writer(tmp_path / f"saida.{formato}")
+    classificador = ClassificadorFalso()
+
+    pipeline = ClassificationPipeline(iter(blocos), "quote", "classe", classificador, writer=writer)
+    pipeline.run(deve_interromper=lambda: len(classificador.classificados) >= 1)
+
+    resultado = ler_resultado(writer.caminho)
+    assert pipeline.interrompido
+    assert resultado["quote"].tolist() == ["a", "b", "c", "d"]
+    assert resultado["classe"].tolist()[0] == "C-a"
+    assert resultado["classe"].isna().tolist() == [False, True, True, True]
+    assert resultado["classe_justificativa"].isna().tolist() == [False, True, True, True]
+
+
+def test_retomada_e_interrupcao_sao_eventos_do_tracer_e_nao_saida_no_terminal(tmp_path, capsys):
+    df = pd.DataFrame({"quote": ["a", "b", "c", "d"]})
+    journal = RunJournal({"teste": "eventos"}, diretorio=tmp_path)
+    journal.registrar("a", "C-a", "ok a", 0.01)
+    classificador = ClassificadorFalso()
+
+    pipeline = ClassificationPipeline(df, "quote", "classe", classificador, journal=journal)
+    pipeline.run(deve_interromper=lambda: len(classificador.classificados) >= 2)
+
+    assert capsys.readouterr().out == ""
+    eventos = [(e["evento"], e.get("quotes"), e.get("processados")) for e in pipeline.tracer.eventos]
+    assert eventos == [("retomada", 1, None), ("interrupcao", None, 3)]
+
+
+class ClassificadorForaDeOrdem(ClassificadorFalso):
+    """Entrega os quotes do último para o primeiro (como chamadas paralelas que terminam fora de ordem)."""
+
+    def classify_iter(self, quotes):
+        for i in reversed(range(len(quotes))):
+            self.classificados.append(quotes[i])
+            yield i, f"C-{quotes[i]}", f"ok {quotes[i]}", 0.01
+
+
+def test_progresso_a_cada_quote_e_resultados_pelo_indice():
+    df = pd.DataFrame({"quote": ["a", "b", "c"]})
+    chamadas = []
+
+    pipeline = ClassificationPipeline(df, "quote", "classe", ClassificadorForaDeOrdem())
+    resultado = pipeline.run(progress=lambda processados, total: chamadas.append((processados, total)))
+
+    assert chamadas == [(1, 3), (2, 3), (3, 3)]
+    assert resultado["classe"].tolist() == ["C-a", "C-b", "C-c"]
+    assert pipeline.tempos == [0.01] * 3
+
+
+def test_interrupcao_encerra_o_classificador_sem_novas_chamadas_ao_llm():
+    pytest.importorskip("langchain_core")
+    from benchmarks.fakes import FakeChatModel
+    from classifiers.llm import LLMQuoteClassifier
+
+    llm = FakeChatModel(latencia=0.02, constructos=["A", "B"])
+    classificador = LLMQuoteClassifier({"A": "a", "B": "b"}, escopo="Teste", llm=llm, max_concurrency=2)
+    df = pd.DataFrame({"quote": [f"quote {i}" for i in range(20)]})
+    progresso = []
+
+    pipeline = ClassificationPipeline(df, "quote", "classe", classificador)
+    resultado = pipeline.run(
+        progress=lambda processados, total: progresso.append(processados),
+        deve_interromper=lambda: len(progresso) >= 2,
+    )
+
+    assert pipeline.interrompido
+    assert pipeline.processados == 2
+    # As chamadas já em andamento terminam; nenhuma outra é iniciada após a interrupção
+    assert llm.contadores["chamadas"] <= 2 + classificador.max_concurrency
+    assert resultado["classe"].notna().sum() == 2
@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+
+from benchmarks.fakes import FakeEmbedder
+from core import quote_store as modulo_store
+from core.embeddings import codificar_normalizado
+from core.quote_store import QuoteEmbeddingStore, codificar_quotes
+
+MODELO = "fake-embedder"
+
+
+@pytest.fixture
+def relogio(monkeypatch):
+    agora = [1_000_000.0]
+    monkeypatch.setattr(modulo_store.time, "time", lambda: agora[0])
+    return agora
+
+
+def test_quotes_repetidos_sao_lidos_do_armazenamento(tmp_path):
+    store = QuoteEmbeddingStore(tmp_path)
+    embedder = FakeEmbedder(dimensao=16)
+
+    primeira = store.obter(embedder, MODELO, ["a b", "c d", "a b"])
+    codificados = embedder.textos_codificados
+    segunda = store.obter(embedder, MODELO, ["c d", "a  b"])
+
+    assert codificados == 2  # "a b" repetido no mesmo pedido é codificado uma vez
+    assert embedder.textos_codificados == codificados
+    # Vetores em float16: iguais aos originais até a 3ª casa decimal
+    np.testing.assert_allclose(segunda, primeira[[1, 0]], atol=1e-3)
+    assert store.estatisticas()["hits"] == 2
+    store.fechar()
+
+
+def test_embeddings_persistem_entre_instancias(tmp_path):
+    embedder = FakeEmbedder(dimensao=16)
+    store = QuoteEmbeddingStore(tmp_path)
+    store.obter(embedder, MODELO, ["a", "b"])
+    store.fechar()
+
+    reaberto = QuoteEmbeddingStore(tmp_path)
+    codificados = embedder.textos_codificados
+    vetores = reaberto.obter(embedder, MODELO, ["b", "a"])
+
+    assert embedder.textos_codificados == codificados
+    np.testing.assert_allclose(vetores, codificar_normalizado(embedder, ["b", "a"]), atol=1e-3)
+    reaberto.fechar()
+
+
+def test_lru_remove_os_menos_usados_e_reaproveita_as_posicoes(tmp_path, relogio):
+    store = QuoteEmbeddingStore(tmp_path, max_itens=3)
+    embedder = FakeEmbedder(dimensao=16)
+
+    store.obter(embedder, MODELO, ["a", "b", "c"])
+    relogio[0] += 10
+    store.obter(embedder, MODELO, ["a"])
+    relogio[0] += 10
+    vetores = store.obter(embedder, MODELO, ["d", "e"])  # Remove "b" e "c"
+    np.testing.assert_allclose(vetores, codificar_normalizado(embedder, ["d", "e"]), atol=1e-3)
+
+    codificados = embedder.textos_codificados
+    store.obter(embedder, MODELO, ["a", "d", "e"])
+    assert embedder.textos_codificados == codificados
+    store.obter(embedder, MODELO, ["b"])
+    assert embedder.textos_codificados == codificados + 1
+    store.fechar()
+
+
+def test_modelos_tem_espacos_separados(tmp_path):
+    store = QuoteEmbeddingStore(tmp_path)
+    pequeno, grande = FakeEmbedder(dimensao=8), FakeEmbedder(dimensao=16)
+
+    assert store.obter(pequeno, "pequeno", ["a"]).shape == (1, 8)
+    assert store.obter(grande, "grande", ["a"]).shape == (1, 16)
+    assert grande.textos_codificados == 1
+    store.fechar()
+
+
+def test_sem_armazenamento_codifica_direto():
+    embedder = FakeEmbedder(dimensao=8)
+
+    vetores = codificar_quotes(embedder, MODELO, ["a", "b"])
+
+    np.testing.assert_allclose(vetores, codificar_normalizado(embedder, ["a", "b"]))
@@ -0,0 +1,70 @@
+import sys
+
+import pandas as pd
+import pytest
+
+from core.result_writer import (
+    FORMATO_ARROW,
+    FORMATO_CSV,
+    FORMATO_PARQUET,
+    ExcelResultWriter,
+    ResultWriter,
+    criar_writer,
+    formato_saida_padrao,
+    gerar_excel,
+    ler_resultado,
+)
+
+
+def test_excel_grava_os_blocos_sem_mante_los_em_memoria(tmp_path):
+    writer = ExcelResultWriter(tmp_path / "saida.xlsx")
+    writer.escrever(pd.DataFrame({"quote": ["a", "b"], "nota": [1, None]}))
+    writer.escrever(pd.DataFrame({"quote": ["c"], "nota": [3]}))
+    writer.fechar()
+
+    resultado = ler_resultado(writer.caminho)
+    assert writer.linhas == 3
+    assert resultado["quote"].tolist() == ["a", "b", "c"]
+    assert resultado["nota"].isna().tolist() == [False, True, False]
+
+
+def test_formato_padrao_e_parquet_com_pyarrow_e_csv_sem_ele(monkeypatch):
+    try:
+        import pyarrow  # noqa: F401
+        esperado = FORMATO_PARQUET
+    except ImportError:
+        esperado = FORMATO_CSV
+    assert formato_saida_padrao() == esperado
+
+    monkeypatch.setitem(sys.modules, "pyarrow", None)  # import pyarrow passa a falhar
+    assert formato_saida_padrao() == FORMATO_CSV
+
+
+def test_gravador_base_e_abstrato(tmp_path):
+    with pytest.raises(TypeError):
+        ResultWriter(tmp_path / "saida.bin")
+
+
+@pytest.mark.parametrize("formato", [FORMATO_PARQUET, FORMATO_ARROW, FORMATO_CSV])
+def test_blocos_com_tipos_diferentes_formam_um_unico_arquivo(tmp_path, formato):
+    if formato != FORMATO_CSV:
+        pytest.importorskip("pyarrow")
+
+    with criar_writer(tmp_path / f"saida.{formato}") as writer:
+        writer.escrever(pd.DataFrame({"quote": ["a", "b"], "nota": [1, 2], "extra": ["x", "y"]}))
+        # Segundo bloco: células vazias onde o primeiro tinha inteiros e texto
+        writer.escrever(pd.DataFrame({"quote": ["c"], "nota": [None], "extra": [None]}))
+
+    resultado = ler_resultado(writer.caminho)
+    assert writer.linhas == 3
+    assert writer.tamanho_bytes > 0
+    assert resultado["quote"].tolist() == ["a", "b", "c"]
+    assert resultado["nota"].isna().tolist() == [False, False, True]
+    assert resultado["extra"].isna().tolist() == [False, False, True]
+
+    assert ler_resultado(gerar_excel(writer.caminho))["quote"].tolist() == ["a", "b", "c"]
+
+
+def test_formato_invalido(tmp_path):
+    with pytest.raises(ValueError):
+        criar_writer(tmp_path / "saida.json")
@@ -0,0 +1,57 @@
+import pandas as pd
+
+from core.construct_cache import hash_texto
+from core.pipeline import ClassificationPipeline
+from core.run_journal import RunJournal, hash_config
+from tests.test_pipeline import ClassificadorFalso
+
+
+def test_registros_sao_lidos_de_volta(tmp_path):
+    journal = RunJournal({"modelo": "gpt-4"}, diretorio=tmp_path)
+    journal.registrar("Eu guio o time", "Liderança", "guia", 0.5)
+
+    assert RunJournal({"modelo": "gpt-4"}, diretorio=tmp_path).carregar() == {
+        hash_texto("Eu guio o time"): ("Liderança", "guia", 0.5)
+    }
+
+
+def test_configuracao_diferente_usa_outro_diario(tmp_path):
+    RunJournal({"modelo": "gpt-4", "escopo": "a"}, diretorio=tmp_path).registrar("q", "C", "j", 0.1)
+
+    assert RunJournal({"modelo": "gpt-4", "escopo": "b"}, diretorio=tmp_path).carregar() == {}
+    assert hash_config({"a": 1, "b": 2}) == hash_config({"b": 2, "a": 1})
+
+
+def test_linha_incompleta_do_fim_e_ignorada(tmp_path):
+    journal = RunJournal({"modelo": "gpt-4"}, diretorio=tmp_path)
+    journal.registrar("a", "A", "ok", 0.1)
+    with open(journal.caminho, "a", encoding="utf-8") as f:
+        f.write('{"quote_hash": "incompl')  # Processo caiu no meio da gravação
+
+    assert list(journal.carregar()) == [hash_texto("a")]
+
+
+def test_descartar_recomeca_do_zero(tmp_path):
+    journal = RunJournal({"modelo": "gpt-4"}, diretorio=tmp_path)
+    journal.registrar("a", "A", "ok", 0.1)
+
+    journal.descartar()
+
+    assert journal.carregar() == {}
+
+
+def test_execucao_interrompida_retoma_apenas_os_pendentes(tmp_path):
+    df = pd.DataFrame({"quote": ["a", "b", "c", "d"]})
+    config = {"modelo": "falso"}
+    primeiro = ClassificadorFalso()
+
+    interrompida = ClassificationPipeline(df, "quote", "classe", primeiro, journal=RunJournal(config, tmp_path))
+    interrompida.run(deve_interromper=lambda: len(primeiro.classificados) >= 2)
+
+    segundo = ClassificadorFalso()
+    retomada = ClassificationPipeline(df, "quote", "classe", segundo, journal=RunJournal(config, tmp_path))
+    resultado = retomada.run()
+
+    assert segundo.classificados == ["c", "d"]
+    assert retomada.retomados == 2
+    assert resultado["classe"].tolist() == ["C-a", "C-b", "C-c", "C-d"]
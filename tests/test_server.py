@@ -0,0 +1,177 @@
+import threading
+import time
+
+import pytest
+
+from server import ClassifierPool, ErroRequisicao
+
+
+class ClassificadorFixo:
+    def __init__(self, constructos):
+        self.constructos = constructos
+        self.fechado = False
+
+    def classify(self, quotes):
+        return [next(iter(self.constructos))] * len(quotes), [""] * len(quotes), [0.0] * len(quotes)
+
+    def fechar(self):
+        self.fechado = True
+
+
+class PoolFalso(ClassifierPool):
+    """Pool cujo classificador demora `atraso` segundos para ser criado (como carregar o modelo)."""
+
+    def __init__(self, atraso=0.0, **kwargs):
+        super().__init__(janela=0.001, **kwargs)
+        self.atraso = atraso
+        self.criados = []
+
+    def _criar_classificador(self, classificador, constructos, escopo):
+        self.criados.append((classificador, escopo))
+        time.sleep(self.atraso)
+        return ClassificadorFixo(constructos)
+
+
+def test_criacao_acontece_fora_do_lock_e_uma_vez_por_chave():
+    pool = PoolFalso(atraso=0.3)
+    lento = pool.registrar_codebook({"A": "a"}, "lento")
+    outro = pool.registrar_codebook({"B": "b"}, "outro")
+
+    batchers = []
+    threads = [threading.Thread(target=lambda: batchers.append(pool.batcher(lento, "embedding"))) for _ in range(4)]
+    for t in threads:
+        t.start()
+    time.sleep(0.05)
+
+    # Enquanto o classificador lento é criado, o pool continua atendendo outros codebooks
+    inicio = time.perf_counter()
+    with pool._lock:
+        pass
+    assert time.perf_counter() - inicio < 0.1
+    assert pool.registrar_codebook({"C": "c"}) is not None
+
+    for t in threads:
+        t.join()
+    assert len({id(b) for b in batchers}) == 1
+    assert [escopo for _, escopo in pool.criados].count("lento") == 1
+    assert pool.batcher(lento, "embedding").submeter("quote").result(timeout=2)[0] == "A"
+    pool.batcher(outro, "embedding")
+    pool.fechar()
+
+
+def test_codebooks_sao_descartados_com_as_instancias():
+    pool = PoolFalso(max_instancias=1)
+    primeiro = pool.registrar_codebook({"A": "a"})
+    segundo = pool.registrar_codebook({"B": "b"})
+
+    pool.batcher(primeiro, "embedding")
+    instancia_primeiro = pool._instancias[(primeiro, "embedding")][0]
+    pool.batcher(segundo, "embedding")
+
+    assert instancia_primeiro.fechado
+    assert pool.metricas()["codebooks"] == 1
+    with pytest.raises(ErroRequisicao) as erro:
+        pool.batcher(primeiro, "embedding")
+    assert erro.value.status == 404
+    pool.fechar()
+
+
+def test_codebooks_sem_uso_ficam_limitados():
+    pool = PoolFalso(max_instancias=1, max_codebooks=3)
+    codebooks = [pool.registrar_codebook({f"C{i}": "x"}) for i in range(10)]
+
+    assert pool.metricas()["codebooks"] == 3
+    assert list(pool._codebooks) == codebooks[-3:]
+
+
+class ClassificadorComFalha(ClassificadorFixo):
+    """Falha o lote inteiro quando ele contém um quote com "erro"."""
+
+    def __init__(self, constructos):
+        super().__init__(constructos)
+        self.lotes = []
+
+    def classify(self, quotes):
+        self.lotes.append(list(quotes))
+        if any("erro" in quote for quote in quotes):
+            raise ValueError("quote inválido")
+        return super().classify(quotes)
+
+
+class PoolComFalha(PoolFalso):
+    def _criar_classificador(self, classificador, constructos, escopo):
+        return ClassificadorComFalha(constructos)
+
+
+def test_batcher_isola_o_item_que_falha():
+    from core.micro_batcher import MicroBatcher
+
+    def processar(itens):
+        if "ruim" in itens:
+            raise ValueError("item ruim")
+        return [item.upper() for item in itens]
+
+    batcher = MicroBatcher(processar, janela=0.2, tamanho_maximo=3)
+    futuros = [batcher.submeter(item) for item in ("a", "ruim", "b")]
+
+    assert futuros[0].result(timeout=2) == "A"
+    assert futuros[2].result(timeout=2) == "B"
+    with pytest.raises(ValueError):
+        futuros[1].result(timeout=2)
+    assert batcher.metricas()["erros"] == 1
+    batcher.fechar()
+
+
+def _post(servidor, caminho, corpo):
+    import json
+    import urllib.error
+    import urllib.request
+
+    requisicao = urllib.request.Request(
+        f"http://127.0.0.1:{servidor.server_address[1]}{caminho}", data=json.dumps(corpo).encode("utf-8")
+    )
+    try:
+        with urllib.request.urlopen(requisicao, timeout=5) as resposta:
+            return resposta.status, json.loads(resposta.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+@pytest.fixture
+def servidor():
+    from server import criar_servidor
+
+    pool = PoolComFalha(max_instancias=1)
+    servidor = criar_servidor("127.0.0.1", 0, pool)
+    thread = threading.Thread(target=servidor.serve_forever, daemon=True)
+    thread.start()
+    yield servidor
+    servidor.shutdown()
+    servidor.server_close()
+    pool.fechar()
+
+
+def test_lote_devolve_o_erro_apenas_no_quote_que_falhou(servidor):
+    status, corpo = _post(servidor, "/classificar/lote", {"quotes": ["ok", "erro", "ok 2"], "constructos": {"A": "a"}})
+
+    assert status == 200
+    resultados = corpo["resultados"]
+    assert [r["constructo"] for r in resultados] == ["A", None, "A"]
+    assert "quote inválido" in resultados[1]["erro"]
+    assert resultados[0]["falha"] is False
+
+
+def test_codebook_descartado_e_recriado_pelos_constructos(servidor):
+    _, primeiro = _post(servidor, "/codebooks", {"constructos": {"A": "a"}})
+    _post(servidor, "/classificar", {"quote": "x", "codebook": primeiro["codebook"]})
+    _post(servidor, "/classificar", {"quote": "x", "constructos": {"B": "b"}})  # Descarta o primeiro
+
+    status, corpo = _post(servidor, "/classificar", {"quote": "x", "codebook": primeiro["codebook"]})
+    assert status == 404
+    assert "POST /codebooks" in corpo["erro"]
+
+    status, corpo = _post(
+        servidor, "/classificar", {"quote": "x", "codebook": primeiro["codebook"], "constructos": {"A": "a"}}
+    )
+    assert status == 200
+    assert corpo["constructo"] == "A"
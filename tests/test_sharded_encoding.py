@@ -0,0 +1,112 @@
+from concurrent.futures import Future
+
+import numpy as np
+import pytest
+
+from benchmarks.fakes import MODELO_EMBEDDING_FALSO
+from core import sharded_encoding
+from core.embeddings import codificar_normalizado
+from core.sharded_encoding import ShardedEncoder
+
+QUOTES = [f"quote número {i} sobre ouvir os colegas e guiar o time" for i in range(10)]
+
+
+class FuturoPreguicoso(Future):
+    """Futuro executado apenas quando o resultado é pedido (permite observar cancelamentos)."""
+
+    def __init__(self, fn, args):
+        super().__init__()
+        self._fn, self._args = fn, args
+
+    def result(self, timeout=None):
+        if not self.done():
+            self.set_result(self._fn(*self._args))
+        return super().result(timeout)
+
+
+class ExecutorNoProcesso:
+    """
+    Substitui o pool de processos: os processos "spawn" não enxergam o FakeEmbedder
+    registrado no processo do teste, então os shards são codificados aqui mesmo.
+    """
+
+    def __init__(self):
+        self.futuros = []
+        self.max_em_andamento = 0
+
+    def submit(self, fn, *args):
+        futuro = FuturoPreguicoso(fn, args)
+        self.futuros.append(futuro)
+        em_andamento = sum(not f.done() for f in self.futuros)
+        self.max_em_andamento = max(self.max_em_andamento, em_andamento)
+        return futuro
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        pass
+
+
+@pytest.fixture
+def executor(embedder_falso, monkeypatch):
+    monkeypatch.setattr(sharded_encoding, "_config_trabalhador", {})
+    sharded_encoding._inicializar_trabalhador(MODELO_EMBEDDING_FALSO, None, 4, threads=0)
+    executor = ExecutorNoProcesso()
+    monkeypatch.setattr(ShardedEncoder, "_obter_executor", lambda self: executor)
+    return executor
+
+
+def test_sem_quotes_nao_cria_processos():
+    encoder = ShardedEncoder(MODELO_EMBEDDING_FALSO, n_processos=2)
+
+    assert list(encoder.iterar([])) == []
+    assert encoder._executor is None
+
+
+def test_shards_sao_entregues_na_ordem_original(embedder_falso, executor):
+    encoder = ShardedEncoder(MODELO_EMBEDDING_FALSO, n_processos=2, tamanho_shard=3)
+
+    shards = list(encoder.iterar(QUOTES))
+
+    assert [inicio for inicio, _ in shards] == [0, 3, 6, 9]
+    np.testing.assert_allclose(
+        np.vstack([vetores for _, vetores in shards]), codificar_normalizado(embedder_falso, QUOTES), atol=1e-6
+    )
+    assert sum(estatistica["quotes"] for estatistica in encoder.estatisticas.values()) == len(QUOTES)
+    assert encoder.resumo_throughput()[0].startswith("Processo 1 (pid ")
+
+
+def test_no_maximo_dois_shards_por_processo_em_andamento(executor):
+    encoder = ShardedEncoder(MODELO_EMBEDDING_FALSO, n_processos=2, tamanho_shard=1)
+
+    list(encoder.iterar(QUOTES))
+
+    assert len(executor.futuros) == len(QUOTES)
+    assert executor.max_em_andamento == 4
+
+
+def test_encerrar_o_gerador_cancela_os_shards_pendentes(executor):
+    encoder = ShardedEncoder(MODELO_EMBEDDING_FALSO, n_processos=2, tamanho_shard=1)
+
+    shards = encoder.iterar(QUOTES)
+    next(shards)
+    shards.close()
+
+    assert len(executor.futuros) == 4
+    assert [f.cancelled() for f in executor.futuros] == [False, True, True, True]
+
+
+def test_classificador_em_processos_concorda_com_o_sequencial(executor):
+    from classifiers.embedding import EmbeddingQuoteClassifier
+
+    constructos = {"Empatia": "ouvir e acolher os colegas", "Liderança": "guiar o time e distribuir tarefas"}
+    quotes = ["eu gosto de ouvir os colegas", "guiar o time", "acolher quem chega", "distribuir tarefas", "ouvir"]
+    sequencial = EmbeddingQuoteClassifier(constructos, modelo_embedding=MODELO_EMBEDDING_FALSO)
+    em_processos = EmbeddingQuoteClassifier(
+        constructos, modelo_embedding=MODELO_EMBEDDING_FALSO, n_processos=2, tamanho_shard=2
+    )
+
+    esperado, _, _ = sequencial.classify(quotes)
+    resultados, _, tempos = em_processos.classify(quotes)
+
+    assert resultados == esperado
+    assert len(tempos) == len(quotes)
+    assert em_processos.encoder_processos is not None
@@ -0,0 +1,92 @@
+import pytest
+
+pytest.importorskip("langchain_core")
+
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from benchmarks.fakes import MODELO_EMBEDDING_FALSO, FakeChatModel
+from classifiers.base import JustificativaComFalha
+from classifiers.similarity_classifier import MODO_CONJUNTO, MODO_PAR, ConstructSimilarityClassifier
+from core.llm_scheduler import LLMScheduler
+
+CONSTRUCTOS = {
+    "Empatia": "Capacidade de se colocar no lugar do outro",
+    "Liderança": "Capacidade de guiar o time",
+    "Autonomia": "Capacidade de decidir sozinho",
+}
+
+
+class ChatModelSemJSON(FakeChatModel):
+    """Chat model falso que responde texto livre em vez da lista JSON do modo conjunto."""
+
+    def _responder(self, prompt):
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="Não sei avaliar."))])
+
+
+def criar_classificador(modo, llm=None, scheduler=None):
+    return ConstructSimilarityClassifier(
+        CONSTRUCTOS, escopo="Teste", llm=llm or FakeChatModel(latencia=0), scheduler=scheduler,
+        modelo_embedding=MODELO_EMBEDDING_FALSO, modo_avaliacao=modo, max_concurrency=4
+    )
+
+
+@pytest.mark.parametrize("modo", [MODO_PAR, MODO_CONJUNTO])
+def test_classify_iter_avalia_os_candidatos_de_cada_quote(embedder_falso, modo):
+    classificador = criar_classificador(modo)
+    quotes = ["Eu escuto os colegas", "Eu guio o time", "Decido sozinho"]
+
+    saidas = sorted(classificador.classify_iter(quotes))
+
+    assert [idx for idx, *_ in saidas] == [0, 1, 2]
+    for _, resultado, justificativa, _ in saidas:
+        assert resultado.count("%") == classificador.top_k
+        assert not isinstance(justificativa, JustificativaComFalha)
+
+
+def test_interpretar_conjunto_sem_json_valido_marca_todos_como_falha():
+    top = [("Empatia", 0.8), ("Liderança", 0.5)]
+
+    avaliacoes = ConstructSimilarityClassifier._interpretar_conjunto("Não sei avaliar.", top)
+
+    assert len(avaliacoes) == 2
+    assert all(isinstance(avaliacao, ValueError) for avaliacao in avaliacoes)
+
+
+def test_interpretar_conjunto_candidato_ausente_recebe_zero():
+    top = [("Empatia", 0.8), ("Liderança", 0.5)]
+    resposta = '[{"constructo": "Empatia", "similaridade": 90, "justificativa": "ok"}]'
+
+    avaliacoes = ConstructSimilarityClassifier._interpretar_conjunto(resposta, top)
+
+    assert avaliacoes == [(90.0, "ok"), (0.0, "Constructo não avaliado pelo modelo.")]
+
+
+@pytest.mark.parametrize("scheduler", [None, LLMScheduler()], ids=["paralelo", "agendado"])
+def test_resposta_conjunto_invalida_vira_falha(embedder_falso, scheduler):
+    classificador = criar_classificador(MODO_CONJUNTO, llm=ChatModelSemJSON(latencia=0), scheduler=scheduler)
+
+    saidas = list(classificador.classify_iter(["Eu escuto os colegas"]))
+
+    assert len(saidas) == 1
+    assert isinstance(saidas[0][2], JustificativaComFalha)
+
+
+@pytest.mark.parametrize("modo", [MODO_PAR, MODO_CONJUNTO])
+@pytest.mark.parametrize("scheduler", [None, LLMScheduler()], ids=["paralelo", "agendado"])
+def test_quote_sem_candidatos_sai_como_falha(embedder_falso, modo, scheduler):
+    classificador = criar_classificador(modo, scheduler=scheduler)
+    original = classificador._top_constructos
+
+    def sem_candidatos_no_segundo(quotes):
+        tops, tempo = original(quotes)
+        tops[1] = []
+        return tops, tempo
+
+    classificador._top_constructos = sem_candidatos_no_segundo
+
+    saidas = sorted(classificador.classify_iter(["Eu escuto os colegas", "Eu guio o time", "Decido sozinho"]))
+
+    assert [idx for idx, *_ in saidas] == [0, 1, 2]
+    assert isinstance(saidas[1][2], JustificativaComFalha)
+    assert not isinstance(saidas[0][2], JustificativaComFalha)
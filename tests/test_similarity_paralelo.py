@@ -0,0 +1,113 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("langchain_core")
+
+from pydantic import PrivateAttr
+
+from benchmarks.fakes import MODELO_EMBEDDING_FALSO, FakeChatModel
+from classifiers.base import JustificativaComFalha
+from classifiers.similarity_classifier import ConstructSimilarityClassifier
+
+CONSTRUCTOS = {
+    "Empatia": "ouvir os colegas",
+    "Liderança": "guiar o time",
+    "Autonomia": "decidir sozinho",
+}
+QUOTES = ["eu ouço os colegas", "eu guio o time", "decido sozinho", "ouvir e guiar"]
+
+
+class ChatModelConcorrente(FakeChatModel):
+    """Mede o pico de chamadas simultâneas (síncronas e assíncronas); falha no constructo `falhar`."""
+
+    falhar: str = "\0"
+
+    _em_andamento = PrivateAttr(default=0)
+    _pico = PrivateAttr(default=0)
+    _trava = PrivateAttr(default_factory=threading.Lock)
+
+    @property
+    def pico(self):
+        return self._pico
+
+    def _entrar(self, prompt):
+        if self.falhar in prompt:
+            raise ValueError("500 Internal Server Error")
+        with self._trava:
+            self._em_andamento += 1
+            self._pico = max(self._pico, self._em_andamento)
+
+    def _sair(self):
+        with self._trava:
+            self._em_andamento -= 1
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        prompt = self._texto(messages)
+        self._entrar(prompt)
+        try:
+            time.sleep(self.latencia)
+        finally:
+            self._sair()
+        return self._responder(prompt)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        prompt = self._texto(messages)
+        self._entrar(prompt)
+        try:
+            await asyncio.sleep(self.latencia)
+        finally:
+            self._sair()
+        return self._responder(prompt)
+
+
+def criar(llm, max_concurrency):
+    return ConstructSimilarityClassifier(
+        CONSTRUCTOS, escopo="Teste", llm=llm, modelo_embedding=MODELO_EMBEDDING_FALSO,
+        max_concurrency=max_concurrency
+    )
+
+
+@pytest.mark.parametrize("max_concurrency", [2, 4])
+def test_avaliacoes_rodam_em_paralelo_ate_o_limite(embedder_falso, max_concurrency):
+    llm = ChatModelConcorrente(latencia=0.05)
+
+    resultados, justificativas, tempos = criar(llm, max_concurrency).classify(QUOTES)
+
+    assert llm.pico == max_concurrency
+    assert len(resultados) == len(QUOTES)
+    assert all(resultado.count("%") == 2 for resultado in resultados)
+
+
+def test_classify_iter_respeita_o_limite(embedder_falso):
+    llm = ChatModelConcorrente(latencia=0.05)
+
+    saidas = list(criar(llm, 3).classify_iter(QUOTES))
+
+    assert sorted(idx for idx, *_ in saidas) == list(range(len(QUOTES)))
+    assert llm.pico == 3
+
+
+def test_resultado_segue_a_ordem_dos_quotes(embedder_falso):
+    classificador = criar(ChatModelConcorrente(latencia=0.01), 4)
+
+    resultados, _, _ = classificador.classify(QUOTES)
+    tops, _ = classificador._top_constructos(QUOTES)
+
+    for resultado, top in zip(resultados, tops):
+        assert [parte.split(" (")[0] for parte in resultado.split(", ")] == [nome for nome, _ in top]
+
+
+def test_falha_de_uma_avaliacao_marca_apenas_o_seu_quote(embedder_falso):
+    # A definição de "Autonomia" só aparece no prompt das avaliações desse constructo
+    llm = ChatModelConcorrente(latencia=0, falhar="decidir sozinho")
+    classificador = criar(llm, 2)
+    tops, _ = classificador._top_constructos(QUOTES)
+
+    _, justificativas, _ = classificador.classify(QUOTES)
+
+    for top, justificativa in zip(tops, justificativas):
+        avaliou_autonomia = any(nome == "Autonomia" for nome, _ in top)
+        assert isinstance(justificativa, JustificativaComFalha) == avaliou_autonomia
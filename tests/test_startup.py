@@ -0,0 +1,53 @@
+import os
+
+import pytest
+
+from benchmarks.bench_startup import ALVOS, MODULOS_PESADOS, executar_alvo, modulos_mais_lentos
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.mark.parametrize("codigo", [
+    ALVOS["controller"],
+    ALVOS["assistente"],
+    "import cli",
+    "import core.instrumentation",
+], ids=["controller", "assistente", "cli", "instrumentation"])
+def test_entrada_nao_carrega_modulos_pesados(codigo):
+    # O processo filho roda sem OPENAI_API_KEY: importar não pode exigir a chave
+    resultado, _ = executar_alvo(codigo, RAIZ)
+
+    assert resultado["pesados"] == []
+
+
+def test_primeiro_uso_carrega_o_modulo_do_classificador():
+    pytest.importorskip("langchain_core")
+
+    resultado, _ = executar_alvo("from classifiers.llm import LLMQuoteClassifier", RAIZ)
+
+    assert "langchain_core" in resultado["pesados"]
+    assert set(resultado["pesados"]) <= set(MODULOS_PESADOS)
+
+
+def test_cache_do_llm_aberto_apenas_no_primeiro_uso(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    from main_controller import MainController
+
+    controller = MainController()
+    assert controller._llm_cache is None
+
+    cache = controller.llm_cache
+    assert cache is not None
+    assert controller.llm_cache is cache
+
+
+def test_modulos_mais_lentos_considera_apenas_o_primeiro_nivel():
+    saida = "\n".join([
+        "import time: self [us] | cumulative | imported package",
+        "import time:       150 |        150 |     pandas._libs",
+        "import time:       900 |       4000 | pandas",
+        "import time:       100 |       1500 | numpy",
+        "import time:        50 |         50 | json",
+    ])
+
+    assert modulos_mais_lentos(saida, 2) == [("pandas", 4.0), ("numpy", 1.5)]